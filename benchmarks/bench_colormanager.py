@@ -0,0 +1,50 @@
+#	A cross-platform library for Python apps.
+#	Copyright (C) 2024 Le Bao Nguyen and contributors.
+#	This is a part of the libtextworker project.
+#	Licensed under the GNU General Public License version 3.0 or later.
+
+# ColorManager.configure on 5,000 (toolkit-less) widgets, with functions registered for
+# 30 widget classes and 200 single widgets - how long it takes to theme all of them.
+#
+# Usage (from the repository root): PYTHONPATH=. python benchmarks/bench_colormanager.py [widgets]
+
+import sys
+import time
+
+from libtextworker.interface import stock_ui_configs
+from libtextworker.interface.manager import ColorManager
+
+COUNT = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+
+
+class Widget:
+    def SetBackgroundColour(this, color): this.back = color
+    def SetForegroundColour(this, color): this.fore = color
+    def SetColors(this, back, fore): this.back, this.fore = back, fore
+
+
+# A small class tree, like a toolkit's: Widget <- Control<i> <- Control<i>Ex
+classes = []
+for i in range(15):
+    base = type(f"Control{i}", (Widget,), {})
+    classes += [base, type(f"Control{i}Ex", (base,), {})]
+
+widgets = [classes[i % len(classes)]() for i in range(COUNT)]
+
+clrmgr = ColorManager(None, stock_ui_configs)
+for cls in classes:
+    clrmgr.setcolorfunc(cls, "SetBackgroundColour", ("%(color)",))
+    clrmgr.setfontcfunc(cls, "SetForegroundColour", {"color": "%(font)"})
+for widget in widgets[:200]:
+    clrmgr.setfontandcolorfunc(widget, widget.SetColors, {"back": "%(color)", "fore": "%(font)"})
+
+for rounds, color in enumerate(["dark", "light", "dark"], 1):
+    start = time.perf_counter()
+    for widget in widgets:
+        clrmgr.configure(widget, color)
+    spent = time.perf_counter() - start
+    print(f"Round {rounds} ({color}): {COUNT} widgets in {spent * 1000:.1f}ms "
+          f"({spent / COUNT * 1e6:.1f}us per widget)")
+
+back, fore = clrmgr.GetColor("dark")
+assert all(widget.back == back and widget.fore == fore for widget in widgets)
@@ -0,0 +1,66 @@
+#	A cross-platform library for Python apps.
+#	Copyright (C) 2024 Le Bao Nguyen and contributors.
+#	This is a part of the libtextworker project.
+#	Licensed under the GNU General Public License version 3.0 or later.
+
+# Types into a 50 MB buffer, and asks for the buffer digest after every keystroke
+# (the worst case - think of a title bar showing the modified state).
+# Compares DirtyTracker with the old way: md5 of the whole buffer on each edit.
+#
+# Usage (from the repository root): PYTHONPATH=. python benchmarks/bench_dirtytracker.py [keystrokes]
+
+import random
+import sys
+import time
+
+from hashlib import md5
+from libtextworker.interface.base.editor import BufferHash, DirtyTracker
+
+SIZE = 50 * 1024 * 1024
+KEYSTROKES = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+
+line = "The quick brown fox jumps over the lazy dog, then takes a nap. 0123456789"
+lines = [line] * (SIZE // (len(line) + 1))
+
+
+def fetch(first, last):
+    if last is None:
+        return "\n".join(lines[first:])
+    return "\n".join(lines[first:last]) + "\n"
+
+
+print(f"Buffer: {len(lines)} lines, {SIZE / 1024 / 1024:.0f} MB, {KEYSTROKES} keystrokes")
+
+start = time.perf_counter()
+tracker = DirtyTracker(fetch, len(lines))
+first = tracker.digest()
+print(f"DirtyTracker - initial digest: {time.perf_counter() - start:.3f}s")
+
+rand = random.Random(3105)
+pos = rand.randrange(len(lines))
+
+start = time.perf_counter()
+for i in range(KEYSTROKES):
+    if i % 80 == 79:  # Enter
+        lines[pos:pos + 1] = [lines[pos][:10], lines[pos][10:]]
+        tracker.Changed(pos, 0, 1)
+        pos += 1
+    else:
+        lines[pos] = lines[pos][:10] + "x" + lines[pos][10:]
+        tracker.Changed(pos)
+    tracker.digest()
+elapsed = time.perf_counter() - start
+print(f"DirtyTracker - typing: {elapsed:.3f}s total, {elapsed / KEYSTROKES * 1000:.3f}ms per keystroke")
+
+# The old way: md5 over the whole buffer, for a few keystrokes only
+samples = 5
+start = time.perf_counter()
+for i in range(samples):
+    lines[pos] = lines[pos][:10] + "x" + lines[pos][10:]
+    md5("\n".join(lines).encode("utf-8"))
+elapsed = time.perf_counter() - start
+print(f"md5 (old)    - typing: {elapsed / samples * 1000:.3f}ms per keystroke")
+
+# Sanity check
+tracker.Changed(pos)
+assert tracker.digest() == BufferHash("\n".join(lines).encode("utf-8")).digest()
@@ -0,0 +1,74 @@
+#	A cross-platform library for Python apps.
+#	Copyright (C) 2024 Le Bao Nguyen and contributors.
+#	This is a part of the libtextworker project.
+#	Licensed under the GNU General Public License version 3.0 or later.
+
+# Startup cost of libtextworker, measured by python -X importtime in fresh interpreters
+# (best of a few runs). Fails (exit code 1) when a module goes over its budget, or when
+# importing it pulls in something it should not need (optional dependencies, GUI toolkits).
+# Also checks that importing does not touch the disk (~/.logs).
+#
+# Usage (from the repository root): PYTHONPATH=. python benchmarks/bench_importtime.py [runs]
+
+import os
+import subprocess
+import sys
+import tempfile
+
+RUNS = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+
+# Module: (budget in milliseconds, modules which must not be imported)
+BUDGETS = {
+    "libtextworker": (40, ("watchdog", "darkdetect", "tkinter", "wx", "libtextworker.get_config")),
+    "libtextworker.get_config": (60, ("watchdog", "darkdetect", "tkinter", "wx", "libtextworker.watch")),
+}
+
+
+def measure(module: str, home: str) -> tuple[float, set[str]]:
+    """
+    Import module in a new interpreter.
+    @return (cumulative import time of module in ms, names of all imported modules)
+    """
+    env = dict(os.environ, HOME=home)
+    env.pop("PYTHONDONTWRITEBYTECODE", None)  # Don't count compiling - the first run writes .pyc files
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            capture_output=True, text=True, env=env, check=True)
+
+    total = 0.0
+    imported = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line: continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit(): continue  # Header
+        name = name.strip()
+        imported.add(name)
+        if name == module:
+            total = int(cumulative) / 1000
+    return total, imported
+
+
+failed = False
+with tempfile.TemporaryDirectory() as home:
+    for module, (budget, forbidden) in BUDGETS.items():
+        times = []
+        for i in range(RUNS):
+            spent, imported = measure(module, home)
+            times.append(spent)
+
+        best = min(times)
+        pulled = sorted(name for name in imported
+                        if any(name == bad or name.startswith(bad + ".") for bad in forbidden))
+
+        print(f"{module}: {best:.1f}ms (budget {budget}ms)")
+        if best > budget:
+            print("  over budget!")
+            failed = True
+        if pulled:
+            print(f"  imports {', '.join(pulled)}")
+            failed = True
+
+    if os.path.exists(os.path.join(home, ".logs")):
+        print("Importing created ~/.logs")
+        failed = True
+
+sys.exit(1 if failed else 0)
@@ -0,0 +1,72 @@
+#	A cross-platform library for Python apps.
+#	Copyright (C) 2024 Le Bao Nguyen and contributors.
+#	This is a part of the libtextworker project.
+#	Licensed under the GNU General Public License version 3.0 or later.
+
+# Replace All with 1M replacements: how long the single pass that computes them takes
+# (plain & regex), then applying them bottom-up as one undo step, to a plain Tk Text widget
+# and to StyledTextControl (only if a display is available).
+#
+# Usage (from the repository root): PYTHONPATH=. python benchmarks/bench_replaceall.py [replacements]
+
+import re
+import sys
+import time
+
+from libtextworker.interface.base.findreplace import CompilePattern, Replacements
+
+COUNT = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+PER_LINE = 4
+
+text = "\n".join(["foo = bar(foo, 42) + foo * foo"] * (COUNT // PER_LINE))
+print(f"Buffer: {COUNT // PER_LINE} lines, {len(text) / 1024 / 1024:.1f} MB")
+
+start = time.perf_counter()
+edits = Replacements(text, CompilePattern("FOO", case=False), "spam")
+print(f"Plain - {len(edits)} replacements computed in {time.perf_counter() - start:.3f}s")
+
+start = time.perf_counter()
+edits = Replacements(text, CompilePattern(r"\b(f)(o+)\b", regex=True), r"\2\1", regex=True)
+print(f"Regex - {len(edits)} replacements computed in {time.perf_counter() - start:.3f}s")
+
+# Sanity check: same result as re.sub
+pieces = []
+last = 0
+for match, repl in edits:
+    pieces += (text[last:match[0]], repl)
+    last = match[1]
+pieces.append(text[last:])
+assert "".join(pieces) == re.sub(r"\b(f)(o+)\b", r"\2\1", text)
+
+try:
+    import tkinter
+    root = tkinter.Tk()
+except tkinter.TclError:
+    print("No display, skipping the Tk part")
+    sys.exit()
+
+from libtextworker.interface.tk.editor import StyledTextControl
+from libtextworker.interface.tk.findreplace import FindReplace
+
+# StyledTextControl reports edits to its listeners (DirtyTracker, the search cache):
+# Replace All batches them into one, so it should cost about the same as a plain Text
+for name, kind in ("Text", tkinter.Text), ("Styled", StyledTextControl):
+    editor = kind(root, undo=True)
+    editor.insert("1.0", text)
+    editor.edit_reset()
+    frame = FindReplace(root, editor, addReplace=True)
+
+    start = time.perf_counter()
+    frame.ApplyReplacements(edits)
+    print(f"{name:6} - {len(edits)} replacements applied in {time.perf_counter() - start:.3f}s")
+
+    if kind is StyledTextControl:
+        start = time.perf_counter()
+        editor.Hash.hexdigest()
+        print(f"{name:6} - buffer rehashed in {time.perf_counter() - start:.3f}s")
+
+    start = time.perf_counter()
+    editor.edit_undo()
+    print(f"{name:6} - undone in one step in {time.perf_counter() - start:.3f}s")
+    assert editor.get("1.0", "end-1c") == text
+    editor.destroy()
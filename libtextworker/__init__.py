@@ -19,11 +19,14 @@ _ = gettext.gettext
 # libtextworker version
 __version__ = "0.1.4b1"
 
-## Dependency checks
+## Lazy submodules
+# Dependencies are checked when needed (see general.Importable), and submodules are
+# only imported when used - a program which needs GetConfig only pays for GetConfig.
 
-if not test_import("watchdog"):
-    from warnings import warn
-    warn("watchdog module cannot be imported - file system watching wont work.")
+_submodules = ("general", "get_config", "interface", "versioning", "watch")
 
-test_import("configparser")
-test_import("commentedconfigparser")
+def __getattr__(name: str):
+    if name in _submodules:
+        from importlib import import_module
+        return import_module(f".{name}", __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
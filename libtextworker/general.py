@@ -11,11 +11,14 @@
 import logging
 import os
 import pathlib
-import shutil
 import sys
+import threading
 import warnings
 
+from gettext import gettext as _
 from importlib import import_module
+from importlib.util import find_spec
+from time import strftime, localtime
 from typing import Literal
 
 # @since version 0.1.3
@@ -23,7 +26,22 @@ from typing import Literal
 available_toolkits = Literal["tk", "wx"]
 
 # Python package import tests
-Importable: dict[str, bool] = {}
+class _Importable(dict):
+    """
+    Tells whether a package is available, checked the first time it is asked for.
+    Checking uses importlib.util.find_spec, so the package is found but not imported (which
+    may be slow). test_import() does a real import and stores its result here too.
+    """
+
+    def __missing__(this, pkgname: str) -> bool:
+        try:
+            found = find_spec(pkgname) is not None
+        except (ImportError, ValueError): # e.g the parent package is missing
+            found = False
+        this[pkgname] = found
+        return found
+
+Importable: dict[str, bool] = _Importable()
 
 # TODO: System path (e.g /usr/share/libtextworker) like many projects else
 # Top-level directory for themes etc
@@ -41,20 +59,85 @@ class Logger(logging.Logger):
     """
 
     UseToolKit: available_toolkits | bool = False
+    GUILevel: int = logging.NOTSET # Messages below this level are not shown on the GUI
+    GUIBatchSize: int = 20 # Most (different) messages shown in one GUI notification
+
+    # GUI logging function names and their levels
+    GUILevels: dict[str, int] = {"CRITICAL": logging.CRITICAL, "EXCEPTION": logging.ERROR,
+                                 "ERROR": logging.ERROR, "WARNING": logging.WARNING,
+                                 "NORMAL": logging.INFO, "DEBUG": logging.DEBUG}
+
+    def __init__(this, name: str, level: int = logging.NOTSET):
+        logging.Logger.__init__(this, name, level)
+        this._guisink = None # (toolkit, its constants module)
+        this._guipending: list[tuple[int, str, str]] = [] # (level, function name, message)
+        this._guischeduled = False
+        this._guilock = threading.Lock()
 
     def UseGUIToolKit(this, toolkit: available_toolkits):
         """Set's the GUI toolkit to use."""
         this.UseToolKit = toolkit
 
+    def GetGUISink(this):
+        """
+        Get the constants module of the GUI toolkit in use (with LOG_* functions).
+        It is imported once per toolkit.
+        """
+        if not this._guisink or this._guisink[0] != this.UseToolKit:
+            this._guisink = (this.UseToolKit, import_module(f"libtextworker.interface.{this.UseToolKit}.constants"))
+        return this._guisink[1]
+
     def CallGUILog(this, name: Literal["CRITICAL", "DEBUG", "ERROR", "EXCEPTION", "NORMAL", "WARNING"], 
-                   msg: object, *args: object):
-        """Call GUI toolkit logging function. Do nothing if not able to."""
+                   msg: object, *args: object, level: int | None = None):
+        """
+        Call GUI toolkit logging function. Do nothing if not able to, or if the message's level
+        is below GUILevel (or the logger's level).
+
+        Messages are queued, and shown together in one notification when the toolkit gets idle
+        (see FlushGUILog).
+
+        @param level: Message level, defaults to the level of name
+        """
 
         if not this.UseToolKit: return
-        do = import_module(f"libtextworker.interface.{this.UseToolKit}.constants")
+        if level is None: level = this.GUILevels[name]
+        if level < this.GUILevel or not this.isEnabledFor(level): return
 
         if args: msg = msg % args
-        getattr(do, "LOG_" + name)(msg)
+
+        with this._guilock:
+            this._guipending.append((level, name, str(msg)))
+            if this._guischeduled: return
+            this._guischeduled = True
+
+        sink = this.GetGUISink()
+        if schedule := getattr(sink, "LOG_SCHEDULE", None):
+            schedule(this.FlushGUILog)
+        else:
+            this.FlushGUILog()
+
+    def FlushGUILog(this):
+        """
+        Show the queued GUI messages now, as one notification made by the function
+        of the most severe one. Repeated messages are shown once, with their count.
+        """
+        with this._guilock:
+            pending, this._guipending = this._guipending, []
+            this._guischeduled = False
+        if not pending: return
+
+        level, name, _msg = max(pending, key=lambda item: item[0])
+
+        counts: dict[str, int] = {}
+        for item in pending:
+            counts[item[2]] = counts.get(item[2], 0) + 1
+        lines = [msg if count == 1 else f"{msg} (x{count})" for msg, count in counts.items()]
+
+        if len(lines) > this.GUIBatchSize:
+            more = len(lines) - this.GUIBatchSize
+            lines = lines[:this.GUIBatchSize] + [_("...and %d more") % more]
+
+        getattr(this.GetGUISink(), "LOG_" + name)("\n".join(lines))
 
     def critical(this, msg: object, *args: object, **kwds):
         super().critical(msg, *args, **kwds)
@@ -68,13 +151,14 @@ class Logger(logging.Logger):
         super().error(msg, *args, **kwds)
         this.CallGUILog("ERROR", msg, *args)
 
-    def exception(this, msg: object, *args: object, **kwds):
-        super().exception(msg, *args, **kwds)
+    def exception(this, msg: object, *args: object, exc_info=True, **kwds):
+        # Not super().exception - it calls this.error, which would show the message again
+        logging.Logger.error(this, msg, *args, exc_info=exc_info, **kwds)
         this.CallGUILog("EXCEPTION", msg, *args)
 
     def log(this, level: int, msg: object, *args: object, **kwds):
         super().log(level, msg, *args, **kwds)
-        this.CallGUILog("NORMAL", msg, *args)
+        this.CallGUILog("NORMAL", msg, *args, level=level)
 
     def warning(this, msg: object, *args: object, **kwds):
         super().warning(msg, *args, **kwds)
@@ -167,6 +251,7 @@ def ResetEveryConfig():
     Will close the app after completed.
     @see TOPLV_DIR
     """
+    import shutil
     if os.path.isdir(TOPLV_DIR):
         shutil.rmtree(TOPLV_DIR)
     CreateDirectory(TOPLV_DIR)
@@ -196,22 +281,156 @@ def test_import(pkgname: str) -> bool:
 
 ## Logging setup
 ## Only for libtextworker!
-logger = Logger("libtextworker", logging.INFO)
-logging.captureWarnings(True)
-formatter = logging.Formatter("[%(asctime)s %(levelname)s] %(message)s")
+class _MakeDirMixin:
+    """
+    For file handlers: also make the log directory, when the file is opened.
+    Used with delay=True, nothing touches the disk until the first record.
+    """
 
-### Log to stream (sys.stdout/stderr)
-strhdlr = logging.StreamHandler()
-strhdlr.setFormatter(formatter)
+    def _open(this):
+        WalkCreation(os.path.dirname(this.baseFilename))
+        return super()._open()
 
-### Log to file
-from time import strftime, localtime
+
+class _LibLogger(Logger):
+    """
+    libtextworker's logger. If setup_logging() has not been called when the first record comes,
+    a stream handler is added (only).
+    """
+
+    def handle(this, record: logging.LogRecord):
+        if not _loghandlers:
+            with _loglock:
+                if not _loghandlers: setup_logging(usequeue=False)
+        Logger.handle(this, record)
+
+
+# Default log format
+formatter = logging.Formatter("[%(asctime)s %(levelname)s] %(message)s")
+
+# Default log file, for setup_logging(logpath)
 logpath = os.path.expanduser(f"~/.logs/libtextworker-{strftime(r'%Y-%m-%d', localtime())}.log")
-CreateDirectory(os.path.dirname(logpath))
-if not os.path.isfile(logpath): open(logpath, "w").write("")
 
-filehdlr = logging.FileHandler(logpath)
-filehdlr.setFormatter(formatter)
+# What setup_logging() did - handlers, queue listener
+_loghandlers: dict[str, object] = {}
+_loglock = threading.RLock()
+_exithook: bool = False
+
+def _WithMakeDir(base: type, made: dict[type, type] = {}) -> type:
+    """
+    Get a subclass of a file handler class which makes its directory (_MakeDirMixin).
+    """
+    if base not in made:
+        made[base] = type(base.__name__, (_MakeDirMixin, base), {})
+    return made[base]
+
+def setup_logging(file: str | None = None, stream: bool = True, level: int | None = None,
+                  rotate: Literal["size", "time"] | None = None, maxbytes: int = 1024 * 1024,
+                  when: str = "midnight", backups: int = 7, usequeue: bool = True):
+    """
+    Set where libtextworker's logger writes to. Replaces the previous setup, if any.
+    Without calling this, libtextworker logs to stderr only (set up on the first record).
+
+    Calling setup_logging(stream=False) turns logging output off.
+
+    @param file: Log file path (e.g general.logpath), None for no file.
+        The file (and its directory) is only made when the first record is written.
+    @param stream: Also log to stderr
+    @param level: Logger level, None to leave as is
+    @param rotate: "size" to rotate the file after maxbytes, "time" to rotate it at `when`
+        (see logging.handlers.TimedRotatingFileHandler), None to never rotate
+    @param maxbytes: Maximum file size for rotate="size"
+    @param when: Rotation interval for rotate="time"
+    @param backups: Number of rotated files to keep
+    @param usequeue: Write records from a background thread (QueueHandler + QueueListener),
+        so that logging callers never wait for the disk
+    @return The QueueListener, if used
+    """
+    if rotate not in ("size", "time", None):
+        raise ValueError(f"Unknown rotation: {rotate}")
+
+    with _loglock:
+        return _SetupLogging(file, stream, level, rotate, maxbytes, when, backups, usequeue)
+
+
+def _SetupLogging(file, stream, level, rotate, maxbytes, when, backups, usequeue):
+    import logging.handlers
+    global _exithook
+
+    # Drop the old setup
+    _StopListener()
+    for hdlr in _loghandlers.get("attached", ()):
+        logger.removeHandler(hdlr)
+    for hdlr in (*_loghandlers.get("attached", ()), *_loghandlers.get("handlers", ())):
+        hdlr.close()
+    _loghandlers.clear()
+
+    if level is not None:
+        logger.setLevel(level)
+
+    handlers = []
+
+    if stream:
+        strhdlr = logging.StreamHandler()
+        strhdlr.setFormatter(formatter)
+        handlers.append(strhdlr)
+        _loghandlers["strhdlr"] = strhdlr
+
+    if file:
+        if rotate == "size":
+            filehdlr = _WithMakeDir(logging.handlers.RotatingFileHandler)(
+                file, maxBytes=maxbytes, backupCount=backups, delay=True)
+        elif rotate == "time":
+            filehdlr = _WithMakeDir(logging.handlers.TimedRotatingFileHandler)(
+                file, when=when, backupCount=backups, delay=True)
+        else:
+            filehdlr = _WithMakeDir(logging.FileHandler)(file, delay=True)
+
+        filehdlr.setFormatter(formatter)
+        handlers.append(filehdlr)
+        _loghandlers["filehdlr"] = filehdlr
+
+    if not handlers:
+        # Nothing to log to - also stops logging's "last resort" handler
+        attached = [logging.NullHandler()]
+
+    elif usequeue:
+        import queue
+        import atexit
+
+        records = queue.SimpleQueue()
+        listener = logging.handlers.QueueListener(records, *handlers, respect_handler_level=True)
+        listener.start()
+        attached = [logging.handlers.QueueHandler(records)]
+        _loghandlers["listener"] = listener
+
+        # Write the remaining records on exit
+        if not _exithook:
+            atexit.register(_StopListener)
+            _exithook = True
+
+    else:
+        attached = handlers
+
+    for hdlr in attached:
+        logger.addHandler(hdlr)
+    _loghandlers["attached"] = attached
+    _loghandlers["handlers"] = handlers
+    return _loghandlers.get("listener")
+
 
-logger.addHandler(strhdlr)
-logger.addHandler(filehdlr)
\ No newline at end of file
+def _StopListener():
+    # The listener may have been stopped by the app already
+    if (listener := _loghandlers.pop("listener", None)) and listener._thread:
+        listener.stop()
+
+
+def __getattr__(name: str):
+    # Handlers made by setup_logging(), None if not (yet) made
+    if name in ("strhdlr", "filehdlr"):
+        return _loghandlers.get(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+logger = _LibLogger("libtextworker", logging.INFO)
+logging.captureWarnings(True)
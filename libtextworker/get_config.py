@@ -10,9 +10,12 @@ See the documentation in /usage/getconfig.
 #	This is a part of the libtextworker project.
 #	Licensed under the GNU General Public License version 3.0 or later.
 
+import hashlib
 import json
 import os
+import threading
 import typing
+import weakref
 
 from .general import Importable, WalkCreation, libTewException
 from warnings import warn
@@ -21,14 +24,14 @@ __all__ = ["ConfigurationError", "GetConfig"]
 
 if Importable["commentedconfigparser"]:
     from commentedconfigparser import CommentedConfigParser as ConfigParser
+    from configparser import Error as ConfigParserError, SectionProxy
 elif Importable["configparser"]:
-    from configparser import ConfigParser
+    from configparser import ConfigParser, Error as ConfigParserError, SectionProxy
 else:
     warn("GetConfig is only able to use JSON files - required dependency for INI is not installed")
 
-if Importable["watchdog"]:
-    from watchdog.observers import Observer
-    from watchdog.events import *
+if typing.TYPE_CHECKING:
+    from watchdog.events import FileSystemEvent
 
 
 class ConfigurationError(libTewException):
@@ -66,6 +69,18 @@ class GetConfig(ConfigParser):
     # Use watchdog for file events watching
     addWatchDog: bool
 
+    # Subscription to the watch hub (internal variable)
+    _watch = None
+
+    # Memo of Get() and Get*() results, keyed by (section, option, raw or type) (internal variable)
+    _memo: dict[tuple, typing.Any]
+
+    # Bumped when aliases change - memos made before are dropped (internal variable)
+    _aliasgen: int = 0
+
+    # Seconds to wait after the last file event before reloading (watch mode)
+    ReloadDelay: float = 0.25
+
     
     def __init__(this, defaults: dict[str] | str | None, load: str | dict[str],
                  watchChanges: bool = False, **kwds):
@@ -77,6 +92,14 @@ class GetConfig(ConfigParser):
         @param watchChanges: Reread file if there are any changes to the file
         """
 
+        this._memo = {}
+        this._memogen = GetConfig._aliasgen
+        this._kwds = kwds
+        this._lock = threading.RLock()
+        this._subscribers = []
+        this._reloadtimer: threading.Timer | None = None
+        this._diskstate: tuple[int, int, bytes] | None = None
+        this._encoding = "utf8"
         ConfigParser.__init__(this, **kwds)
 
         if isinstance(defaults, str):
@@ -90,6 +113,8 @@ class GetConfig(ConfigParser):
             this.OEM = defaults.copy()
             
         this.addWatchDog = watchChanges and Importable['watchdog']
+        if watchChanges and not this.addWatchDog:
+            warn("watchdog module cannot be imported - file system watching wont work.")
 
         # For getboolean
         for yes in this.yes_values:
@@ -101,11 +126,6 @@ class GetConfig(ConfigParser):
                 this.BOOLEAN_STATES[no] = False
                 this.aliases[no] = False
 
-        if this.addWatchDog:
-            this._evtHdlr = FileSystemEventHandler()
-            this._evtHdlr.on_any_event = this.on_any_event
-
-            this._observer: Observer # type: ignore
 
         if isinstance(load, str):
             try:
@@ -121,11 +141,45 @@ class GetConfig(ConfigParser):
         Destructor.
         """
 
-        if this.addWatchDog:
-            if this._observer.is_alive():
-                this._observer.stop()
-                this._observer.join()
+        if this._reloadtimer: this._reloadtimer.cancel()
+
+        if this._watch: this._watch.Cancel()
     
+    """
+    Anything that changes values drops the memo of Get().
+    """
+
+    def read(this, filenames, encoding: str | None = None) -> list[str]:
+        try:
+            return ConfigParser.read(this, filenames, encoding)
+        finally:
+            this._memo.clear()
+
+    def read_file(this, f: typing.Iterable[str], source: str | None = None):
+        try:
+            ConfigParser.read_file(this, f, source)
+        finally:
+            this._memo.clear()
+
+    def read_dict(this, dictionary: dict, source: str = "<dict>"):
+        try:
+            ConfigParser.read_dict(this, dictionary, source)
+        finally:
+            this._memo.clear()
+
+    def set(this, section: str, option: str, value: str | None = None):
+        ConfigParser.set(this, section, option, value)
+        # Other values may refer to this one (interpolation)
+        this._memo.clear()
+
+    def remove_option(this, section: str, option: str) -> bool:
+        this._memo.clear()
+        return ConfigParser.remove_option(this, section, option)
+
+    def remove_section(this, section: str) -> bool:
+        this._memo.clear()
+        return ConfigParser.remove_section(this, section)
+
     def read_string(this, string: str):
         """
         Reads a string. String in dictionary/JSON style is supported.
@@ -153,11 +207,16 @@ class GetConfig(ConfigParser):
 
         this.read(file, encoding)
         this._file = file
+        this._encoding = encoding
+        this._diskstate = this._DiskState(file)
 
         if this.addWatchDog:
-            this._observer = Observer()
-            this._observer.schedule(this._evtHdlr, file)
-            this._observer.start()
+            from .watch import Watch, Unwatch # Imports watchdog, only needed here
+
+            # Weak, so that the hub does not keep this object alive
+            handler = weakref.WeakMethod(this.on_any_event)
+            Unwatch(this._watch)
+            this._watch = Watch(file, lambda event: (func := handler()) and func(event))
 
 
     def Reset(this, restore: bool, backupdelimiter: str = "->"):
@@ -261,6 +320,8 @@ class GetConfig(ConfigParser):
             this.no_values.append(novalue)
             this.aliases[novalue] = False
 
+        GetConfig._aliasgen += 1
+
     def Alias(this, value: str, value2):
         """
         Makes an alias.
@@ -274,6 +335,7 @@ class GetConfig(ConfigParser):
         @see AliasBoolean
         """
         this.aliases[value] = value2
+        GetConfig._aliasgen += 1
     
     def Set_And_Update(this, section: str, option: str, value: str | None = None):
         """
@@ -335,8 +397,18 @@ class GetConfig(ConfigParser):
         @param noraise: Do not show any exceptions, either from GetConfig or Get.
 
         @since 0.1.4 Rename+remove parameters and simplify code. Renamed function from getkey to Get.
+
+        Values found in `self` are memorized until they (or aliases) change.
         """
 
+        if this._memogen != GetConfig._aliasgen:
+            this._memo.clear()
+            this._memogen = GetConfig._aliasgen
+
+        key = (section, this.optionxform(option), bool(raw))
+        if key in this._memo:
+            return this._memo[key]
+
         def bringitback():
             target = this._backups if this._backups else this.OEM
             value_: typing.Any
@@ -364,45 +436,209 @@ class GetConfig(ConfigParser):
 
             return value_
 
-        try:
-            value: str = this.get(section, option)
-        except Exception as e:
-            if not noraise: raise e
-            if not find_everywhere: return None
+        # Hold the lock, so that a reload can't swap values in the middle
+        with this._lock:
+            memorize = True
+            try:
+                value: str = this.get(section, option)
+            except Exception as e:
+                if not noraise: raise e
+                if not find_everywhere: return None
+
+                try:
+                    value = bringitback()
+                    memorize = False
+                except Exception as exp:
+                    if not noraise: raise exp
+                    return None
+
+            # Remove ' / "
+            for quote in ("'", '"'):
+                value = value.removeprefix(quote).removesuffix(quote)
+
+            if (not value in this.aliases) or (raw is True):
+                result = value
+            else:
+                result = this.aliases[value]
+
+            if memorize: this._memo[key] = result
+            return result
+
+    def _GetConverted(this, section: str, option: str, kind: str,
+                      convert: typing.Callable[[str], typing.Any], kwds: dict) -> typing.Any | None:
+        """
+        Get a raw value, convert it and memorize the result.
+        Conversion errors (ValueError) become ConfigurationError.
+        """
+        key = (section, this.optionxform(option), kind)
+        if key in this._memo and this._memogen == GetConfig._aliasgen:
+            return this._memo[key]
+
+        with this._lock:
+            value = this.Get(section, option, True, **kwds)
+            if value is None: return None
 
             try:
-                value = bringitback()
-            except Exception as exp:
-                if not noraise: raise exp
-                return None
+                result = convert(value)
+            except ValueError as e:
+                raise ConfigurationError(getattr(this, "_file", ""), str(e), section, option, value) from e
 
-        # Remove ' / "
-        trans = ["'", '"']
-        for key in trans:
-            value = value.removeprefix(key).removesuffix(key)
+            if this.has_option(section, option): this._memo[key] = result
+            return result
 
-        if (not value in this.aliases) or (raw is True):
-            return value
-        else:
-            return this.aliases[value]
+    def GetInt(this, section: str, option: str, **kwds) -> int | None:
+        """
+        Get a value as an integer.
+        @param kwds: Get() parameters (find_everywhere, write_to_self, noraise)
+        @raise ConfigurationError: The value is not an integer
+        """
+        return this._GetConverted(section, option, "int", int, kwds)
+
+    def GetBool(this, section: str, option: str, **kwds) -> bool | None:
+        """
+        Get a value as a boolean, using yes_values/no_values and boolean aliases.
+        @param kwds: Get() parameters (find_everywhere, write_to_self, noraise)
+        @raise ConfigurationError: The value is not a boolean
+        """
+        def convert(value: str) -> bool:
+            if value.lower() in this.yes_values: return True
+            if value.lower() in this.no_values: return False
+            if isinstance(this.aliases.get(value), bool): return this.aliases[value]
+            raise ValueError("Not a boolean value")
+
+        return this._GetConverted(section, option, "bool", convert, kwds)
+
+    def GetHexColor(this, section: str, option: str, **kwds) -> str | None:
+        """
+        Get a color value (#rgb, #rrggbb or "r, g, b") as a #rrggbb string.
+        @param kwds: Get() parameters (find_everywhere, write_to_self, noraise)
+        @raise ConfigurationError: The value is not a color
+        """
+        def convert(value: str) -> str:
+            value = value.strip()
+            if value.startswith("#") and len(value) in (4, 7):
+                digits = value[1:] if len(value) == 7 else "".join(c * 2 for c in value[1:])
+                int(digits, 16)
+                return "#" + digits.lower()
+
+            rgb = [int(part) for part in value.removeprefix("(").removesuffix(")").split(",")]
+            if len(rgb) != 3 or not all(0 <= part <= 255 for part in rgb):
+                raise ValueError("Not a color value")
+            return "#{:02x}{:02x}{:02x}".format(*rgb)
+
+        return this._GetConverted(section, option, "color", convert, kwds)
         
+    """
+    Hot reload.
+    """
+
+    def Subscribe(this, func: typing.Callable[["GetConfig", dict[tuple[str, str], tuple[str | None, str | None]]], typing.Any]):
+        """
+        Call a function after each reload which changed something.
+        The function receives this GetConfig and the changes: {(section, option): (old value, new value)},
+            a value is None if the option did not exist.
+        It runs on the reload thread - GUI code should pass the work to its main loop (CallAfter, after...).
+        """
+        this._subscribers.append(func)
+
+    def Unsubscribe(this, func: typing.Callable):
+        if func in this._subscribers:
+            this._subscribers.remove(func)
+
+    @staticmethod
+    def _DiskState(path: str) -> tuple[int, int, bytes]:
+        stat = os.stat(path)
+        with open(path, "rb") as f:
+            return stat.st_size, stat.st_mtime_ns, hashlib.blake2b(f.read()).digest()
+
+    def _Values(this, parser: ConfigParser) -> dict[tuple[str, str], str]:
+        values = {(parser.default_section, option): value for option, value in parser._defaults.items()}
+        for section, options in parser._sections.items():
+            values.update(((section, option), value) for option, value in options.items())
+        return values
+
+    def ScheduleReload(this):
+        """
+        Reload the file once no more calls to this have been made for ReloadDelay seconds.
+        Bursts of file events (editors often write a file in several steps) make one reload.
+        """
+        with this._lock:
+            if this._reloadtimer: this._reloadtimer.cancel()
+            this._reloadtimer = threading.Timer(this.ReloadDelay, this.Reload)
+            this._reloadtimer.daemon = True
+            this._reloadtimer.start()
+
+    def Reload(this, force: bool = False) -> dict | None:
+        """
+        Read the file again, if its size, modification time or content hash has changed (or force is True).
+        The file is parsed into a new parser, then swapped in at once - Get() never sees a half-read file.
+        An invalid file is ignored (with a warning), the current values stay.
+        @return The changes (see Subscribe), None if nothing has been reloaded
+        """
+        path = this._file
+        try:
+            stat = os.stat(path)
+            if not force and this._diskstate and (stat.st_size, stat.st_mtime_ns) == this._diskstate[:2]:
+                return None
+
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+
+        state = (stat.st_size, stat.st_mtime_ns, hashlib.blake2b(data).digest())
+        if not force and this._diskstate and state[2] == this._diskstate[2]:
+            this._diskstate = state
+            return None
+
+        fresh = ConfigParser(**this._kwds)
+        try:
+            fresh.read_string(data.decode(this._encoding), path)
+        except (ConfigParserError, UnicodeDecodeError) as e:
+            warn(f"Unable to reload {path}: {e}")
+            return None
+
+        new = this._Values(fresh)
+        proxies = {this.default_section: this._proxies[this.default_section]}
+        proxies.update((section, SectionProxy(this, section)) for section in fresh._sections)
+
+        with this._lock:
+            old = this._Values(this)
+            this._sections = fresh._sections
+            this._defaults = fresh._defaults
+            this._proxies = proxies
+            if hasattr(fresh, "_comment_map"):
+                this._comment_map = fresh._comment_map
+            this._memo.clear()
+            this._diskstate = state
+
+        changes = {key: (old.get(key), new.get(key)) for key in old.keys() | new.keys()
+                   if old.get(key) != new.get(key)}
+        if changes:
+            for func in list(this._subscribers):
+                func(this, changes)
+        return changes
+
     """
     FileSystemEventHandler
     """
 
-    if Importable["watchdog"]:
-        def on_any_event(this, event: FileSystemEvent):
-            assert this._file, "GetConfig._file is empty"
+    def on_any_event(this, event: "FileSystemEvent"):
+        # Event types are checked by name, so that watchdog is not imported until watching starts
+        assert this._file, "GetConfig._file is empty"
+        if event.is_directory: return
+        file = os.path.abspath(this._file) # Event paths are absolute
 
-            if event.src_path != this._file: # Watchdog also catches events from other files
-                return
+        # Editors often save by moving a new file over the old one
+        if event.event_type == "moved" and event.dest_path == file:
+            return this.ScheduleReload()
 
-            if isinstance(event, (FileModifiedEvent, FileCreatedEvent)):
-                this.read_file(event.src_path)
-            elif isinstance(event, (FileOpenedEvent, FileClosedEvent)):
-                return
-            else:
-                warn(f"{event.src_path} has gone!")
-    else:
-        def on_any_event(this, event):
-            raise NotImplementedError("Watchdog module is not usable")
\ No newline at end of file
+        if event.src_path != file: # The hub also hands over moves from/to other files
+            return
+
+        if event.event_type in ("modified", "created"):
+            this.ScheduleReload()
+        elif event.event_type in ("opened", "closed", "closed_no_write"):
+            return
+        else:
+            warn(f"{event.src_path} has gone!")
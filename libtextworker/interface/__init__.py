@@ -75,5 +75,11 @@ colors = \
     "black"         : "#000000"
 }
 
-from libtextworker.general import test_import
-test_import("darkdetect")
\ No newline at end of file
+# darkdetect (auto coloring) is checked when needed - see libtextworker.Importable
+
+def __getattr__(name: str):
+    # Submodules are only imported when used
+    if name in ("base", "manager", "tk", "wx"):
+        from importlib import import_module
+        return import_module(f".{name}", __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
\ No newline at end of file
@@ -9,9 +9,18 @@
 # 	Licensed under the GNU General Public License version 3.0 or later.
 
 import os
+import re
+import stat
+import threading
+import time
+from array import array
+from bisect import bisect
+from fnmatch import translate
 from libtextworker.general import libTewException
-from typing import Callable, Literal, Any
+from queue import Empty, SimpleQueue
+from typing import Callable, Literal, Any, Iterator, NamedTuple
 from . import DC_FLAGS, WidgetBase
+from ... import _
 
 __all__ = (
     "DC_ONEROOT",
@@ -21,7 +30,17 @@ __all__ = (
     "DC_DIRONLY",
     "DC_RIGHTCL",
     "DC_USEICON",
-    "DirCtrlBase"
+    "DirCtrlBase",
+    "DirItem",
+    "ScanDir",
+    "HasChildren",
+    "DirLoader",
+    "SortKey",
+    "SortedInsert",
+    "PathKey",
+    "SizeFormat",
+    "DirColumns",
+    "DirModel",
 )
 
 DC_ONEROOT = DC_FLAGS.DC_ONEROOT
@@ -33,6 +52,395 @@ DC_RIGHTCL = DC_FLAGS.DC_RIGHTCL
 DC_USEICON = DC_FLAGS.DC_USEICON
 
 
+"""
+Directory enumeration.
+All widgets here list directories through ScanDir(), which uses os.scandir:
+the item type comes with the listing itself on most platforms (no extra isdir()/stat() per item),
+and stat data is fetched once per item, only when asked for.
+"""
+
+class DirItem(NamedTuple):
+    """
+    A directory item, as ScanDir() yields.
+    Size and MTime are 0 unless stats were asked for. Size is always 0 for directories.
+    """
+
+    Name: str
+    Path: str
+    IsDir: bool
+    Size: int = 0
+    MTime: float = 0
+
+
+def PathKey(path: str) -> str:
+    """
+    Normalize a path for use as a dictionary key: absolute, normalized, case-folded where
+    the file system does (Windows), so that one file always gets the same key.
+    """
+    return os.path.normcase(os.path.abspath(path))
+
+
+def _isdir(entry: os.DirEntry) -> bool:
+    try:
+        return entry.is_dir()
+    except OSError:
+        return False
+
+
+def ScanDir(path: str, dironly: bool = False, stats: bool = False) -> Iterator[DirItem]:
+    """
+    List a directory, in the order the file system gives.
+    @param path: Target directory
+    @param dironly: Skip everything but directories
+    @param stats: Also get size and last modified time of items
+    @raise OSError: path can't be listed (e.g permission denied)
+    """
+    with os.scandir(path) as entries:
+        for entry in entries:
+            isdir = _isdir(entry)
+            if dironly and not isdir: continue
+            if not stats:
+                yield DirItem(entry.name, entry.path, isdir)
+                continue
+
+            try:
+                info = entry.stat()
+            except OSError: # Broken symlink - use the link itself
+                try:
+                    info = entry.stat(follow_symlinks=False)
+                except OSError: # Gone already
+                    continue
+            yield DirItem(entry.name, entry.path, isdir,
+                          0 if stat.S_ISDIR(info.st_mode) else info.st_size, info.st_mtime)
+
+
+def HasChildren(path: str, dironly: bool = False) -> bool:
+    """
+    Check if a directory has anything (or any directory if dironly is True) inside.
+    Stops at the first match, instead of listing the whole directory.
+    Unreadable directories have no children.
+    """
+    try:
+        with os.scandir(path) as entries:
+            return any(_isdir(entry) for entry in entries) if dironly else next(entries, None) is not None
+    except OSError:
+        return False
+
+
+def SortKey(name: str, isdir: bool) -> tuple:
+    """
+    Sort key of tree items: folders first, then names (case-insensitive).
+    """
+    return (not isdir, name.casefold(), name)
+
+
+def SortedInsert(keys: list[tuple], name: str, isdir: bool) -> int:
+    """
+    Add the key of an item to sorted keys (see SortKey), and get the position to insert the item at.
+    @param keys: Keys of the items already there, in order. Updated in place
+    """
+    key = SortKey(name, isdir)
+    index = bisect(keys, key)
+    keys.insert(index, key)
+    return index
+
+
+class DirLoader:
+    """
+    Lists a directory in a worker thread, for filling a DirCtrl node.
+
+    Like SearchEngine, the worker never touches the GUI: items are queued in batches,
+    and Poll() - called from the GUI thread - hands them to the found callback.
+    Each item comes with whether it can be expanded, and Place() tells where to insert it
+    so that the node stays sorted (directories first, then by name) as batches arrive.
+    """
+
+    Cancelled: bool = False
+    Done: bool = False
+    Error: OSError | None = None
+
+    def __init__(this, path: str, found: Callable[[list[tuple[DirItem, bool]]], Any],
+                 finished: Callable[["DirLoader"], Any] | None = None,
+                 dironly: bool = False, probe: bool = False, batchsize: int = 500,
+                 wakeup: Callable[[], Any] | None = None):
+        """
+        Constructor. Call Start() to begin.
+        @param path: Target directory
+        @param found: Called with each batch of (item, expandable) pairs
+        @param finished: Called when listing is done (or failed - see Error)
+        @param dironly: List directories only
+        @param probe: Check whether directories have children (HasChildren). Otherwise all directories are expandable
+        @param batchsize: Items per batch
+        @param wakeup: Called after each queued batch. Runs on the worker thread! Use it to schedule Poll()
+        """
+        this.Path = path
+        this.Found = found
+        this.Finished = finished
+        this.DirOnly = dironly
+        this.Probe = probe
+        this.BatchSize = batchsize
+        this.Wakeup = wakeup
+
+        this.Keys: list[tuple] = []
+        this._queue = SimpleQueue()
+        this._thread = threading.Thread(target=this._scan, daemon=True)
+
+    def Start(this) -> "DirLoader":
+        this._thread.start()
+        return this
+
+    def Cancel(this):
+        """
+        Stop listing. Nothing is delivered after this.
+        """
+        this.Cancelled = True
+
+    @property
+    def Pending(this) -> bool:
+        """
+        Whether there is something to Poll().
+        """
+        return not this._queue.empty()
+
+    def Place(this, item: DirItem) -> int:
+        """
+        Get the position to insert item at, among the items placed before.
+        """
+        return SortedInsert(this.Keys, item.Name, item.IsDir)
+
+    def _put(this, batch: list | None):
+        this._queue.put(batch)
+        if this.Wakeup: this.Wakeup()
+
+    def _scan(this):
+        batch = []
+
+        try:
+            for item in ScanDir(this.Path, this.DirOnly):
+                if this.Cancelled: return
+                batch.append((item, item.IsDir and (not this.Probe or HasChildren(item.Path, this.DirOnly))))
+                if len(batch) >= this.BatchSize:
+                    this._put(batch)
+                    batch = []
+        except OSError as e:
+            this.Error = e
+        finally:
+            if not this.Cancelled:
+                this._put(batch)
+                this._put(None)
+
+    def Poll(this, limit: int = 1) -> bool:
+        """
+        Deliver queued batches. Call this from the GUI thread.
+        @param limit: Deliver at most this many batches - keep it small, so that the GUI stays responsive
+        @return True if the loader is still working (so Poll() should be called again later)
+        """
+        while limit > 0 and not this.Cancelled:
+            try:
+                batch = this._queue.get_nowait()
+            except Empty:
+                break
+
+            if batch is None:
+                this.Done = True
+                if this.Finished: this.Finished(this)
+            elif batch:
+                limit -= 1
+                this.Found(batch)
+
+        return not (this.Done or this.Cancelled)
+
+
+# By default os.path.getsize/os.stat.st_size output will return a value in bytes
+# So this is how we convert it to other units
+# *from SO: a/1094933*
+def SizeFormat(num: float, suffix: str = "B") -> str:
+    for unit in ("", "Ki", "Mi", "Gi", "Ti", "Pi", "Ei", "Zi"):
+        if abs(num) < 1024.0:
+            return f"{num:3.1f}{unit}{suffix}"
+        num /= 1024.0
+    return f"{num:.1f}Yi{suffix}"
+
+
+class DirColumns:
+    """
+    Items of a directory for DirList, stored column by column: names in a list,
+    types, sizes and last modified times in arrays - far smaller than a tuple (or a native
+    list control row) per item. Text for the list columns is made only when asked for (Text(), Row()),
+    that is for the rows on screen.
+    """
+
+    TimeFormat: str = "%d %b %Y, %H:%M:%S"
+
+    def __init__(this):
+        this.Clear()
+
+    def Clear(this):
+        this.Path = ""
+        this.Names: list[str] = []
+        this.IsDir = array("B")
+        this.Sizes = array("q")
+        this.MTimes = array("d")
+
+    def Load(this, path: str, dironly: bool = False) -> "DirColumns":
+        """
+        List a directory (replacing what was here).
+        @raise OSError: path can't be listed
+        """
+        this.Clear()
+        this.Path = path
+        for item in ScanDir(path, dironly, stats=True):
+            this.Names.append(item.Name)
+            this.IsDir.append(item.IsDir)
+            this.Sizes.append(item.Size)
+            this.MTimes.append(item.MTime)
+        return this
+
+    def __len__(this):
+        return len(this.Names)
+
+    def GetPath(this, row: int) -> str:
+        return os.path.join(this.Path, this.Names[row])
+
+    def Text(this, row: int, column: int) -> str:
+        """
+        Text of a cell. Columns: name, item type, last modified, size.
+        """
+        if column == 0:
+            return this.Names[row]
+        if column == 1:
+            return _("Folder") if this.IsDir[row] else _("File")
+        if column == 2:
+            return time.strftime(this.TimeFormat, time.localtime(this.MTimes[row]))
+        return "" if this.IsDir[row] else SizeFormat(this.Sizes[row])
+
+    def Row(this, row: int) -> tuple[str, str, str, str]:
+        return tuple(this.Text(row, column) for column in range(4))
+
+
+class DirModel:
+    """
+    A sorted and filtered view of a DirColumns (Store), which DirList shows. Rows of the view
+    are mapped to Store rows with Map().
+
+    Each sort order is made once per listing (O(n log n)) and kept as an array of Store rows;
+    descending order reads it backwards. Each filter is made once too (O(n)) and kept as a mask,
+    and so are the views (sort order + filter) - going back to a previous sort or filter is a lookup.
+    Everything is dropped when a directory is loaded.
+    """
+
+    SortColumn: int = 0
+    Reverse: bool = False
+    CacheSize: int = 16 # Filter masks and views to keep
+
+    def __init__(this, store: DirColumns | None = None):
+        this.Store = store or DirColumns()
+        this.FilterKey: tuple | None = None # (pattern, regex, case, keepdirs)
+        this.Reset()
+
+    def Reset(this):
+        """
+        Forget cached sort orders, masks and views. Call this after changing Store.
+        """
+        this._orders: dict[int, array] = {}
+        this._masks: dict[tuple, bytearray] = {}
+        this._views: dict[tuple, array] = {}
+        this._view = this._GetView()
+
+    def Load(this, path: str, dironly: bool = False) -> "DirModel":
+        """
+        List a directory, keeping the current sort order and filter.
+        @raise OSError: path can't be listed
+        """
+        this.Store.Load(path, dironly)
+        this.Reset()
+        return this
+
+    def _SortKey(this, column: int) -> Callable[[int], Any]:
+        names, isdir, sizes, mtimes = this.Store.Names, this.Store.IsDir, this.Store.Sizes, this.Store.MTimes
+        if column == 2:
+            return mtimes.__getitem__
+        if column == 3:
+            return lambda i: (not isdir[i], sizes[i])
+        return lambda i: (not isdir[i], names[i].casefold()) # Name, item type: folders first
+
+    def _GetOrder(this, column: int) -> array:
+        if column not in this._orders:
+            this._orders[column] = array("L", sorted(range(len(this.Store)), key=this._SortKey(column)))
+        return this._orders[column]
+
+    def _GetMask(this, key: tuple) -> bytearray:
+        if key not in this._masks:
+            pattern, regex, case, keepdirs = key
+            compiled = re.compile(pattern if regex else translate(pattern), 0 if case else re.IGNORECASE)
+            # translate() only anchors the end: globs must match from the start of names
+            match = compiled.search if regex else compiled.match
+            isdir = this.Store.IsDir
+            this._masks[key] = bytearray((keepdirs and isdir[i]) or match(name) is not None
+                                         for i, name in enumerate(this.Store.Names))
+            this._Trim(this._masks)
+        return this._masks[key]
+
+    def _GetView(this) -> array:
+        key = (this.SortColumn, this.FilterKey)
+        if key not in this._views:
+            order = this._GetOrder(this.SortColumn)
+            if this.FilterKey:
+                mask = this._GetMask(this.FilterKey)
+                order = array("L", (i for i in order if mask[i]))
+            this._views[key] = order
+            this._Trim(this._views)
+        return this._views[key]
+
+    def _Trim(this, cache: dict):
+        while len(cache) > this.CacheSize:
+            del cache[next(iter(cache))]
+
+    def SortBy(this, column: int, reverse: bool | None = None):
+        """
+        Sort by a column (name, item type, last modified, size).
+        @param reverse: Descending order. If not specified: toggle it when column is the current one
+        """
+        if reverse is None:
+            reverse = not this.Reverse if column == this.SortColumn else False
+        this.SortColumn, this.Reverse = column, reverse
+        this._view = this._GetView()
+
+    def Filter(this, pattern: str | None = None, regex: bool = False, case: bool = False, keepdirs: bool = True):
+        """
+        Show only items whose names match pattern.
+        @param pattern: A glob pattern (e.g *.py), or a regular expression if regex is True. None or empty shows everything
+        @param case: Case sensitive
+        @param keepdirs: Always show directories (so the user can still navigate)
+        @raise re.error: Invalid regular expression
+        """
+        key = (pattern, regex, case, keepdirs) if pattern else None
+        if key: this._GetMask(key) # Errors out here, not leaving a broken filter
+        this.FilterKey = key
+        this._view = this._GetView()
+
+    def __len__(this):
+        return len(this._view)
+
+    def Map(this, row: int) -> int:
+        """
+        Get the Store row of a view row.
+        """
+        return this._view[len(this._view) - 1 - row] if this.Reverse else this._view[row]
+
+    def Text(this, row: int, column: int) -> str:
+        return this.Store.Text(this.Map(row), column)
+
+    def Row(this, row: int) -> tuple[str, str, str, str]:
+        return this.Store.Row(this.Map(row))
+
+    def IsFolder(this, row: int) -> bool:
+        return bool(this.Store.IsDir[this.Map(row)])
+
+    def GetPath(this, row: int) -> str:
+        return this.Store.GetPath(this.Map(row))
+
+
 class DirCtrlBase(WidgetBase):
     """
     A directory tree.
@@ -119,12 +527,5 @@ class DirCtrlBase(WidgetBase):
             this.History.append(path)
             this.HistoryIdx = len(this.History)
 
-    # By default os.path.getsize/os.stat.st_size output will return a value in bytes
-    # So this is how we convert it to other units
-    # *from SO: a/1094933*
     def sizeof_fmt(this, num, suffix="B"):
-        for unit in ("", "Ki", "Mi", "Gi", "Ti", "Pi", "Ei", "Zi"):
-            if abs(num) < 1024.0:
-                return f"{num:3.1f}{unit}{suffix}"
-            num /= 1024.0
-        return f"{num:.1f}Yi{suffix}"
+        return SizeFormat(num, suffix)
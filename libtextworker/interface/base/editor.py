@@ -0,0 +1,486 @@
+"""
+@package libtextworker.interface.base.editor
+@brief The base of StyledTextControl - toolkit-independent buffer helpers
+"""
+
+# 	A cross-platform library for Python apps.
+# 	Copyright (C) 2023-2024 Le Bao Nguyen and contributors.
+# 	This is a part of the libtextworker project.
+# 	Licensed under the GNU General Public License version 3.0 or later.
+
+import codecs
+import io
+import mmap
+import os
+import tempfile
+
+from enum import Flag, auto
+from typing import Any, Callable, Generator, Iterator
+
+__all__ = (
+    "AtomicWriter",
+    "BufferHash",
+    "CHUNK_SIZE",
+    "DirtyTracker",
+    "FileFingerprint",
+    "HASH_MOD",
+    "HashFile",
+    "IdleJob",
+    "JoinHash",
+    "MOD_BUFFER",
+    "MOD_DISK",
+    "MOD_NONE",
+    "MODIFIED",
+    "PolyHash",
+    "ReadChunks",
+    "StreamLoad",
+)
+
+# Default chunk size (in bytes) for reading/writing files
+CHUNK_SIZE = 1 << 20
+
+# Modulus of the hashes below.
+# This is the largest prime under 2^128, so powers of 256 don't repeat any time soon.
+HASH_MOD = (1 << 128) - 159
+
+
+def PolyHash(data: bytes) -> int:
+    """
+    Hash a byte string as a base-256 polynomial, modulo HASH_MOD.
+    Unlike md5 & co, two hashes can be joined together (JoinHash),
+    which is what allows updating only a part of a buffer.
+    """
+    return int.from_bytes(data, "big") % HASH_MOD
+
+
+def JoinHash(left: int, right: int, rightsize: int) -> int:
+    """
+    Get the PolyHash of (left's data + right's data).
+    @param left, right (int): PolyHash outputs
+    @param rightsize (int): Size (in bytes) of the right data
+    """
+    return (left * pow(256, rightsize, HASH_MOD) + right) % HASH_MOD
+
+
+class BufferHash:
+    """
+    A hashlib-like object which produces the same digests as DirtyTracker.
+    Use this to hash file contents, strings etc. to compare with an editor's Hash.
+    """
+
+    def __init__(this, data: bytes = b""):
+        this._hash = 0
+        this._size = 0
+        if data: this.update(data)
+
+    def update(this, data: bytes):
+        this._hash = JoinHash(this._hash, PolyHash(data), len(data))
+        this._size += len(data)
+
+    def intdigest(this) -> int:
+        # Put a virtual 0x01 byte in front, else leading NULs would not count
+        return JoinHash(1, this._hash, this._size)
+
+    def digest(this) -> bytes:
+        return this.intdigest().to_bytes(16, "big")
+
+    def hexdigest(this) -> str:
+        return this.digest().hex()
+
+
+def ReadChunks(path: str, chunksize: int = CHUNK_SIZE, encoding: str = "utf-8",
+               newline: str | None = None, use_mmap: bool = False) -> Iterator[tuple[str, int, int]]:
+    """
+    Read a text file chunk by chunk.
+    Multi-byte characters split between 2 chunks are handled.
+
+    @param path: Target file
+    @param chunksize: Size of each chunk, in bytes
+    @param encoding: File encoding
+    @param newline: Like open()'s newline - None translates all line endings to \\n, "" keeps them
+    @param use_mmap: Memory-map the file instead of read() calls
+    @return Iterator of (text, read bytes, file size)
+    """
+    decoder = codecs.getincrementaldecoder(encoding)()
+    if newline is None:
+        decoder = io.IncrementalNewlineDecoder(decoder, translate=True)
+
+    with open(path, "rb") as f:
+        total = os.fstat(f.fileno()).st_size
+        done = 0
+
+        if use_mmap and total:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                while done < total:
+                    data = mapped[done:done + chunksize]
+                    done += len(data)
+                    yield decoder.decode(data, done >= total), done, total
+            return
+
+        while data := f.read(chunksize):
+            done += len(data)
+            yield decoder.decode(data), done, total
+
+        if rest := decoder.decode(b"", True):
+            yield rest, done, total
+
+
+def HashFile(path: str, encoding: str = "utf-8", newline: str | None = None) -> BufferHash:
+    """
+    Hash a file's text the same way editors hash their buffers.
+    The file is read chunk by chunk.
+    @see ReadChunks
+    """
+    result = BufferHash()
+    for text, _, _ in ReadChunks(path, encoding=encoding, newline=newline):
+        result.update(text.encode(encoding))
+    return result
+
+
+def StreamLoad(path: str, write: Callable[[str], Any], chunksize: int = CHUNK_SIZE,
+               encoding: str = "utf-8", newline: str | None = None,
+               use_mmap: bool = False) -> Generator[tuple[int, int], None, BufferHash]:
+    """
+    Feed a file's text to `write` chunk by chunk, hashing it in the same pass.
+    This is a generator, yielding (read bytes, file size) after each chunk, and returning
+    the content's BufferHash (StopIteration.value) at the end.
+    Drive it with IdleJob for a progressive load, or just exhaust it.
+    """
+    result = BufferHash()
+    for text, done, total in ReadChunks(path, chunksize, encoding, newline, use_mmap):
+        write(text)
+        result.update(text.encode(encoding))
+        yield done, total
+    return result
+
+
+class IdleJob:
+    """
+    Runs a generator step by step, one step per GUI idle-loop round, so the UI keeps responding.
+    Cancellable.
+
+    Steps are expected to yield (done, total) tuples, which are passed to the progress callback.
+    """
+
+    Cancelled: bool = False
+    Done: bool = False
+    Error: BaseException | None = None
+    Result: Any = None
+
+    def __init__(this, steps: Generator, schedule: Callable[[Callable], Any],
+                 progress: Callable[[int, int], Any] | None = None,
+                 finished: Callable[["IdleJob"], Any] | None = None):
+        """
+        Constructor.
+        @param steps: The generator to run. Its return value is stored in Result.
+        @param schedule: Function that runs a callback later on the GUI thread (after_idle, wx.CallAfter...)
+        @param progress: Called with (done, total) after each step
+        @param finished: Called with this job when done, failed or cancelled
+        """
+        this.Steps = steps
+        this.Schedule = schedule
+        this.Progress = progress
+        this.Finished = finished
+
+    def Start(this) -> "IdleJob":
+        this.Schedule(this._step)
+        return this
+
+    def Cancel(this):
+        """
+        Stop the job. The current step (if any) finishes first.
+        """
+        this.Cancelled = True
+
+    def _finish(this):
+        this.Steps.close()
+        if this.Finished: this.Finished(this)
+
+    def _step(this):
+        if this.Cancelled:
+            return this._finish()
+
+        try:
+            done, total = next(this.Steps)
+        except StopIteration as result:
+            this.Done = True
+            this.Result = result.value
+            return this._finish()
+        except Exception as e:
+            this.Error = e
+            this._finish()
+            raise
+
+        if this.Progress: this.Progress(done, total)
+        this.Schedule(this._step)
+
+
+class AtomicWriter:
+    """
+    Writes a text file through a temporary file in the same directory,
+    which replaces the target when done. Use it as a context manager.
+
+    If an exception occurs (or Discard() is called), the target file is left untouched.
+    """
+
+    def __init__(this, path: str, encoding: str = "utf-8", newline: str | None = None):
+        this.Path = os.path.realpath(path)
+        this.Encoding = encoding
+        this.Newline = newline
+        this._discard = False
+
+    def __enter__(this) -> "AtomicWriter":
+        folder, name = os.path.split(this.Path)
+        fd, this._temp = tempfile.mkstemp(prefix=f".{name}.", suffix=".tmp", dir=folder)
+        this.File = os.fdopen(fd, "w", encoding=this.Encoding, newline=this.Newline)
+        return this
+
+    def write(this, text: str):
+        this.File.write(text)
+
+    def Discard(this):
+        this._discard = True
+
+    def __exit__(this, exc_type, exc_value, traceback):
+        try:
+            if exc_type or this._discard:
+                return
+            this.File.flush()
+            os.fsync(this.File.fileno())
+        finally:
+            this.File.close()
+
+            if exc_type or this._discard:
+                os.remove(this._temp)
+            else:
+                # Keep the target's permissions (mkstemp makes owner-only files)
+                try:
+                    mode = os.stat(this.Path).st_mode & 0o7777
+                except FileNotFoundError:
+                    mode = 0o666 & ~_umask()
+                os.chmod(this._temp, mode)
+                os.replace(this._temp, this.Path)
+
+
+def _umask() -> int:
+    mask = os.umask(0)
+    os.umask(mask)
+    return mask
+
+
+class MODIFIED(Flag):
+    """
+    StyledTextControl.IsModified results.
+    MOD_NONE is the only false value, so they can be used like booleans.
+    """
+
+    MOD_NONE = 0
+    MOD_BUFFER = auto()  # The buffer is not the same as the last loaded/saved content
+    MOD_DISK = auto()  # The file has been changed on disk since the last load/save
+
+MOD_NONE = MODIFIED.MOD_NONE
+MOD_BUFFER = MODIFIED.MOD_BUFFER
+MOD_DISK = MODIFIED.MOD_DISK
+
+
+class FileFingerprint:
+    """
+    Remembers a file as it was when an editor loaded/saved it:
+    size, modification time (in nanoseconds), inode number and the content digest.
+
+    The file is only read again (to compare its content) when os.stat says it has changed.
+    """
+
+    def __init__(this, path: str, digest: bytes | None = None, encoding: str = "utf-8",
+                 newline: str | None = None):
+        """
+        Constructor.
+        @param path: Target file
+        @param digest: Content digest (a BufferHash/DirtyTracker digest()), if already known.
+            Else the file will be read.
+        @param encoding: File encoding
+        @param newline: How the file is read - see ReadChunks
+        """
+        this.Path = path
+        this.Encoding = encoding
+        this.Newline = newline
+        this.Stat = this._stat()
+        this.Digest = digest if digest is not None else HashFile(path, encoding, newline).digest()
+        this.DiskDigest = this.Digest
+
+    def _stat(this) -> tuple[int, int, int] | None:
+        try:
+            info = os.stat(this.Path)
+        except OSError:
+            return None
+        return info.st_size, info.st_mtime_ns, info.st_ino
+
+    def DiskChanged(this) -> bool:
+        """
+        Check if the file content on disk is not the one we know.
+        Only does a stat() when nothing has changed.
+        """
+        stat = this._stat()
+
+        if stat != this.Stat:
+            this.Stat = stat
+            this.DiskDigest = None if stat is None else \
+                              HashFile(this.Path, this.Encoding, this.Newline).digest()
+
+        return this.DiskDigest != this.Digest
+
+    def Compare(this, digest: bytes) -> MODIFIED:
+        """
+        Compare a buffer digest with the fingerprint.
+        @return MODIFIED flags
+        """
+        result = MOD_NONE
+        if digest != this.Digest: result |= MOD_BUFFER
+        if this.DiskChanged(): result |= MOD_DISK
+        return result
+
+
+class DirtyTracker:
+    """
+    Keeps the digest of a text buffer without re-hashing the whole buffer on every edit.
+
+    The buffer is split into chunks of lines, each chunk remembers its hash and size (in bytes).
+    An edit, reported by Changed(), only marks the touched chunk(s) dirty - they are fetched
+    and hashed again the next time the digest is requested.
+
+    Output digests are the same as BufferHash's, so you can compare them directly.
+    Like hashlib objects, use digest() or hexdigest().
+    """
+
+    # Number of lines per chunk
+    ChunkLines: int = 1024
+
+    def __init__(this, fetch: Callable[[int, int | None], str], lines: int = 1,
+                 encoding: str = "utf-8"):
+        """
+        Constructor.
+        @param fetch: Function that returns the buffer text from the start of line `first` to
+            the start of line `last` (both 0-based, `last` excluded), or to the end if `last` is None.
+        @param lines: Number of lines the buffer currently has
+        @param encoding: Encoding used to turn the text into bytes
+        """
+        this.Fetch = fetch
+        this.Encoding = encoding
+        this.Reset(lines)
+
+    def Reset(this, lines: int = 1, digest: BufferHash | None = None):
+        """
+        Start over, as if the whole buffer was replaced.
+        @param lines: New line count
+        @param digest: Digest of the new content, if already known (e.g computed while loading a file).
+            Saves a full re-read until the first edit happens.
+        """
+        lines = max(lines, 1)
+        this._counts = [this.ChunkLines] * (lines // this.ChunkLines)
+        if lines % this.ChunkLines or not this._counts:
+            this._counts.append(lines % this.ChunkLines or this.ChunkLines)
+        this._hashes: list[int | None] = [None] * len(this._counts)
+        this._sizes = [0] * len(this._counts)
+        this._powers = [1] * len(this._counts)  # 256 ** size, saves a pow() per chunk on every join
+        this._total = (digest._hash, digest._size) if digest else None
+
+    @property
+    def LineCount(this) -> int:
+        return sum(this._counts)
+
+    def _find(this, line: int) -> tuple[int, int]:
+        """
+        Find the chunk containing a line.
+        Returns the chunk index and its first line.
+        """
+        start = 0
+        last = len(this._counts) - 1
+        for idx, count in enumerate(this._counts):
+            if line < start + count or idx == last:
+                return idx, start
+            start += count
+
+    def _dirty(this, idx: int):
+        this._hashes[idx] = None
+        this._total = None
+
+    def Changed(this, line: int, removed: int = 0, added: int = 0):
+        """
+        Report an edit.
+        The edit happened on `line` (0-based). It joined `removed` following lines into
+        that line (deleted newlines), then split it into `added` more lines (inserted newlines).
+        A simple typing inside a line is Changed(line).
+        """
+
+        idx, start = this._find(line)
+        this._dirty(idx)
+
+        if removed > 0:
+            # Lines line+1 ... line+removed are gone
+            take = min(removed, start + this._counts[idx] - line - 1)
+            this._counts[idx] -= take
+            removed -= take
+
+            nxt = idx + 1
+            while removed > 0 and nxt < len(this._counts):
+                take = min(removed, this._counts[nxt])
+                this._counts[nxt] -= take
+                removed -= take
+
+                if this._counts[nxt] == 0:
+                    del this._counts[nxt], this._hashes[nxt], this._sizes[nxt], this._powers[nxt]
+                else:
+                    this._dirty(nxt)
+
+            # Too small? Join with the next one
+            if nxt < len(this._counts) and \
+                this._counts[idx] + this._counts[nxt] <= this.ChunkLines:
+                this._counts[idx] += this._counts[nxt]
+                del this._counts[nxt], this._hashes[nxt], this._sizes[nxt], this._powers[nxt]
+
+        if added > 0:
+            this._counts[idx] += added
+
+            # Too big? Split
+            if this._counts[idx] > 2 * this.ChunkLines:
+                count = this._counts[idx]
+                pieces = [this.ChunkLines] * (count // this.ChunkLines)
+                if count % this.ChunkLines: pieces.append(count % this.ChunkLines)
+                this._counts[idx:idx + 1] = pieces
+                this._hashes[idx:idx + 1] = [None] * len(pieces)
+                this._sizes[idx:idx + 1] = [0] * len(pieces)
+                this._powers[idx:idx + 1] = [1] * len(pieces)
+
+    def _refresh(this):
+        """
+        Hash dirty chunks again, then join everything.
+        """
+        start = 0
+        last = len(this._counts) - 1
+        result = 0
+        size = 0
+
+        for idx, count in enumerate(this._counts):
+            if this._hashes[idx] is None:
+                data = this.Fetch(start, None if idx == last else start + count) \
+                           .encode(this.Encoding)
+                this._hashes[idx] = PolyHash(data)
+                this._sizes[idx] = len(data)
+                this._powers[idx] = pow(256, len(data), HASH_MOD)
+
+            result = (result * this._powers[idx] + this._hashes[idx]) % HASH_MOD
+            size += this._sizes[idx]
+            start += count
+
+        this._total = (result, size)
+
+    def intdigest(this) -> int:
+        if this._total is None:
+            this._refresh()
+        return JoinHash(1, *this._total)
+
+    def digest(this) -> bytes:
+        return this.intdigest().to_bytes(16, "big")
+
+    def hexdigest(this) -> str:
+        return this.digest().hex()
@@ -0,0 +1,409 @@
+"""
+@package libtextworker.interface.base.findreplace
+@brief The base of Find & Replace: a search engine which runs outside the GUI thread
+"""
+
+# 	A cross-platform library for Python apps.
+# 	Copyright (C) 2023-2024 Le Bao Nguyen and contributors.
+# 	This is a part of the libtextworker project.
+# 	Licensed under the GNU General Public License version 3.0 or later.
+
+import re
+import threading
+
+from bisect import bisect_left
+from collections import OrderedDict
+from queue import Empty, SimpleQueue
+from typing import Any, Callable, Iterator
+
+__all__ = ("CompilePattern", "Expander", "FindMatches", "Replacements", "SearchCache", "SearchEngine", "SearchJob")
+
+# A match is a tuple of (start offset, end offset, line, column, end line, end column).
+# Lines are 1-based like Tk indexes, columns are 0-based. Offsets are counted in characters,
+# and are -1 for matches that SearchCache moved after an edit.
+Match = tuple[int, int, int, int, int, int]
+
+
+def CompilePattern(query: str, regex: bool = False, case: bool = True) -> re.Pattern:
+    """
+    Compile a search query.
+    @param query: What to look for
+    @param regex: Treat query as a regular expression
+    @param case: Case sensitive
+    @raise re.error: Invalid regular expression
+    """
+    return re.compile(query if regex else re.escape(query), 0 if case else re.IGNORECASE)
+
+
+def FindMatches(text: str, pattern: re.Pattern, job: "SearchJob | None" = None) -> Iterator[tuple[Match, re.Match]]:
+    """
+    Find all non-empty matches of pattern in text, in one pass.
+    @param job: Stop when this job gets cancelled
+    @return (match tuple, re.Match) pairs
+    """
+    line = 1
+    linestart = 0  # Offset of the current line
+    last = 0
+    find = text.find
+    rfind = text.rfind
+    count = text.count
+
+    for m in pattern.finditer(text):
+        if job and job.Cancelled: return
+
+        start, end = m.span()
+        if start == end: continue
+
+        # Most matches are on the same line as the previous one, and don't span lines
+        newline = rfind("\n", last, start)
+        if newline >= 0:
+            line += count("\n", last, newline + 1)
+            linestart = newline + 1
+        last = start
+
+        if find("\n", start, end) < 0:
+            yield (start, end, line, start - linestart, line, end - linestart), m
+        else:
+            yield (start, end, line, start - linestart,
+                   line + count("\n", start, end), end - rfind("\n", start, end) - 1), m
+
+
+def Expander(pattern: re.Pattern, replacement: str) -> Callable[[re.Match], str]:
+    """
+    Turn a regex replacement template (with \\1, \\g<name> references) into a function that expands it
+    for a match. Same as re.Match.expand, but the template is parsed once and not on every match.
+    """
+    if "\\" not in replacement:
+        return lambda m: replacement
+
+    fmt = []
+    pos = 0
+    for ref in re.finditer(r"\\(?:g<([^>]*)>|([1-9][0-9]?)(?![0-9])|([\\nt]))", replacement):
+        literal = replacement[pos:ref.start()]
+        if "\\" in literal: break
+        fmt.append(literal.replace("{", "{{").replace("}", "}}"))
+        pos = ref.end()
+        name, number, escape = ref.groups()
+
+        if escape:
+            fmt.append({"\\": "\\", "n": "\n", "t": "\t"}[escape])
+            continue
+
+        group = number or name
+        group = int(group) if group.isdigit() else pattern.groupindex.get(group, -1)
+        if not 0 <= group <= pattern.groups:
+            break
+        fmt.append(f"{{{group}}}")
+    else:
+        literal = replacement[pos:]
+        # Anything else (octal escapes, invalid references...) is left to Python
+        if "\\" not in literal:
+            fmt = "".join(fmt) + literal.replace("{", "{{").replace("}", "}}")
+            return lambda m: fmt.format(m.group(), *m.groups(""))
+
+    return lambda m: m.expand(replacement)
+
+
+def Replacements(text: str, pattern: re.Pattern, replacement: str, regex: bool = False) -> list[tuple[Match, str]]:
+    """
+    Compute what to replace in text, in one pass.
+    @param replacement: New text. With regex, backreferences (\\1, \\g<name>) are expanded.
+    @return (match, new text) pairs, from the top to the bottom of text. Apply them bottom-up,
+            so that the positions of the remaining ones stay valid.
+    @raise re.error: Invalid group reference in replacement
+    """
+    if regex and "\\" in replacement:
+        expand = Expander(pattern, replacement)
+        return [(match, expand(m)) for match, m in FindMatches(text, pattern)]
+    return [(match, replacement) for match, m in FindMatches(text, pattern)]
+
+
+class SearchJob:
+    """
+    One run of SearchEngine. Cancelled when a new search starts.
+    """
+
+    Cancelled: bool = False
+
+    def __init__(this, text: str, pattern: re.Pattern, generation: int):
+        this.Text = text
+        this.Pattern = pattern
+        this.Generation = generation
+
+
+class SearchEngine:
+    """
+    Finds all matches of a pattern in a snapshot of a text buffer, in a worker thread.
+
+    The worker never calls back by itself: matches are queued, and Poll() - called from the GUI thread
+    (e.g. with Tk's after() or wx.CallAfter) - hands them to the found/finished callbacks in batches.
+    Starting a new search cancels the running one, and its queued results are dropped.
+    """
+
+    Generation: int = 0
+    Running: bool = False
+
+    def __init__(this, found: Callable[[list[Match]], Any] | None = None,
+                 finished: Callable[["SearchEngine"], Any] | None = None,
+                 batchsize: int = 500):
+        """
+        Constructor.
+        @param found: Called with each batch of new matches
+        @param finished: Called when a search completes
+        @param batchsize: Matches per batch
+        """
+        this.Found = found
+        this.Finished = finished
+        this.BatchSize = batchsize
+        this.Matches: list[Match] = []
+        this.Current: int = -1  # Selected match (index of Matches), -1 for none
+
+        this._job: SearchJob | None = None
+        this._queue = SimpleQueue()
+
+    @property
+    def MatchCount(this) -> int:
+        return len(this.Matches)
+
+    def Search(this, text: str, query: str | re.Pattern, regex: bool = False, case: bool = True) -> SearchJob | None:
+        """
+        Start searching in text (the buffer snapshot).
+        @param query: A string or a compiled pattern (then regex and case are ignored)
+        @return The new job, None if query is empty
+        @raise re.error: Invalid regular expression
+        """
+        pattern = query if isinstance(query, re.Pattern) else CompilePattern(query, regex, case) if query else None
+        this.Cancel()
+
+        if not pattern: return None
+
+        this.Running = True
+        this._job = SearchJob(text, pattern, this.Generation)
+        threading.Thread(target=this._scan, args=[this._job], daemon=True).start()
+        return this._job
+
+    def Use(this, matches: list[Match]):
+        """
+        Take matches found elsewhere (e.g. from a SearchCache) as the result of a new search.
+        The callbacks are called right away.
+        """
+        this.Cancel()
+        this.Matches = list(matches)
+        for i in range(0, len(matches), this.BatchSize):
+            if this.Found: this.Found(matches[i:i + this.BatchSize])
+        if this.Finished: this.Finished(this)
+
+    def Cancel(this):
+        """
+        Cancel the running search (if any) and forget its matches.
+        """
+        if this._job:
+            this._job.Cancelled = True
+            this._job = None
+
+        this.Generation += 1
+        this.Running = False
+        this.Matches = []
+        this.Current = -1
+
+    def _scan(this, job: SearchJob):
+        batch = []
+
+        try:
+            for match, m in FindMatches(job.Text, job.Pattern, job):
+                batch.append(match)
+                if len(batch) >= this.BatchSize:
+                    this._queue.put((job, batch))
+                    batch = []
+        finally:
+            this._queue.put((job, batch))
+            this._queue.put((job, None))
+
+    def Poll(this) -> bool:
+        """
+        Deliver queued matches. Call this from the GUI thread.
+        @return True if the search is still running (so Poll() should be called again later)
+        """
+        while True:
+            try:
+                job, batch = this._queue.get_nowait()
+            except Empty:
+                return this.Running
+
+            if job is not this._job: continue
+
+            if batch is None:
+                this.Running = False
+                this._job = None
+                if this.Finished: this.Finished(this)
+            elif batch:
+                this.Matches.extend(batch)
+                if this.Found: this.Found(batch)
+
+    def Next(this, line: int, column: int) -> Match | None:
+        """
+        Select the first match starting at or after (line, column), wrapping around at the end.
+        """
+        if not this.Matches: return None
+        this.Current = bisect_left(this.Matches, (line, column), key=lambda m: (m[2], m[3])) % len(this.Matches)
+        return this.Matches[this.Current]
+
+    def Previous(this, line: int, column: int) -> Match | None:
+        """
+        Select the last match starting before (line, column), wrapping around at the start.
+        """
+        if not this.Matches: return None
+        this.Current = (bisect_left(this.Matches, (line, column), key=lambda m: (m[2], m[3])) - 1) % len(this.Matches)
+        return this.Matches[this.Current]
+
+
+def _HasBorder(text: str) -> bool:
+    # True if a proper prefix of text is also its suffix (like "abab", "aa"),
+    # so that two matches can overlap
+    return any(text.startswith(text[-k:]) for k in range(1, len(text)))
+
+
+class _CacheEntry:
+    def __init__(this, pattern: re.Pattern, matches: list[Match]):
+        this.Pattern = pattern
+        this.Matches = matches
+        this.Edits: list[tuple[int, int, int]] = []  # Not applied yet
+
+
+class SearchCache:
+    """
+    Match positions of recent searches in a buffer, keyed by (query, regex, case) - for the current
+    buffer generation, which is bumped on every edit reported to Changed().
+
+    Plain (not regex) single-line queries survive edits: matches on edited lines are dropped,
+    the ones below are moved, and only the edited lines are searched again on the next lookup.
+    A query which extends a cached one (\"err\" -> \"erro\") is answered by narrowing the
+    cached matches, without scanning the buffer.
+    """
+
+    Generation: int = 0
+    MaxEdits: int = 64  # Beyond this number of pending edits, an entry is dropped
+
+    def __init__(this, fetch: Callable[[int, int | None], str], size: int = 16):
+        """
+        Constructor.
+        @param fetch: Get text of lines first to last (0-based, last excluded, None for the end),
+                      including the newline after the last line - like DirtyTracker's fetch
+        @param size: Number of searches to keep
+        """
+        this.Fetch = fetch
+        this.Size = size
+        this._entries: OrderedDict[tuple, _CacheEntry] = OrderedDict()
+
+    def Clear(this):
+        this._entries.clear()
+        this.Generation += 1
+
+    def Changed(this, line: int, removed: int = 0, added: int = 0):
+        """
+        Report an edit - same arguments as DirtyTracker.Changed.
+        """
+        this.Generation += 1
+        for key, entry in list(this._entries.items()):
+            if key[1] or "\n" in key[0] or len(entry.Edits) >= this.MaxEdits:
+                del this._entries[key]
+            else:
+                entry.Edits.append((line, removed, added))
+
+    def Store(this, query: str, regex: bool, case: bool, matches: list[Match], generation: int):
+        """
+        Remember the matches of a search.
+        @param generation: Generation of the buffer that was searched. If it has changed since,
+                           nothing is stored.
+        """
+        if generation != this.Generation or not query: return
+
+        key = (query, regex, case)
+        this._entries[key] = _CacheEntry(CompilePattern(query, regex, case), list(matches))
+        this._entries.move_to_end(key)
+        while len(this._entries) > this.Size:
+            this._entries.popitem(last=False)
+
+    def Lookup(this, query: str, regex: bool = False, case: bool = True) -> list[Match] | None:
+        """
+        Get the matches of a query, if this can be done without searching the whole buffer.
+        @return Matches, or None if the buffer must be searched
+        """
+        key = (query, regex, case)
+        entry = this._entries.get(key)
+        if entry:
+            this._entries.move_to_end(key)
+            return this._Update(entry)
+
+        # Narrow down the longest cached query which this one extends
+        if regex or "\n" in query: return None
+
+        prefixes = [k[0] for k in this._entries if not k[1] and k[2] == case and len(k[0]) < len(query)
+                    and query.startswith(k[0]) and not _HasBorder(k[0] if case else k[0].casefold())]
+        if not prefixes: return None
+
+        old = this._Update(this._entries[(max(prefixes, key=len), False, case)])
+        pattern = CompilePattern(query, False, case)
+        length = len(query)
+        matches = []
+        end = (0, 0)
+        current, text = 0, ""  # Matches are sorted by line: fetch each line once, and only these
+
+        for match in old:
+            line, column = match[2], match[3]
+            if (line, column) < end: continue
+            if line != current:
+                current, text = line, this.Fetch(line - 1, line)
+            if not pattern.match(text, column): continue
+            matches.append((match[0], match[0] + length if match[0] >= 0 else -1,
+                            line, column, line, column + length))
+            end = (line, column + length)
+
+        this.Store(query, False, case, matches, this.Generation)
+        return matches
+
+    def _Update(this, entry: _CacheEntry) -> list[Match]:
+        """
+        Apply pending edits to an entry.
+        """
+        if not entry.Edits: return entry.Matches
+
+        matches = entry.Matches
+        dirty = []  # Edited line ranges (0-based, last excluded)
+
+        for line, removed, added in entry.Edits:
+            # Matches are 1-based: the edit covers lines line+1 ... line+removed+1 of them
+            first = bisect_left(matches, line + 1, key=lambda m: m[2])
+            last = bisect_left(matches, line + removed + 2, key=lambda m: m[2])
+            shift = added - removed
+            matches[first:] = [(-1, -1, m[2] + shift, m[3], m[4] + shift, m[5]) for m in matches[last:]] \
+                              if shift else matches[last:]
+
+            # Old lines line ... line+removed are now line ... line+added
+            edited = (line, line + added + 1)
+            moved = []
+            for a, b in dirty:
+                if b <= line:
+                    moved.append((a, b))
+                elif a > line + removed:
+                    moved.append((a + shift, b + shift))
+                else:
+                    edited = (min(a, edited[0]), max(b + shift, edited[1]))
+            dirty = moved + [edited]
+
+        # Search the edited lines again
+        dirty.sort()
+        merged = []
+        for a, b in dirty:
+            if merged and a <= merged[-1][1]:
+                merged[-1] = (merged[-1][0], max(b, merged[-1][1]))
+            else:
+                merged.append((a, b))
+
+        for a, b in merged:
+            found = [(-1, -1, m[2] + a, m[3], m[4] + a, m[5]) for m, _ in FindMatches(this.Fetch(a, b), entry.Pattern)]
+            pos = bisect_left(matches, a + 1, key=lambda m: m[2])
+            matches[pos:pos] = found
+
+        entry.Edits = []
+        return matches
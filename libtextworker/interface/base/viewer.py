@@ -0,0 +1,168 @@
+"""
+@package libtextworker.interface.base.viewer
+@brief The base of LargeFileViewer - read-only views of huge files
+"""
+
+# 	A cross-platform library for Python apps.
+# 	Copyright (C) 2023-2024 Le Bao Nguyen and contributors.
+# 	This is a part of the libtextworker project.
+# 	Licensed under the GNU General Public License version 3.0 or later.
+
+import mmap
+import os
+import threading
+
+from array import array
+from itertools import accumulate, count, repeat
+from operator import add
+from typing import Any, Callable
+
+from .editor import CHUNK_SIZE
+
+__all__ = ("LineIndex", "ViewWindow")
+
+
+class LineIndex:
+    """
+    Memory-maps a file and indexes where its lines start (in an array('Q')),
+    in a background thread. Nothing else of the file is kept in memory.
+
+    Lines can be read while indexing is still running - LineCount grows as it goes.
+    """
+
+    Cancelled: bool = False
+    Done: bool = False
+    Error: BaseException | None = None
+
+    def __init__(this, path: str, encoding: str = "utf-8",
+                 progress: Callable[[int, int], Any] | None = None,
+                 finished: Callable[["LineIndex"], Any] | None = None,
+                 blocksize: int = CHUNK_SIZE):
+        """
+        Constructor. Call Start() to build the index.
+        @param path: Target file
+        @param encoding: File encoding
+        @param progress: Called with (indexed bytes, file size) after each block. Runs on the indexing thread!
+        @param finished: Called with this index when done (or failed/cancelled). Runs on the indexing thread!
+        @param blocksize: Bytes to index per round
+        """
+        this.Path = path
+        this.Encoding = encoding
+        this.Progress = progress
+        this.Finished = finished
+        this.BlockSize = blocksize
+
+        this._file = open(path, "rb")
+        this.Size = os.fstat(this._file.fileno()).st_size
+        this._map = mmap.mmap(this._file.fileno(), 0, access=mmap.ACCESS_READ) if this.Size else b""
+        this.Offsets = array("Q", [0])
+        this.Indexed = 0
+        this._thread = threading.Thread(target=this._build, daemon=True)
+
+    def Start(this) -> "LineIndex":
+        this._thread.start()
+        return this
+
+    def Cancel(this):
+        this.Cancelled = True
+
+    def Wait(this, timeout: float | None = None):
+        this._thread.join(timeout)
+
+    def Close(this):
+        """
+        Stop indexing and release the file.
+        """
+        this.Cancel()
+        if this._thread.is_alive(): this._thread.join()
+        if this.Size: this._map.close()
+        this._file.close()
+
+    def _build(this):
+        pos = 0
+        try:
+            while pos < this.Size and not this.Cancelled:
+                end = min(pos + this.BlockSize, this.Size)
+                parts = this._map[pos:end].split(b"\n")
+
+                # Line starts = pos + running total of (part length + 1), except for the last part
+                # (its line ends in a later block). All done by C iterators, no Python loop per line.
+                this.Offsets.extend(map(add, accumulate(map(len, parts[:-1])),
+                                        map(add, count(1), repeat(pos))))
+
+                pos = this.Indexed = end
+                if this.Progress: this.Progress(end, this.Size)
+
+            this.Done = not this.Cancelled
+        except BaseException as e:
+            this.Error = e
+        finally:
+            if this.Finished: this.Finished(this)
+
+    @property
+    def LineCount(this) -> int:
+        """
+        Number of lines available. While indexing, the last found line is not counted,
+        as its end is unknown yet.
+        """
+        return len(this.Offsets) if this.Done else len(this.Offsets) - 1
+
+    def GetLines(this, first: int, last: int) -> list[str]:
+        """
+        Get lines `first` to `last` (0-based, `last` excluded), without line endings.
+        """
+        last = min(last, this.LineCount)
+        if first >= last: return []
+
+        start = this.Offsets[first]
+        end = this.Offsets[last] if last < len(this.Offsets) else this.Size
+        text = this._map[start:end].decode(this.Encoding, "replace")
+
+        lines = text.split("\n")
+        if end == this.Size and not text.endswith("\n"):
+            lines.append("")
+        return [line.removesuffix("\r") for line in lines[:last - first]]
+
+
+class ViewWindow:
+    """
+    Decides which lines of a LineIndex a viewer widget holds:
+    the visible lines plus a margin on both sides.
+    """
+
+    First: int = 0  # First line held by the widget
+    Last: int = 0  # Last line held by the widget (excluded)
+
+    def __init__(this, index: LineIndex, margin: int = 200):
+        this.Index = index
+        this.Margin = margin
+
+    def Needs(this, top: int, visible: int) -> bool:
+        """
+        Check if the widget needs new lines to show `visible` lines starting at `top`.
+        This is also true when `top` gets close to an edge of the window (less than half the margin),
+        so that the widget can keep scrolling by itself.
+        """
+        lines = this.Index.LineCount
+        keep = this.Margin // 2
+
+        # Not full (e.g more lines have been indexed since)
+        if this.Last - this.First < min(lines, visible + 2 * this.Margin):
+            return True
+
+        if this.First > 0 and top < this.First + keep:
+            return True
+
+        if this.Last < lines and top + visible > this.Last - keep:
+            return True
+
+        return top < this.First or top + visible > this.Last
+
+    def Move(this, top: int, visible: int) -> list[str]:
+        """
+        Center the window around `top` and return the lines the widget should now hold.
+        """
+        lines = this.Index.LineCount
+        this.First = max(0, min(top - this.Margin, lines - visible - 2 * this.Margin))
+        this.Last = min(lines, this.First + visible + 2 * this.Margin)
+        return this.Index.GetLines(this.First, this.Last)
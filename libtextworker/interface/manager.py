@@ -9,8 +9,10 @@
 
 import json
 import os
+import re
 import typing
 import threading
+import weakref
 
 from .. import THEMES_DIR, Importable
 from ..general import logger, CraftItems
@@ -31,6 +33,77 @@ def hextorgb(value: str):
 def rgbtohex(value: str):
     return "#{:02x}{:02x}{:02x}".format(eval(value))
 
+class ThemeListener:
+    """
+    Listens to system theme changes (darkdetect.listener) with one thread for the whole process,
+    and tells registered widgets about them.
+
+    Widgets are referenced weakly: a widget which is gone is just forgotten.
+    Each widget can be registered with a function which runs a function on its GUI thread
+    (e.g Tk's after_idle, wx.CallAfter). Events which come before the GUI gets to run are
+    coalesced - widgets only get the latest theme, once.
+    """
+
+    def __init__(this):
+        this._lock = threading.Lock()
+        # widget -> (function, function to call it on the GUI thread)
+        this._targets: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+        this._latest: str | None = None # Theme from the last event
+        this._pending: set = set() # Schedulers with a delivery on the way
+        this._delivered: dict = {} # Scheduler -> last theme delivered through it
+        this.thread: threading.Thread | None = None
+
+    def Register(this, widget: object, func: typing.Callable[[object, str], typing.Any],
+                 schedule: typing.Callable[[typing.Callable], typing.Any] | None = None):
+        """
+        Call func(widget, theme) when the system theme changes (theme is "dark" or "light").
+        Registering a widget again replaces its function.
+
+        @param schedule: Runs a function on the widget's GUI thread. None to call func
+            from the listener thread.
+        """
+        with this._lock:
+            this._targets[widget] = (func, schedule)
+            if not this.thread:
+                this.thread = threading.Thread(target=darkdetect.listener, args=(this.OnThemeChange,), daemon=True)
+                this.thread.start()
+
+    def Unregister(this, widget: object):
+        with this._lock:
+            this._targets.pop(widget, None)
+
+    def OnThemeChange(this, theme: str):
+        """
+        Called by darkdetect (on the listener thread).
+        """
+        with this._lock:
+            this._latest = theme.lower()
+            schedulers = {schedule for func, schedule in this._targets.values()} - this._pending
+            this._pending |= schedulers
+
+        for schedule in schedulers:
+            if schedule: schedule(lambda schedule=schedule: this._Deliver(schedule))
+            else: this._Deliver(None)
+
+    def _Deliver(this, schedule: typing.Callable | None):
+        with this._lock:
+            this._pending.discard(schedule)
+            theme = this._latest
+            if this._delivered.get(schedule) == theme: return
+            this._delivered[schedule] = theme
+            targets = [(widget, func) for widget, (func, sched) in this._targets.items() if sched == schedule]
+
+        for widget, func in targets:
+            try:
+                func(widget, theme)
+            except Exception:
+                logger.exception("Failed to recolor %s", widget)
+
+
+# The process-wide listener
+SystemTheme = ThemeListener()
+
+
 class UISync:
     """
     A class that automatically syncs your UI to match system settings.
@@ -44,15 +117,15 @@ class UISync:
     Notes:
     * The target function that will be used must accept at least arguments, with the first one
       (excluding the class's this/self parameter if any) is for the widget, the second one is for the color.
-    * Nothing more (for now)
-
-    Don't get this class wrong: This only makes a thread that uses your custom function.
+    * Since 0.1.4, all UISync objects share one listener thread (see ThemeListener).
+      The function is called from that thread, unless a schedule function is given.
     """
 
     Target: object
     Func: typing.Callable | type
 
-    def __init__(this, Target: object, Func: typing.Callable | type):
+    def __init__(this, Target: object, Func: typing.Callable | type,
+                 schedule: typing.Callable[[typing.Callable], typing.Any] | None = None):
         # Nothing is allowed to be None
         assert Target != None
         assert Func != None
@@ -65,14 +138,80 @@ class UISync:
         this.Target = Target
         this.Func = Func
 
-        this.thread = threading.Thread(target=darkdetect.listener,
-                                       args=(this.configure,), daemon=True)
-        this.thread.start()
+        SystemTheme.Register(Target, Func, schedule)
+        this.thread = SystemTheme.thread
 
     def configure(this, color: str):
         return this.Func(this.Target, color.lower())
 
 
+class _ThemeValues(dict):
+    """
+    Values for set*func parameter placeholders: color and font (hex colors).
+    Their RGB forms (color-rgb, font-rgb) are only computed if used.
+    """
+
+    def __missing__(this, key: str):
+        if not key.endswith("-rgb"): raise KeyError(key)
+        value = this[key] = hextorgb(this[key.removesuffix("-rgb")])
+        return value
+
+
+class _Params:
+    """
+    Parameters of a set*func function. Placeholders (%(color), %(font), %(color-rgb), %(font-rgb))
+    are found once, when the function is registered, and filled in a copy on each call -
+    the registered parameters are never modified.
+    """
+
+    Placeholder = re.compile(r"%\(((?:color|font)(?:-rgb)?)\)")
+
+    def __init__(this, params: dict | tuple | None):
+        this.IsDict = isinstance(params, dict)
+        this.Values = dict(params) if this.IsDict else list(params or ())
+
+        # (key/index, pieces: text and placeholder names in turn, or the placeholder name if that's the whole value)
+        this.Templates: list[tuple[str | int, list[str] | str]] = []
+        for key, value in (this.Values.items() if this.IsDict else enumerate(this.Values)):
+            if isinstance(value, str) and this.Placeholder.search(value):
+                pieces = this.Placeholder.split(value)
+                if len(pieces) == 3 and not pieces[0] and not pieces[2]:
+                    pieces = pieces[1]
+                this.Templates.append((key, pieces))
+
+    def Call(this, func: typing.Callable, values: _ThemeValues):
+        args = this.Values.copy()
+        for key, pieces in this.Templates:
+            if isinstance(pieces, str):
+                args[key] = values[pieces]
+            else:
+                args[key] = "".join(str(values[piece]) if i % 2 else piece for i, piece in enumerate(pieces))
+        return func(**args) if this.IsDict else func(*args)
+
+
+class ResolvedTheme(typing.NamedTuple):
+    """
+    Colors and font of a theme pass, resolved once and shared by every widget of the pass.
+    See ColorManager.ResolveTheme.
+    """
+
+    Mode: str # "dark" or "light"
+    Background: str # Hex color
+    Foreground: str # Hex color
+    Font: typing.Any # The toolkit's font object (see GetFont)
+    MenuFont: typing.Any = None # Font for menus, if the toolkit needs another one
+
+
+class ThemeReport(typing.NamedTuple):
+    """
+    What a bulk theme pass did (see ApplyAll of the toolkits' ColorManager).
+    """
+
+    Widgets: int # Widgets walked
+    Changed: int # Widgets whose colors/font were changed
+    Seconds: float # Time taken
+
+
 class ColorManager(GetConfig):
     """
     A color manager for GUI widgets.
@@ -82,7 +221,12 @@ class ColorManager(GetConfig):
     setfontfn: dict[object | type, list] = {}
     setfcfn: dict[object | type, list] = {}
 
-    _threads: dict[object, threading.Thread] = {}
+    # Dispatch index: widget class -> functions registered for the class or its bases,
+    # one list per registry above. Cleared when a function is registered.
+    _typeindex: dict[type, tuple[list, list, list]] = {}
+
+    # Runs a function on the GUI thread - for system theme changes (see autocolor_run)
+    CallAfter: typing.Callable[[typing.Callable], typing.Any] | None = None
 
     # Configure widgets
     def GetFont(this) -> typing.Any | tuple[int, str, str, str]:
@@ -118,12 +262,11 @@ class ColorManager(GetConfig):
 
         return size_, style, weight, family
 
-    def GetColor(this, color: str | None = None) -> tuple[str, str]:
+    def GetMode(this, color: str | None = None) -> str:
         """
-        Get the current foreground/background defined in the settings.
-        @since 0.1.4: Made to be a non-@property item
+        Get the color mode to use.
         @param color (str | None = None): Defaults to darkdetect's output/current setting.
-        @return tuple[str, str]: Background - Foreground colors
+        @return str: "dark" or "light"
         """
 
         if not color:
@@ -135,13 +278,26 @@ class ColorManager(GetConfig):
         if not currmode in ["dark", "light"]:
            raise ConfigurationError(this._file, "Invalid value", "color", "background", currmode)
 
+        return currmode
+
+    def GetColor(this, color: str | None = None) -> tuple[str, str]:
+        """
+        Get the current foreground/background defined in the settings.
+        @since 0.1.4: Made to be a non-@property item
+        @param color (str | None = None): Defaults to darkdetect's output/current setting.
+        @return tuple[str, str]: Background - Foreground colors
+        """
+
+        currmode = this.GetMode(color)
+
         # Prefer color for specific modes first
+        back_ = colors[currmode]
         if f"background-{currmode}" in this["color"]:
-            test_back = this.Get("color", f"background-{currmode}")
-            back_ = test_back if test_back else colors[currmode]
+            if test_back := this.Get("color", f"background-{currmode}"):
+                back_ = colors.get(test_back, test_back)
 
         fore_ = this.Get("color", "foreground", find_everywhere=True, noraise=True)
-        if fore_ == "default":
+        if not fore_ or fore_ == "default":
             fore_ = colors[{"light": "dark", "dark": "light"}.get(currmode, "dark")]
 
         if f"foreground-{currmode}" in this["color"]:
@@ -154,15 +310,38 @@ class ColorManager(GetConfig):
         elif fore_ in colors:
             fore_ = colors[fore_]
 
-        elif test_fore in colors:
-            fore_ = colors[test_fore]
-
         else:
-            fore_ = rgbtohex(fore_) # RGB to hex
             raise ConfigurationError(this._file, "Invalid value", "color", "foreground", fore_)
 
         return back_, fore_
 
+    def GetMenuFont(this, font: typing.Any) -> typing.Any:
+        """
+        Get the font for menus, made from the GetFont() one.
+        Only for toolkits which need a different one: None by default.
+        """
+        return None
+
+    def ResolveTheme(this, color: str | None = None) -> ResolvedTheme:
+        """
+        Get colors and font to use for a theme pass (e.g configure() on a window and its children).
+        Resolved themes are kept until the settings change.
+
+        @param color (str | None = None): Color mode, see GetMode
+        """
+
+        mode = this.GetMode(color)
+        key = ("<theme>", mode) # Kept in Get()'s memo, so it's dropped on the same changes
+
+        with this._lock:
+            if this._memogen == GetConfig._aliasgen and (theme := this._memo.get(key)):
+                return theme
+
+            back, fore = this.GetColor(mode)
+            font = this.GetFont()
+            theme = this._memo[key] = ResolvedTheme(mode, back, fore, font, this.GetMenuFont(font))
+            return theme
+
     def setcolorfunc(this, obj: type | object, func: typing.Callable | str, params: dict | tuple | None = None):
         """
         Set GUI widget background color-set function.
@@ -172,9 +351,11 @@ class ColorManager(GetConfig):
 
         Function paramers must have %(color) in order to
             pass color value. Use %(color-rgb) if you want RGB value.
+        A parameter which is only %(color-rgb) gets a (r, g, b) tuple.
         """
         if not obj in this.setcolorfn: this.setcolorfn[obj] = []
-        this.setcolorfn[obj].append({"fn": func, "params": params})
+        this.setcolorfn[obj].append({"fn": func, "params": params, "call": _Params(params)})
+        this._typeindex.clear()
 
     def setfontcfunc(this, obj: type | object, func: typing.Callable, params: dict | tuple | None = None):
         """
@@ -187,7 +368,8 @@ class ColorManager(GetConfig):
             pass color value. Use %(font-rgb) if you want RGB value.
         """
         if not obj in this.setfontfn: this.setfontfn[obj] = []
-        this.setfontfn[obj].append({"fn": func, "params": params})
+        this.setfontfn[obj].append({"fn": func, "params": params, "call": _Params(params)})
+        this._typeindex.clear()
 
     def setfontandcolorfunc(this, obj: type | object, func: typing.Callable | str, params: dict | tuple | None = None):
         """
@@ -198,7 +380,8 @@ class ColorManager(GetConfig):
         @since 0.1.4: First appearance
         """
         if not obj in this.setfcfn: this.setfcfn[obj] = []
-        this.setfcfn[obj].append({"fn": func, "params": params})
+        this.setfcfn[obj].append({"fn": func, "params": params, "call": _Params(params)})
+        this._typeindex.clear()
 
     def configure(this, widget: object, color: str | None = None):
         """
@@ -213,59 +396,54 @@ class ColorManager(GetConfig):
 
         if not widget:
             logger.debug(f"Widget {widget} died, skip configuring.")
-            this._threads.pop(widget, None)
+            SystemTheme.Unregister(widget)
             return
 
-        color, fontcolor = this.GetColor(color)
-
-        def runfn(func: typing.Callable, args: dict|tuple):
-            extra_aliases = {
-                "%(color)": color,
-                "%(font)": fontcolor
-            }
-
-            def replacetext(target: str):
-                for key in extra_aliases:
-                    target = target.replace(key, extra_aliases[key])
-                return target
-
-            if isinstance(args, dict):
-                for key in args:
-                    if isinstance(args[key], str):
-                        args[key] = replacetext(args[key])
-                return func(**args)
-            
-            elif isinstance(args, tuple):
-                temp = list(args)
-                for i in range(len(temp)):
-                    arg = temp[i]
-                    if isinstance(arg, str):
-                        temp[i] = replacetext(arg)
-                args = tuple(temp)
-                return func(*args)
-        
-        def runloop(attr: typing.Literal["color", "font", "fc"]):
-
-            for item in getattr(this, f"set{attr}fn"):
-                if isinstance(item, type):
-                    if not isinstance(widget, item): continue
-                elif item != widget: continue
-
-                dictionary = getattr(this, f"set{attr}fn")[item]
-
-                for i in range(len(dictionary)):
-                    fn = dictionary[i]["fn"]
-                    if isinstance(fn, str): fn = getattr(widget, fn)
-
-                    runfn(fn, dictionary[i]["params"])
-
-        runloop("color")
-        runloop("font")
-        runloop("fc")
+        this.ApplyFunctions(widget, this.ResolveTheme(color))
+
+    def ApplyFunctions(this, widget: object, theme: ResolvedTheme):
+        """
+        Run set*func functions on a widget.
+        @see GetFunctions
+        """
+        values = _ThemeValues(color=theme.Background, font=theme.Foreground)
+
+        for func in this.GetFunctions(widget):
+            fn = func["fn"]
+            if isinstance(fn, str): fn = getattr(widget, fn)
+            if not (call := func.get("call")):
+                call = func["call"] = _Params(func["params"])
+            call.Call(fn, values)
+
+    def GetFunctions(this, widget: object) -> list[dict]:
+        """
+        Get set*func functions to run on a widget: set color functions first, then font color,
+        then both. In each group, functions registered for the widget's class (or base classes)
+        come first, then the ones for the widget itself - each in registration order.
+
+        Class lookups are made once per widget class, not per widget.
+        """
+        cls = type(widget)
+        bytype = this._typeindex.get(cls)
+        if bytype is None:
+            bytype = this._typeindex[cls] = tuple(
+                [func for key, funcs in registry.items()
+                      if isinstance(key, type) and issubclass(cls, key) for func in funcs]
+                for registry in (this.setcolorfn, this.setfontfn, this.setfcfn))
+
+        result = []
+        for funcs, registry in zip(bytype, (this.setcolorfn, this.setfontfn, this.setfcfn)):
+            result += funcs
+            try:
+                result += registry.get(widget, ())
+            except TypeError: # Unhashable
+                pass
+        return result
 
     def autocolor_run(this, widget: typing.Any):
         """
-        Creates and runs a thread that automatically color a widget if able.
+        Automatically color a widget when the system theme changes, if able.
+        Widgets are recolored on the GUI thread (see CallAfter), once per burst of changes.
 
         @param widget: Target object
         """
@@ -275,4 +453,4 @@ class ColorManager(GetConfig):
                            "Detailed: auto coloring has been turned of or doesn't have required dependency (darkdetect).")
             return
 
-        this._threads[widget] = UISync(widget, this.configure)
+        SystemTheme.Register(widget, this.configure, this.CallAfter)
@@ -8,14 +8,16 @@ Contains class(es) and needed attributes for Tkinter.
 #	This is a part of the libtextworker project.
 #	Licensed under the GNU General Public License version 3.0 or later.
 
+import time
 import typing
 from enum import Flag, auto
 
-from ...general import libTewException, test_import
-from ..manager import ColorManager
+from ...general import libTewException, logger, test_import
+from ..manager import ColorManager, ResolvedTheme, ThemeReport
 
 if test_import("tkinter"):
-    from tkinter import font, Misc, Menu
+    from tkinter import font, Misc, Menu, TclError
+    from . import constants
 else:
     raise libTewException("Tkinter is not correctly installed!")
 
@@ -28,13 +30,23 @@ TK_USEGRID = TK_PLACEOPTS.TK_USEGRID
 TK_USEPLACE = TK_PLACEOPTS.TK_USEPLACE
 TK_USEPACK = TK_PLACEOPTS.TK_USEPACK
 
+# Installed font families, asked to Tk once
+_font_families: frozenset[str] | None = None
+
+def GetFontFamilies() -> frozenset[str]:
+    global _font_families
+    if _font_families is None:
+        _font_families = frozenset(font.families())
+    return _font_families
+
 class ColorManager(ColorManager):
     recursive_configure: bool = True
     is_shown: bool = False  # Messages
+    CallAfter = staticmethod(constants.CALL_AFTER)
 
     def GetFont(self):
         size, style, weight, family = super().GetFont()
-        font_families = font.families()
+        font_families = GetFontFamilies()
 
         if family == "default" or family not in font_families: family = "Consolas"
 
@@ -47,40 +59,75 @@ class ColorManager(ColorManager):
 
         return font.Font(None, family=family, weight=weight, slant=style, size=size)
 
+    def GetMenuFont(self, font_: font.Font) -> font.Font:
+        menufont = font_.copy()
+        menufont.configure(size=10)
+        return menufont
+
     def setfontcfunc(self, objname: str, func: typing.Callable, params: dict):
         raise NotImplementedError
 
     def setcolorfunc(self, objname: str, func: typing.Callable, params: dict):
         raise NotImplementedError
 
-    def configure(self, widget: Misc, color: str | None = None, childs_too: bool = recursive_configure):
-        back, fore = self.GetColor(color)
-        font_to_use = self.GetFont()
-
-        if isinstance(widget, Menu):
-            font_to_use.configure(size=10)
-            if widget.index("end"):
-                for i in range(0, int(widget.index("end"))):
-                    widget.entryconfigure(i, background=back)
-
-        try:
-            widget.configure(font=font_to_use)
-        except:
-            pass
-
-        # Why this catch?
-        # Some Tkinter objects do not use fg and bg as their configure() keywords,
-        # but use foreground and background instead.
-        try:
-            widget.configure(fg=fore, bg=back)
-        except:
-            pass
-
-        try:
-            widget.configure(background=back, foreground=fore)
-        except:
-            pass
-
-        if childs_too:
-            for child in widget.winfo_children():
-                self.configure(child, color, True)
+    def configure(self, widget: Misc, color: str | None = None, childs_too: bool = recursive_configure) -> ThemeReport:
+        """
+        Style a widget, and its children (all levels) if childs_too is True.
+        @see ApplyAll
+        """
+        return self.ApplyAll(widget, color, childs_too)
+
+    def ApplyAll(self, widget: Misc, color: str | None = None, childs_too: bool = True) -> ThemeReport:
+        """
+        Style a widget and its children (all levels) in one go.
+
+        Colors and font are resolved once, widgets which already use them are left alone,
+        and Tk only redraws once all widgets are done.
+        @return Number of widgets walked and changed, and the time it took
+        """
+        start = time.perf_counter()
+        theme = self.ResolveTheme(color)
+
+        widgets = []
+        stack = [widget]
+        while stack:
+            current = stack.pop()
+            widgets.append(current)
+            if childs_too:
+                stack.extend(reversed(current.winfo_children()))
+
+        changed = sum(self.ApplyTheme(current, theme) for current in widgets)
+        widget.update_idletasks() # One redraw
+
+        report = ThemeReport(len(widgets), changed, time.perf_counter() - start)
+        logger.debug("Themed %d widgets (%d changed) in %.1fms", report.Widgets, report.Changed, report.Seconds * 1000)
+        return report
+
+    def ApplyTheme(self, widget: Misc, theme: ResolvedTheme) -> bool:
+        """
+        Style a single widget with a resolved theme.
+        Options which already have the wanted values are not set again.
+        @return Whether the widget has been changed
+        """
+        options = {"font": theme.MenuFont if isinstance(widget, Menu) else theme.Font,
+                   "background": theme.Background, "foreground": theme.Foreground}
+
+        # Some Tkinter objects (e.g ttk ones) do not have all these options
+        for key in list(options):
+            try:
+                if str(widget.cget(key)) == str(options[key]):
+                    del options[key]
+            except TclError:
+                del options[key]
+
+        if isinstance(widget, Menu) and (last := widget.index("end")) is not None:
+            for i in range(0, int(last) + 1):
+                try:
+                    if widget.entrycget(i, "background") != theme.Background:
+                        widget.entryconfigure(i, background=theme.Background)
+                except TclError: # Separators, tear-off entries
+                    pass
+
+        if options:
+            widget.configure(**options)
+        return bool(options)
@@ -8,10 +8,12 @@
 #	This is a part of the libtextworker project.
 #	Licensed under the GNU General Public License version 3.0 or later.
 
+import tkinter
+
 from tkinter.messagebox import showerror, showinfo, showwarning
 from ...import _
 
-__all__ = ["LOG_EXCEPTION", "LOG_CRITICAL", "LOG_DEBUG", "LOG_NORMAL", "LOG_WARNING", "LOG_ERROR"]
+__all__ = ["LOG_EXCEPTION", "LOG_CRITICAL", "LOG_DEBUG", "LOG_NORMAL", "LOG_WARNING", "LOG_ERROR", "LOG_SCHEDULE", "CALL_AFTER"]
 
 # These "logging" functions are not actually do logging yet.
 # LOG_CRITICAL: Probably I'd like to... exit with code -1.
@@ -20,4 +22,12 @@ LOG_EXCEPTION = LOG_ERROR = lambda message: showerror(_("An error occured"), mes
 LOG_CRITICAL = lambda message: (showerror(_("A critical error occured!"), message), exit(-1))
 LOG_DEBUG = lambda message: showinfo(_("Debug message"), message)
 LOG_NORMAL = lambda message: showinfo(_("Infomation (used for logging)"), message)
-LOG_WARNING = lambda message: showwarning(_("Warning"), message)
\ No newline at end of file
+LOG_WARNING = lambda message: showwarning(_("Warning"), message)
+
+# Runs a function on the Tk thread when it is idle (used for queued log messages,
+# system theme changes...). Without a root window, it runs now.
+def CALL_AFTER(func):
+    if tkinter._default_root: tkinter._default_root.after_idle(func)
+    else: func()
+
+LOG_SCHEDULE = CALL_AFTER
@@ -9,7 +9,6 @@
 # 	Licensed under the GNU General Public License version 3.0 or later.
 
 import os
-import time
 
 from tkinter import ttk, Misc
 from warnings import warn
@@ -22,7 +21,8 @@ from ...general import CraftItems, Importable
 
 if Importable["watchdog"]:
     from watchdog.events import FileSystemEvent, FileSystemEventHandler
-    from watchdog.observers import Observer
+    from ...watch import DirPatch, EventCoalescer, Subscription, Watch
+    from .constants import CALL_AFTER
 
     class FSEventHandler(FileSystemEventHandler):
         """
@@ -101,7 +101,8 @@ DirMovedEvent = "<<DirMoved>>"
 DirDeletedEvent = "<<DirDeleted>>"
 
 class DirCtrl(ttk.Treeview, FSEventHandler, DirCtrlBase):
-    watchChanges: bool
+    watchChanges: bool = False
+    PollInterval: int = 50 # Milliseconds between checks for listing progress
 
     TargetIsSelf = True
     Parent_ArgName = "master"
@@ -110,7 +111,7 @@ class DirCtrl(ttk.Treeview, FSEventHandler, DirCtrlBase):
     def __init__(this, master: Misc, refresh_on_changes: bool,
                  place_options: TK_PLACEOPTS = TK_USEPACK, *args, **kwds):
         """
-        A ttkTreeview customized to show folder list using os.listdir.
+        A ttkTreeview customized to show folder list using os.scandir.
         Multiple roots is supported, but only adding new for now.
         Lacks label editing, DND, right-click menu, item icon.
 
@@ -136,22 +137,38 @@ class DirCtrl(ttk.Treeview, FSEventHandler, DirCtrlBase):
             raise NotImplementedError("If you want to use TK_USEPLACE, then sorry it is not used here (not implemented)."
                                       "A widget place method is required (TK_USEPACK or TK_USEGRID).")
 
+        this.Watches: dict[str, "Subscription"] = {}  # Watch hub subscriptions, by root path
+        this.Loaders: dict[str, tuple[DirLoader, str]] = {}  # Node: (running loader, its placeholder item)
+        this._pollid = None
+
+        # Full paths of items, and items by their paths (PathKey)
+        this.ItemPaths: dict[str, str] = {}
+        this.Paths: dict[str, str] = {}
+
         if refresh_on_changes:
             if Importable["watchdog"]:
-                this.Observers: dict[str, Observer] = {}
                 this.watchChanges = refresh_on_changes
+                this.Coalescer = EventCoalescer(this.ApplyPatches, CALL_AFTER)
             else:
                 warn('Setting up DirCtrl has a warning, about missing dependency for watching file system changes (watchdog)')
                 this.watchChanges = False
 
         this.bind("<<TreeviewOpen>>", this.Expand)
+        this.bind("<<TreeviewClose>>", this.Collapse)
 
     def destroy(this):
-        if this.Observers:
-            for key in this.Observers:
-                this.Observers[key].stop()
-                this.Observers[key].join()
-            this.Observers.clear()
+        for sub in this.Watches.values():
+            sub.Cancel()
+        this.Watches.clear()
+        if this.watchChanges:
+            this.Coalescer.Cancel()
+
+        for loader, _placeholder in this.Loaders.values():
+            loader.Cancel()
+        this.Loaders.clear()
+        if this._pollid:
+            this.after_cancel(this._pollid)
+            this._pollid = None
 
         ttk.Treeview.destroy(this)
 
@@ -173,33 +190,67 @@ class DirCtrl(ttk.Treeview, FSEventHandler, DirCtrlBase):
         
         this._insert_node(path, os.path.normpath(this.GetFullPath(path)))
 
+    def Collapse(this, evt = None, path: str | None = None):
+        """
+        Collapses a node, and stops listing it if it is still being listed.
+        Bond to <<TreeviewClose>> by default.
+        """
+
+        if path is None: path = this.focus()
+        if not path or path not in this.Loaders: return
+
+        loader, _placeholder = this.Loaders.pop(path)
+        loader.Cancel()
+        this.delete(*this.get_children(path))
+        this.insert(path, "end") # Still expandable, listed again next time
+
     def _insert_node(this, node: str, folderpath: str):
         """
         Internal function to insert childrens into a node.
+        Items are listed in the background and inserted in batches, while a placeholder shows up.
         """
-        
-        items = os.listdir(folderpath)
-
-        if len(items) > 0:
-            try:
-                if childs := this.get_children(node):
-                    if len(childs) > 0:
-                        if this.watchChanges:
-                            this.delete(*childs)
-                        else:
-                            first_child = childs[0]
-                            if not this.item(first_child, 'text'): this.delete(first_child)
-                            else: return
-            except:
-                pass
-
-            for item in os.listdir(folderpath):
-                new = this.insert(node, "end", text=item, open=False)
-
-                # Nothing else that marks a node as expandable
-                # than making an empty item
-                if os.path.isdir(os.path.join(folderpath, item)):
-                    this.insert(new, "end")
+
+        if node in this.Loaders: return
+
+        if childs := this.get_children(node):
+            if this.item(childs[0], "text"):
+                return # Listed before - and kept up to date by ApplyPatches if watchChanges is on
+            this.delete(*childs)
+
+        placeholder = this.insert(node, "end", text=_("Loading..."), open=False)
+        loader = DirLoader(folderpath, lambda batch: this._insert_items(node, loader, batch),
+                           lambda loader: this._end_node(node, loader), DC_DIRONLY in this.Styles)
+        this.Loaders[node] = (loader.Start(), placeholder)
+        if not this._pollid:
+            this._pollid = this.after(this.PollInterval, this._poll)
+
+    def _insert_items(this, node: str, loader: DirLoader, batch: list[tuple[DirItem, bool]]):
+        for item, expandable in batch:
+            new = this.insert(node, loader.Place(item), text=item.Name, open=False)
+            this.Track(new, item.Path)
+
+            # Nothing else that marks a node as expandable
+            # than making an empty item
+            if expandable:
+                this.insert(new, "end")
+
+    def _end_node(this, node: str, loader: DirLoader):
+        _loader, placeholder = this.Loaders.pop(node)
+        this.delete(placeholder)
+        if loader.Error:
+            warn(f"DirCtrl: Unable to list {loader.Path}: {loader.Error}")
+
+    def _poll(this):
+        # Loader threads can't touch Tk - take their batches from here, one per loader per round.
+        # Batches waiting: go on when Tk is idle again. Otherwise wait a bit.
+        this._pollid = None
+        for loader, _placeholder in list(this.Loaders.values()):
+            loader.Poll()
+
+        if any(loader.Pending for loader, _placeholder in this.Loaders.values()):
+            this._pollid = this.after_idle(this._poll)
+        elif this.Loaders:
+            this._pollid = this.after(this.PollInterval, this._poll)
 
     def SetFolder(this, path: str, newroot: bool = False):
         """
@@ -209,12 +260,90 @@ class DirCtrl(ttk.Treeview, FSEventHandler, DirCtrlBase):
         DirCtrlBase.SetFolder(this, path, newroot)
 
         first = this.insert("", "end", text=path)
+        this.Track(first, path)
         this._insert_node(first, path)
 
-        if Importable["watchdog"]:
-            this.Observers[path] = Observer()
-            this.Observers[path].schedule(this, path, recursive=True)
-            this.Observers[path].start()
+        if this.watchChanges and path not in this.Watches:
+            this.Watches[path] = Watch(path, this.Coalescer.Feed, recursive=True)
+
+    def ApplyPatches(this, patches: dict[str, "DirPatch"]):
+        """
+        Bring listed nodes up to date with file system changes (see libtextworker.watch.EventCoalescer).
+        Nodes being listed are left alone - they get the changes from the listing.
+        """
+        for path, patch in patches.items():
+            node = this.MatchItem(path)
+            if not node or node in this.Loaders: continue
+
+            for name in patch.Deleted:
+                if item := this.MatchItem(os.path.join(path, name)):
+                    this.delete(item)
+
+            for old, new in patch.Renamed.items():
+                if item := this.MatchItem(os.path.join(path, old)):
+                    this.item(item, text=new)
+                    this.Track(item, os.path.join(path, new))
+                    isdir = os.path.isdir(this.ItemPaths[item])
+                    this.move(item, node, SortedInsert(this._SortKeys(node, item), new, isdir))
+
+            created = [(name, isdir) for name, isdir in patch.Created.items()
+                       if (isdir or DC_DIRONLY not in this.Styles) and not this.MatchItem(os.path.join(path, name))]
+            if not created: continue
+
+            childs = this.get_children(node)
+            if not childs or not this.item(childs[0], "text"): # Not listed yet, make it expandable
+                if not childs: this.insert(node, "end")
+                continue
+
+            keys = this._SortKeys(node)
+            for name, isdir in created:
+                new = this.insert(node, SortedInsert(keys, name, isdir), text=name, open=False)
+                this.Track(new, os.path.join(path, name))
+                if isdir: this.insert(new, "end")
+
+    def _SortKeys(this, node: str, skip: str = "") -> list[tuple]:
+        """
+        Sort keys of the (listed) children of a node, but skip.
+        """
+        return [SortKey(this.item(child, "text"), os.path.isdir(this.ItemPaths.get(child, "")))
+                for child in this.get_children(node) if child != skip]
+
+    def Track(this, item: str, path: str):
+        """
+        Remember the (new) path of an item - its children's too if it has been renamed.
+        Items inserted by hand must be tracked to be found by MatchItem and GetFullPath.
+        """
+        stack = [(item, os.path.normpath(path))]
+        while stack:
+            item, path = stack.pop()
+            old = this.ItemPaths.get(item)
+            if old and this.Paths.get(PathKey(old)) == item:
+                del this.Paths[PathKey(old)]
+            this.ItemPaths[item] = path
+            this.Paths[PathKey(path)] = item
+
+            if old and old != path: # Renamed - so are the children
+                stack += [(child, os.path.join(path, this.item(child, "text")))
+                          for child in this.get_children(item) if child in this.ItemPaths]
+
+    def MatchItem(this, path: str) -> str | None:
+        """
+        Find the item of a path. Only items which have been listed can be found.
+        """
+        return this.Paths.get(PathKey(path))
+
+    def delete(this, *items: str):
+        """
+        Delete items (and their children) from the tree, and forget their paths.
+        """
+        stack = list(items)
+        while stack:
+            item = stack.pop()
+            stack.extend(this.get_children(item))
+            if (path := this.ItemPaths.pop(item, None)) and this.Paths.get(PathKey(path)) == item:
+                del this.Paths[PathKey(path)]
+
+        ttk.Treeview.delete(this, *items)
 
     def GetFullPath(this, item: str | None = None) -> str | None:
         """
@@ -227,6 +356,9 @@ class DirCtrl(ttk.Treeview, FSEventHandler, DirCtrlBase):
         if not item:
             item = this.focus()
 
+        if item in this.ItemPaths:
+            return this.ItemPaths[item]
+
         parent = this.parent(item)
         node = []
 
@@ -261,6 +393,10 @@ class DirList(ttk.Treeview, DirCtrlBase):
         * Item size
         Navigate history support. Not much customizable for now.
         No libtextworker custom style support for now.
+
+        Items are kept in a DirModel (Model). The Treeview only holds the rows
+        on screen, which are filled again on scroll (Top is the first one).
+        Click on a column heading to sort by it (again to reverse), use SetFilter to filter.
         """
 
         args, kwds = DirCtrlBase.__init__(this, master, *args, **kwds)
@@ -268,9 +404,17 @@ class DirList(ttk.Treeview, DirCtrlBase):
                               columns = [ _("Name"), _("Item type"), _("Last modified"), _("Size") ],
                               *args, **kwds)
 
-        ysb = ttk.Scrollbar(this.Frame, orient="vertical", command=this.yview)
+        this.Model = DirModel()
+        this.Top = 0
+        this.SelectedRows: set[int] = set() # Model.Store rows
+
+        for i, column in enumerate(this["columns"]):
+            this.heading(column, text=column, command=lambda i=i: this.SortBy(i))
+
+        # The vertical scrollbar scrolls Model rows, not Treeview items
+        ysb = this.YScroll = ttk.Scrollbar(this.Frame, orient="vertical", command=this._Scroll)
         xsb = ttk.Scrollbar(this.Frame, orient="horizontal", command=this.xview)
-        this.configure(yscroll=ysb.set, xscroll=xsb.set)
+        this.configure(xscroll=xsb.set)
 
         if TK_USEPACK in place_options:
             ysb.pack(fill="y", expand=True, side="right")
@@ -284,25 +428,78 @@ class DirList(ttk.Treeview, DirCtrlBase):
             raise NotImplementedError("If you want to use TK_USEPLACE, then sorry it is not used here (not implemented)."
                                       "A widget place method is required (TK_USEPACK or TK_USEGRID).")
 
+        this.bind("<Configure>", lambda evt: this._Render(), add=True)
+        this.bind("<<TreeviewSelect>>", this._Selected, add=True)
+        this.bind("<MouseWheel>", lambda evt: this._Scroll("scroll", -1 if evt.delta > 0 else 1, "units"))
+        this.bind("<Button-4>", lambda evt: this._Scroll("scroll", -1, "units"))
+        this.bind("<Button-5>", lambda evt: this._Scroll("scroll", 1, "units"))
+
     def SetFolder(this, path: str):
         """
         Navigate to the specified folder.
         """
 
         DirCtrlBase.SetFolder(this, path, False)
-        this.delete(*this.get_children())
-
-        for it in os.listdir(path):
-            fullpath = os.path.join(path, it)
-            statinfo = os.stat(fullpath)
-
-            if os.path.isdir(os.path.join(path, it)):
-                it_type = _("Folder")
-                it_size = ""
-            elif DC_DIRONLY not in this.Styles:
-                it_type = _("File")
-                it_size = this.sizeof_fmt(statinfo.st_size)
+        this.Model.Load(path, DC_DIRONLY in this.Styles)
+        this.Top = 0
+        this.SelectedRows.clear()
+        this._Render()
 
-            lastmod = time.strftime("%d %b %Y, %H:%M:%S", time.localtime(statinfo.st_mtime))
+    def SortBy(this, column: int, reverse: bool | None = None):
+        """
+        Sort the list. See DirModel.SortBy.
+        """
+        this.Model.SortBy(column, reverse)
+        this._Render()
 
-            this.insert("", "end", values=(it, it_type, lastmod, it_size))
+    def SetFilter(this, pattern: str | None = None, regex: bool = False, case: bool = False, keepdirs: bool = True):
+        """
+        Show only items matching a pattern. See DirModel.Filter.
+        @raise re.error: Invalid regular expression
+        """
+        this.Model.Filter(pattern, regex, case, keepdirs)
+        this.Top = 0
+        this._Render()
+
+    def _Visible(this) -> int:
+        rowheight = int(ttk.Style(this).lookup("Treeview", "rowheight") or 20)
+        return max(1, this.winfo_height() // rowheight - 1) # Minus the heading
+
+    def _Scroll(this, *args):
+        # Scrollbar commands: ("moveto", fraction) or ("scroll", count, "units" | "pages")
+        if args[0] == "moveto":
+            this.Top = int(float(args[1]) * len(this.Model))
+        elif args[0] == "scroll":
+            this.Top += int(args[1]) * (this._Visible() if args[2] == "pages" else 3)
+        this._Render()
+        return "break"
+
+    def _Render(this):
+        """
+        Fill the Treeview with the rows from Top, reusing its items.
+        """
+        total = len(this.Model)
+        count = this._Visible()
+        this.Top = max(0, min(this.Top, total - count))
+        rows = range(this.Top, min(total, this.Top + count))
+
+        items = this.get_children()
+        if len(items) > len(rows):
+            this.delete(*items[len(rows):])
+            items = items[:len(rows)]
+
+        for i, row in enumerate(rows):
+            if i < len(items): this.item(items[i], values=this.Model.Row(row))
+            else: items += (this.insert("", "end", values=this.Model.Row(row)),)
+
+        this.selection_set([items[i] for i, row in enumerate(rows) if this.Model.Map(row) in this.SelectedRows])
+        this.YScroll.set(this.Top / total, rows.stop / total) if total else this.YScroll.set(0, 1)
+
+    def _Selected(this, evt = None):
+        # Rows out of the window stay selected
+        rows = range(this.Top, this.Top + len(this.get_children()))
+        this.SelectedRows.difference_update(this.Model.Map(row) for row in rows)
+        this.SelectedRows.update(this.Model.Map(this.Top + this.index(item)) for item in this.selection())
+
+    def GetSelectedPaths(this) -> list[str]:
+        return [this.Model.Store.GetPath(row) for row in sorted(this.SelectedRows)]
@@ -8,17 +8,18 @@
 # 	This is a part of the libtextworker project.
 # 	Licensed under the GNU General Public License version 3.0 or later.
 
-from hashlib import md5
 from tkinter import BooleanVar, Text, Misc, TclError
 from tkinter.font import Font
 from tkinter.ttk import Scrollbar, Frame
-from typing import overload
+from typing import Any, Callable
 
 from libtextworker.general import test_import
 from libtextworker import EDITOR_DIR
 
 from .miscs import CreateMenu
 from .. import stock_editor_configs
+from ..base.editor import AtomicWriter, BufferHash, CHUNK_SIZE, DirtyTracker, FileFingerprint, \
+                          IdleJob, MODIFIED, MOD_BUFFER, MOD_NONE, StreamLoad
 from ... import _
 from ...get_config import GetConfig
 
@@ -30,12 +31,135 @@ class StyledTextControl(Text):
     """
 
     FileLoaded: str = ""
-    Hash = md5("".encode("utf-8"))
+    Fingerprint: FileFingerprint
+    Hash: DirtyTracker
 
     def __init__(this, master: Misc | None = None, **kwds):
         this._frame = Frame(master)
         Text.__init__(this, this._frame, **kwds)
 
+        this._ChangeListeners = []
+        this._PendingChanges = []
+        this._Batch = None  # (first line, last line, line count) while batching edits
+        this._RedirectCommand()
+
+        this.Hash = DirtyTracker(this._FetchLines, this._LineCount())
+        this.AddChangeListener(this.Hash.Changed)
+
+    def destroy(this):
+        Text.destroy(this)
+        try:
+            this.tk.call("rename", this._w, "")
+        except TclError:
+            pass
+
+    # Edit tracking
+    def _RedirectCommand(this):
+        """
+        Put a Tcl proc in front of the widget command, so that every insert/delete/replace
+        (also the ones made by Tk's own key bindings, which never go through Python)
+        can be reported to change listeners, with positions.
+        Errors are left to Tcl, so `catch` in Tk bindings and TclError still work as usual.
+        """
+        this._orig = this._w + "_orig"
+        this._batchvar = this._w + "_batch"
+        before = this.register(this._BeforeEdit)
+        after = this.register(this._AfterEdit)
+
+        this.tk.setvar(this._batchvar, 0)
+        this.tk.call("rename", this._w, this._orig)
+        this.tk.eval(
+            "proc %(w)s {cmd args} {\n"
+            "    if {$cmd ni {insert delete replace} || [set {::%(batch)s}]} {return [%(orig)s $cmd {*}$args]}\n"
+            "    %(before)s $cmd {*}$args\n"
+            "    set result [%(orig)s $cmd {*}$args]\n"
+            "    %(after)s\n"
+            "    return $result\n"
+            "}" % {"w": this._w, "orig": this._orig, "batch": this._batchvar, "before": before, "after": after}
+        )
+
+    def BeginBatch(this, first: int = 0, last: int | None = None):
+        """
+        Start making many edits (e.g Replace All) without reporting them one by one.
+        Edits go straight to Tk (no Python call per edit), EndBatch() reports them as one edit.
+        @param first: First line (0-based) the edits touch
+        @param last: Last line the edits touch, as it is now. Defaults to the last line
+        """
+        if this._Batch: return
+        count = this._LineCount()
+        this._Batch = (first, count - 1 if last is None else last, count)
+        this.tk.setvar(this._batchvar, 1)
+
+    def EndBatch(this):
+        """
+        Stop batching edits, and let change listeners know (see BeginBatch).
+        """
+        if not this._Batch: return
+        first, last, count = this._Batch
+        this._Batch = None
+        this.tk.setvar(this._batchvar, 0)
+
+        # Lines first...last were joined into one, then split again
+        added = last - first + this._LineCount() - count
+        for listener in this._ChangeListeners:
+            listener(first, last - first, added)
+
+    def _LineOf(this, index: str) -> int:
+        return int(str(this.tk.call(this._orig, "index", index)).split(".")[0])
+
+    def _LineCount(this) -> int:
+        return this._LineOf("end-1c")
+
+    def _FetchLines(this, first: int, last: int | None) -> str:
+        return this.get(f"{first + 1}.0", "end-1c" if last is None else f"{last + 1}.0")
+
+    def _BeforeEdit(this, cmd: str, *args: str):
+        lastline = this._LineCount()
+        this._PendingChanges = []
+
+        def deleted(index1: str, index2: str):
+            if not this.tk.getboolean(this.tk.call(this._orig, "compare", index1, "<", index2)):
+                return
+            line = min(this._LineOf(index1), lastline)
+            this._PendingChanges.append((line - 1, min(this._LineOf(index2), lastline) - line, 0))
+
+        if cmd == "insert" and args:
+            added = sum(text.count("\n") for text in args[1::2])
+            this._PendingChanges.append((min(this._LineOf(args[0]), lastline) - 1, 0, added))
+
+        elif cmd == "delete" and args:
+            if len(args) == 1:
+                deleted(args[0], f"{args[0]}+1c")
+            else:
+                # Tk deletes ranges from the bottom, do the same
+                pairs = sorted(zip(args[0::2], args[1::2]), key=lambda pair: this._LineOf(pair[0]),
+                               reverse=True)
+                for index1, index2 in pairs:
+                    deleted(index1, index2)
+
+        elif cmd == "replace" and len(args) >= 3:
+            deleted(args[0], args[1])
+            added = sum(text.count("\n") for text in args[2::2])
+            this._PendingChanges.append((min(this._LineOf(args[0]), lastline) - 1, 0, added))
+
+    def _AfterEdit(this):
+        for change in this._PendingChanges:
+            for listener in this._ChangeListeners:
+                listener(*change)
+        this._PendingChanges = []
+
+    def AddChangeListener(this, func):
+        """
+        Call a function on every buffer edit.
+        The function receives 3 arguments: line (0-based), number of joined (removed) lines
+        and number of added lines - see DirtyTracker.Changed.
+        """
+        this._ChangeListeners.append(func)
+
+    def RemoveChangeListener(this, func):
+        if func in this._ChangeListeners:
+            this._ChangeListeners.remove(func)
+
     def EditorInit(this, useMenu: bool = False, useScrollBars: bool = True,
                    custom_config_path: str = EDITOR_DIR + "/editor.ini",
                    tabwidth: int = 4):
@@ -54,7 +178,7 @@ class StyledTextControl(Text):
         this.wrapbtn = BooleanVar(this)
 
         useMenu = bool(this.cfger.Get("menu", "enabled", False, True, True))
-        tabwidth = int(this.cfger.Get("indentation", "size", False, True, True))
+        tabwidth = this.cfger.GetInt("indentation", "size", find_everywhere=True, write_to_self=True)
 
         if useMenu:
             this._menu_init()
@@ -70,11 +194,6 @@ class StyledTextControl(Text):
             ln.pack(fill="y", side="left")
             this.bind("<<Modified>>", lambda evt: this._frame.after_idle(ln.redraw), add=True)
 
-        # On editor modify
-        def OnEditorModify(evt):
-            this.Hash = md5(this.get(1.0, "end").encode("utf-8"))
-        this.bind("<<Modified>>", OnEditorModify, add=True)
-
         # Tab size
         this.config(tabs=Font(font=this['font']).measure('  '*tabwidth))
 
@@ -131,43 +250,114 @@ class StyledTextControl(Text):
 
     # File load / save
     @property
-    def IsModified(this) -> bool:
+    def IsModified(this) -> MODIFIED:
         """
         Probably this will let you know if the editor content has been cooked or not.
+        The result is MOD_NONE (false), or MOD_BUFFER and/or MOD_DISK - see the MODIFIED class.
+        The loaded file is only read again if it has changed on disk.
         """
-        def checkhash(target): return not this.Hash.digest() == md5(target.encode("utf-8")).digest()
-        if not this.FileLoaded: return checkhash("") # Currently can't use .get?
-        return checkhash(open(this.FileLoaded, "r").read())
+        if not this.FileLoaded:
+            return MOD_BUFFER if this.Hash.digest() != BufferHash().digest() else MOD_NONE
+        return this.Fingerprint.Compare(this.Hash.digest())
 
-    def LoadFile(this, path: str):
+    def LoadFile(this, path: str, progress: Callable[[int, int], bool | None] | None = None,
+                 chunksize: int = CHUNK_SIZE, use_mmap: bool = False) -> bool:
         """
         Load a file.
         Warning: the path must exists on the file system, else
          an exception will be raised (no handle from us).
         Also this will OVERWRITE existing editor CONTENT, so make
          sure you have your backup way.
+
+        The file is read (and hashed) chunk by chunk, in one pass.
+        @param progress: Called with (read bytes, file size) after each chunk. Return False to stop.
+        @param chunksize: Chunk size in bytes
+        @param use_mmap: Memory-map the file instead of read() calls
+        @return False if stopped by `progress`, else True
         """
-        content = open(path, "r").read()
-        this.insert(1.0, content)
-        this.FileLoaded = path
-        this.Hash = md5(content.encode("utf-8"))
-    
-    @overload
-    def SaveFile(this, path: str):
+        steps = this._LoadSteps(path, lambda text: this.insert("end-1c", text), chunksize, use_mmap)
+        for done, total in steps:
+            if progress and progress(done, total) is False:
+                steps.close()
+                return False
+        return True
+
+    def LoadFileAsync(this, path: str, progress: Callable[[int, int], Any] | None = None,
+                      finished: Callable[[IdleJob], Any] | None = None,
+                      chunksize: int = CHUNK_SIZE, use_mmap: bool = False) -> IdleJob:
         """
-        Write the current editor contents into a file.
+        Like LoadFile, but inserts the file progressively on Tk's idle loop, so the UI keeps responding.
+        The editor is read-only until the job ends.
+        Call Cancel() on the returned job to stop - what has been inserted stays, FileLoaded is not changed.
+        @param finished: Called with the job when it ends (done, failed or cancelled)
         """
-        content = this.get(1.0, "end")
-        open(path, "w").write(content)
-        this.Hash = md5(content.encode("utf-8"))
-    
-    @overload
-    def SaveFile(this):
+        state = this["state"]
+
+        def write(text: str):
+            this.configure(state="normal")
+            this.insert("end-1c", text)
+            this.configure(state="disabled")
+
+        def done(job: IdleJob):
+            this.configure(state=state)
+            if finished: finished(job)
+
+        this.configure(state="disabled")
+        return IdleJob(this._LoadSteps(path, write, chunksize, use_mmap),
+                       this.after_idle, progress, done).Start()
+
+    def _LoadSteps(this, path: str, write: Callable[[str], Any], chunksize: int, use_mmap: bool):
+        # Loading a file is not something to undo (and the undo stack would keep a copy of it)
+        undo = this["undo"]
+        this.configure(undo=False)
+
+        try:
+            # A disabled Text ignores delete (LoadFileAsync disables it before this runs)
+            state = this["state"]
+            this.configure(state="normal")
+            this.delete(1.0, "end")
+            this.configure(state=state)
+            digest = yield from StreamLoad(path, write, chunksize, use_mmap=use_mmap)
+        finally:
+            this.configure(undo=undo)
+            this.edit_reset()
+
+        this.FileLoaded = path
+        this.Hash.Reset(this._LineCount(), digest)
+        this.Fingerprint = FileFingerprint(path, this.Hash.digest())
+
+    def SaveFile(this, path: str | None = None,
+                 progress: Callable[[int, int], bool | None] | None = None) -> bool:
         """
-        Write the current editor contents into the loaded file, if any.
-        If not able to, do nothing.
+        Write the current editor contents into a file.
+        If no path is specified, use the loaded file if any, else do nothing.
+
+        The content is written chunk by chunk into a temporary file, which then replaces the target.
+        @param progress: Called with (written lines, line count) after each chunk.
+            Return False to stop - the target file is left untouched.
+        @return True on success
         """
-        if this.FileLoaded: return this.SaveFile(this.FileLoaded)
+        if not path:
+            if not this.FileLoaded: return False
+            path = this.FileLoaded
+
+        result = BufferHash()
+        lines = this._LineCount()
+        step = this.Hash.ChunkLines
+
+        with AtomicWriter(path) as writer:
+            for first in range(0, lines, step):
+                text = this._FetchLines(first, first + step if first + step < lines else None)
+                writer.write(text)
+                result.update(text.encode("utf-8"))
+
+                if progress and progress(min(first + step, lines), lines) is False:
+                    writer.Discard()
+                    return False
+
+        this.FileLoaded = path
+        this.Fingerprint = FileFingerprint(path, result.digest())
+        return True
 
     # Wrap mode
     def wrapmode(this, event=None) -> bool:
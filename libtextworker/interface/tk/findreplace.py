@@ -1,132 +1,293 @@
-"""
-@package libtextworker.interface.tk.findreplace
-@brief Find & Replace dialog(s)
-"""
-
-#	A cross-platform library for Python apps.
-#	Copyright (C) 2023-2024 Le Bao Nguyen and contributors.
-#	This is a part of the libtextworker project.
-#	Licensed under the GNU General Public License version 3.0 or later.
-
-import tkinter
-from tkinter.ttk import Button, Checkbutton, Frame, Label, Entry
-
-from . import TK_USEGRID, actionrow, TK_USEPACK
-from ... import _
-
-class FindReplace(Frame):
-    """
-    A find-replace frame for Tkinter text editors.
-    """
-
-    Target: tkinter.Text
-    LastIndex: str = "1.0"
-
-    def __init__(this, master: tkinter.Misc, editor: tkinter.Text, placestyle = TK_USEGRID,
-                 addReplace: bool = False, foundBackground: str = "yellow", *args, **kwds):
-        """
-        Constructor.
-
-        @param master: The frame's parent
-        @param editor: Target editor
-        @param placestyle: How we need to place things (grid, pack)
-        @param addReplace: Enable text replace function
-        @param foundBackground: Match text's background color
-        """
-        Frame.__init__(this, master, *args, **kwds)
-        this.Target = editor
-
-        # UI Building
-        if TK_USEGRID in placestyle:
-            target = actionrow.ActionRow.PlaceObj
-            leftside = {"column": -1}
-            rightside = {"row": -1}
-            currcolumn = 0 # Currently used column
-
-            def placewidget(which):
-                nonlocal currcolumn
-                currcolumn += 1
-                which.grid(row=0, column = currcolumn)
-        else:
-            if not TK_USEPACK in placestyle:
-                from warnings import warn
-                warn("TK_USEPLACE is not supported in FindReplace frame. Will use Pack method instead.")
-
-            target = actionrow.ActionRow.PlaceObjPack
-            leftside = {"side": "left"}
-            rightside = {"side": "right"}
-
-            def placewidget(which):
-                which.pack(fill="x")
-
-        ## Find entry
-        row1 = actionrow.ActionRow(this)
-        target(row1, Label, text=_("Find for:"), **leftside)
-        this.find_var = tkinter.StringVar()
-        # this.find_var.trace_add('write', lambda _, __, ___: this.Search())
-        target(row1, Entry, justify="left", textvariable=this.find_var).bind("<KeyRelease>", lambda evt: this.Search())
-        placewidget(row1)
-
-        ## Replace buttons
-        if addReplace:
-            row2 = actionrow.ActionRow(this)
-            this.replaceentry = target(row2, Entry, justify="left")
-            target(row2, Label, text=_("Replace with:"))
-            placewidget(row2)
-
-            do2_row = actionrow.ActionRow(this)
-            target(do2_row, Button, text=_("Replace"), **rightside).configure(command=lambda: this.Replace(1))
-            target(do2_row, Button, text=_("Replace all"), **rightside).configure(command=lambda: this.Replace(2))
-            placewidget(do2_row)
-
-        ## Use regex
-        regex_row = actionrow.ActionRow(this)
-        target(regex_row, Label, side="right", text=_("Use regular expression"))
-        this.regex_chk = tkinter.BooleanVar()
-        target(regex_row, Checkbutton, variable=this.regex_chk)
-        placewidget(regex_row)
-        
-        ## Case sensitive
-        case_row = actionrow.ActionRow(this)
-        target(case_row, Label, side="right", text=_("Case sensitive"))
-        this.case_chk = tkinter.BooleanVar()
-        target(case_row, Checkbutton, variable=this.case_chk)
-        placewidget(case_row)
-
-        # Set find matches color tag
-        this.Target.tag_config("found", background=foundBackground)
-    
-    """
-    Search for strings specified in the dialog.
-    """
-    def Search(this):
-        text = this.find_var.get()
-        pos = "1.0"
-        this.Target.tag_remove("found", pos, "end")
-
-        if text:
-
-            while True:
-                pos = this.Target.search(
-                    text, # pattern
-                    this.LastIndex, # index
-                    'end', # stop index
-                    nocase=not this.case_chk.get(),
-                    regexp=this.regex_chk.get()
-                )
-                if not pos: break
-                this.LastIndex = f"{pos}+{len(text)}c"
-                this.Target.tag_add("found", this.LastIndex)
-                pos = this.LastIndex
-    
-    """
-    Replace using strings specified in the dialog.
-    """
-    def Replace(this, evt):
-        index2 = this.LastIndex if evt == 1 else 'end'
-        this.Target.replace(
-            1.0, # from index
-            index2, # to index
-            this.Target.get(1.0, index2)
-                       .replace(this.find_var.get(), this.replaceentry.get())
-        )
\ No newline at end of file
+"""
+@package libtextworker.interface.tk.findreplace
+@brief Find & Replace dialog(s)
+"""
+
+#	A cross-platform library for Python apps.
+#	Copyright (C) 2023-2024 Le Bao Nguyen and contributors.
+#	This is a part of the libtextworker project.
+#	Licensed under the GNU General Public License version 3.0 or later.
+
+import re
+import tkinter
+from tkinter.ttk import Button, Checkbutton, Frame, Label, Entry
+
+from . import TK_USEGRID, actionrow, TK_USEPACK
+from ..base.findreplace import CompilePattern, Replacements, SearchCache, SearchEngine
+from ... import _
+
+class FindReplace(Frame):
+    """
+    A find-replace frame for Tkinter text editors.
+    """
+
+    Target: tkinter.Text
+    LastIndex: str = "1.0" # End of the selected match
+    Engine: SearchEngine
+    Cache: SearchCache
+    PollInterval: int = 20 # ms between checks for new matches
+
+    def __init__(this, master: tkinter.Misc, editor: tkinter.Text, placestyle = TK_USEGRID,
+                 addReplace: bool = False, foundBackground: str = "yellow", *args, **kwds):
+        """
+        Constructor.
+
+        @param master: The frame's parent
+        @param editor: Target editor
+        @param placestyle: How we need to place things (grid, pack)
+        @param addReplace: Enable text replace function
+        @param foundBackground: Match text's background color
+        """
+        Frame.__init__(this, master, *args, **kwds)
+        this.Target = editor
+        this.Engine = SearchEngine(this._Found, this._Finished)
+        this._pollid = None
+        this._query = None
+        this._selectnext = False
+        this._searchkey = None
+
+        # Matches of recent searches. StyledTextControl reports its edits, so the cache can follow them;
+        # for other Text widgets, it is cleared when the text has changed between two searches.
+        if hasattr(editor, "AddChangeListener"):
+            this.Cache = SearchCache(editor._FetchLines)
+            editor.AddChangeListener(this.Cache.Changed)
+            this._snapshot = None
+        else:
+            this.Cache = SearchCache(lambda first, last: editor.get(f"{first + 1}.0", "end-1c" if last is None else f"{last + 1}.0"))
+            this._snapshot = ""
+
+        # UI Building
+        if TK_USEGRID in placestyle:
+            target = actionrow.ActionRow.PlaceObj
+            leftside = {"column": -1}
+            rightside = {"row": -1}
+            currcolumn = 0 # Currently used column
+
+            def placewidget(which):
+                nonlocal currcolumn
+                currcolumn += 1
+                which.grid(row=0, column = currcolumn)
+        else:
+            if not TK_USEPACK in placestyle:
+                from warnings import warn
+                warn("TK_USEPLACE is not supported in FindReplace frame. Will use Pack method instead.")
+
+            target = actionrow.ActionRow.PlaceObjPack
+            leftside = {"side": "left"}
+            rightside = {"side": "right"}
+
+            def placewidget(which):
+                which.pack(fill="x")
+
+        ## Find entry
+        row1 = actionrow.ActionRow(this)
+        target(row1, Label, text=_("Find for:"), **leftside)
+        this.find_var = tkinter.StringVar()
+        # this.find_var.trace_add('write', lambda _, __, ___: this.Search())
+        target(row1, Entry, justify="left", textvariable=this.find_var).bind("<KeyRelease>", this._OnKey)
+        placewidget(row1)
+
+        ## Matches & navigation
+        nav_row = actionrow.ActionRow(this)
+        this.count_var = tkinter.StringVar()
+        target(nav_row, Label, textvariable=this.count_var, **leftside)
+        target(nav_row, Button, text=_("Next"), **rightside).configure(command=this.Next)
+        target(nav_row, Button, text=_("Previous"), **rightside).configure(command=this.Previous)
+        placewidget(nav_row)
+
+        ## Replace buttons
+        if addReplace:
+            row2 = actionrow.ActionRow(this)
+            this.replaceentry = target(row2, Entry, justify="left")
+            target(row2, Label, text=_("Replace with:"))
+            placewidget(row2)
+
+            do2_row = actionrow.ActionRow(this)
+            target(do2_row, Button, text=_("Replace"), **rightside).configure(command=lambda: this.Replace(1))
+            target(do2_row, Button, text=_("Replace all"), **rightside).configure(command=lambda: this.Replace(2))
+            placewidget(do2_row)
+
+        ## Use regex
+        regex_row = actionrow.ActionRow(this)
+        target(regex_row, Label, side="right", text=_("Use regular expression"))
+        this.regex_chk = tkinter.BooleanVar()
+        target(regex_row, Checkbutton, variable=this.regex_chk, command=this.Search)
+        placewidget(regex_row)
+        
+        ## Case sensitive
+        case_row = actionrow.ActionRow(this)
+        target(case_row, Label, side="right", text=_("Case sensitive"))
+        this.case_chk = tkinter.BooleanVar()
+        target(case_row, Checkbutton, variable=this.case_chk, command=this.Search)
+        placewidget(case_row)
+
+        # Set find matches color tag
+        this.Target.tag_config("found", background=foundBackground)
+        this.Target.tag_lower("found", "sel")
+    
+    def destroy(this):
+        if hasattr(this.Target, "RemoveChangeListener"):
+            this.Target.RemoveChangeListener(this.Cache.Changed)
+        Frame.destroy(this)
+
+    @property
+    def MatchCount(this) -> int:
+        return this.Engine.MatchCount
+
+    def _OnKey(this, evt):
+        # Navigation keys don't change the query
+        if evt.keysym == "Return": this.Next()
+        elif this.find_var.get() != this._query: this.Search()
+
+    """
+    Search for strings specified in the dialog.
+    Results of recent searches are reused, also when the query extends a previous one.
+    Otherwise the search runs in the background, and cancels the previous one.
+    Matches are highlighted as they are found.
+    """
+    def Search(this):
+        text = this.find_var.get()
+        regex = this.regex_chk.get()
+        case = this.case_chk.get()
+        this._query = text
+        this._searchkey = None
+        this.LastIndex = "1.0"
+        this.Target.tag_remove("found", "1.0", "end")
+
+        if this._pollid:
+            this.after_cancel(this._pollid)
+            this._pollid = None
+
+        snapshot = None
+        if this._snapshot is not None:
+            snapshot = this.Target.get("1.0", "end-1c")
+            if snapshot != this._snapshot:
+                this.Cache.Clear()
+                this._snapshot = snapshot
+
+        matches = this.Cache.Lookup(text, regex, case) if text else None
+        if matches is not None:
+            this.Engine.Use(matches)
+            return
+
+        try:
+            generation = this.Cache.Generation
+            job = this.Engine.Search(snapshot if snapshot is not None else this.Target.get("1.0", "end-1c"),
+                                     text, regex, case)
+            this._searchkey = (text, regex, case, generation)
+        except re.error as e:
+            this.count_var.set(_("Invalid regular expression: %s") % e.msg)
+            return
+
+        if job:
+            this.count_var.set(_("Searching..."))
+            this._pollid = this.after(this.PollInterval, this._Poll)
+        else:
+            this.count_var.set("")
+
+    def _Poll(this):
+        this._pollid = this.after(this.PollInterval, this._Poll) if this.Engine.Poll() else None
+
+    def _Found(this, batch: list):
+        # One tag_add call per batch, when Tk is idle
+        indexes = []
+        for match in batch:
+            indexes += (f"{match[2]}.{match[3]}", f"{match[4]}.{match[5]}")
+        generation = this.Engine.Generation
+        this.after_idle(lambda: generation == this.Engine.Generation and this.Target.tag_add("found", *indexes))
+        this.count_var.set(_("%d matches") % this.Engine.MatchCount)
+
+    def _Finished(this, engine: SearchEngine):
+        this.count_var.set(_("%d matches") % engine.MatchCount)
+        if this._searchkey:
+            this.Cache.Store(*this._searchkey[:3], engine.Matches, this._searchkey[3])
+            this._searchkey = None
+        if this._selectnext:
+            this._selectnext = False
+            this.Next()
+
+    def _Select(this, match):
+        if not match: return
+        start = f"{match[2]}.{match[3]}"
+        this.LastIndex = f"{match[4]}.{match[5]}"
+        this.Target.tag_remove("sel", "1.0", "end")
+        this.Target.tag_add("sel", start, this.LastIndex)
+        this.Target.mark_set("insert", this.LastIndex)
+        this.Target.see(start)
+        this.count_var.set(_("%d of %d matches") % (this.Engine.Current + 1, this.Engine.MatchCount))
+
+    def Next(this):
+        """
+        Select the next match after the insert cursor.
+        """
+        this._Select(this.Engine.Next(*map(int, this.Target.index("insert").split("."))))
+
+    def Previous(this):
+        """
+        Select the previous match before the current selection (or insert cursor).
+        """
+        pos = this.Target.index("sel.first" if this.Target.tag_ranges("sel") else "insert")
+        this._Select(this.Engine.Previous(*map(int, pos.split("."))))
+
+    """
+    Replace using strings specified in the dialog.
+    @param evt: 1 to replace the selected match (then select the next one), 2 to replace all
+    @return Number of replacements
+    """
+    def Replace(this, evt) -> int:
+        try:
+            pattern = CompilePattern(this.find_var.get(), this.regex_chk.get(), this.case_chk.get())
+        except re.error as e:
+            this.count_var.set(_("Invalid regular expression: %s") % e.msg)
+            return 0
+
+        if not pattern.pattern: return 0
+        regex = this.regex_chk.get()
+
+        if evt == 1:
+            if not this.Target.tag_ranges("sel"):
+                this.Next()
+                return 0
+            start = this.Target.index("sel.first")
+            text = this.Target.get(start, "sel.last")
+            edits = [((0, len(text), *map(int, start.split(".")), *map(int, this.Target.index("sel.last").split("."))),
+                      m.expand(this.replaceentry.get()) if regex else this.replaceentry.get())
+                     for m in [pattern.fullmatch(text)] if m]
+        else:
+            edits = Replacements(this.Target.get("1.0", "end-1c"), pattern, this.replaceentry.get(), regex)
+
+        this.ApplyReplacements(edits)
+        if evt == 1:
+            this._selectnext = True
+            this.Search()
+        else:
+            # Matches are gone, search again on the next keystroke
+            this.Engine.Cancel()
+            this._query = None
+            this.Target.tag_remove("found", "1.0", "end")
+            this.count_var.set(_("%d replacements") % len(edits))
+        return len(edits)
+
+    def ApplyReplacements(this, edits: list):
+        """
+        Apply (match, new text) pairs, bottom-up, as one undo step.
+        Only the matched ranges are touched - tags and marks elsewhere are kept.
+        StyledTextControl reports them to its change listeners as one edit.
+        """
+        if not edits: return
+
+        autoseparators = this.Target.cget("autoseparators")
+        this.Target.configure(autoseparators=False)
+        this.Target.edit_separator()
+
+        batch = hasattr(this.Target, "BeginBatch")
+        if batch: this.Target.BeginBatch(edits[0][0][2] - 1, edits[-1][0][4] - 1)
+
+        replace = this.Target.replace
+        try:
+            for match, new in reversed(edits):
+                replace(f"{match[2]}.{match[3]}", f"{match[4]}.{match[5]}", new)
+        finally:
+            if batch: this.Target.EndBatch()
+            this.Target.edit_separator()
+            this.Target.configure(autoseparators=autoseparators)
@@ -0,0 +1,179 @@
+"""
+@package libtextworker.interface.tk.viewer
+@brief Read-only viewer for huge (log) files.
+"""
+
+# 	A cross-platform library for Python apps.
+# 	Copyright (C) 2023-2024 Le Bao Nguyen and contributors.
+# 	This is a part of the libtextworker project.
+# 	Licensed under the GNU General Public License version 3.0 or later.
+
+from tkinter import Text, Misc
+from tkinter.font import Font
+from tkinter.ttk import Scrollbar, Frame
+
+from ..base.viewer import LineIndex, ViewWindow
+
+
+class LargeFileViewer(Text):
+    """
+    A read-only Text widget for files which are too large to be loaded as a whole.
+
+    The file is memory-mapped and its lines are indexed in a background thread.
+    Only the visible lines plus a margin are put into the widget, and they are swapped
+    as the user scrolls. The scroll bar and line numbers come from the index, not from the widget.
+
+    Note: Use LargeFileViewer._frame as the real LargeFileViewer's parent.
+    """
+
+    Index: LineIndex | None = None
+    Window: ViewWindow | None = None
+    Top: int = 0  # First visible line (0-based)
+
+    def __init__(this, master: Misc | None = None, margin: int = 200,
+                 linenumbers: bool = True, **kwds):
+        """
+        Constructor.
+        @param master: Parent widget
+        @param margin: Number of lines to keep above & below the visible ones
+        @param linenumbers: Show line numbers
+        """
+        this._frame = Frame(master)
+        kwds.setdefault("wrap", "none")
+        Text.__init__(this, this._frame, **kwds)
+
+        this.Margin = margin
+        this._rendering = False
+        this._lineheight = 0  # Pixels, 0 = not measured (yet or since the font changed)
+
+        this._ybar = Scrollbar(this._frame, orient="vertical", command=this._OnScrollBar)
+        this._xbar = Scrollbar(this._frame, orient="horizontal", command=this.xview)
+        this.configure(xscrollcommand=this._xbar.set, yscrollcommand=this._OnTextScroll, state="disabled")
+
+        this._ybar.pack(side="right", fill="y")
+        this._xbar.pack(side="bottom", fill="x")
+
+        this.LineNumbers: Text | None = None
+        if linenumbers:
+            this.LineNumbers = Text(this._frame, width=1, wrap="none", takefocus=0, cursor="arrow",
+                                    font=this["font"], state="disabled")
+            this.LineNumbers.pack(side="left", fill="y")
+
+        this.pack(side="left", fill="both", expand=True)
+        this.bind("<Configure>", lambda evt: this._Render(), add=True)
+
+    def destroy(this):
+        this.CloseFile()
+        Text.destroy(this)
+
+    def OpenFile(this, path: str, encoding: str = "utf-8"):
+        """
+        Show a file. Indexing starts in the background, lines show up as they get indexed.
+        """
+        this.CloseFile()
+        this.Index = LineIndex(path, encoding).Start()
+        this.Window = ViewWindow(this.Index, this.Margin)
+        this.Top = 0
+        this._Poll()
+
+    def CloseFile(this):
+        if this.Index:
+            this.Index.Close()
+        this.Index = this.Window = None
+        this._Fill([], 0)
+
+    def configure(this, cnf=None, **kw):
+        if "font" in kw or (isinstance(cnf, dict) and "font" in cnf):
+            this._lineheight = 0
+        return Text.configure(this, cnf, **kw)
+
+    config = configure
+
+    def _Poll(this):
+        # The index thread can't touch Tk - check its progress from here.
+        # Read the state before rendering: lines indexed in between are drawn by the next round,
+        # or by this one if indexing is over
+        if not this.Index: return
+        running = not (this.Index.Done or this.Index.Cancelled or this.Index.Error)
+        this._Render()
+        if running:
+            this.after(100, this._Poll)
+
+    def _Visible(this) -> int:
+        if not this._lineheight:
+            this._lineheight = Font(font=this["font"]).metrics("linespace")
+        return max(1, this.winfo_height() // this._lineheight)
+
+    def _Fill(this, lines: list[str], first: int):
+        this.configure(state="normal")
+        this.delete("1.0", "end")
+        this.insert("1.0", "\n".join(lines))
+        this.configure(state="disabled")
+
+        if this.LineNumbers:
+            total = this.Index.LineCount if this.Index else 0
+            this.LineNumbers.configure(state="normal", width=len(str(total)))
+            this.LineNumbers.delete("1.0", "end")
+            this.LineNumbers.insert("1.0", "\n".join(str(i) for i in range(first + 1, first + len(lines) + 1)))
+            this.LineNumbers.configure(state="disabled")
+
+    def _Render(this, force: bool = False):
+        """
+        Bring the widget to this.Top, swapping lines if needed.
+        """
+        if not this.Index: return
+
+        visible = this._Visible()
+        total = this.Index.LineCount
+        this.Top = max(0, min(this.Top, total - visible))
+
+        this._rendering = True
+        if force or this.Window.Needs(this.Top, visible):
+            this._Fill(this.Window.Move(this.Top, visible), this.Window.First)
+
+        this.yview(f"{this.Top - this.Window.First + 1}.0")
+        if this.LineNumbers:
+            this.LineNumbers.yview(f"{this.Top - this.Window.First + 1}.0")
+        this._rendering = False
+
+        this._UpdateScrollBar(visible, total)
+
+    def _UpdateScrollBar(this, visible: int, total: int):
+        if total <= 0:
+            this._ybar.set(0, 1)
+        else:
+            this._ybar.set(this.Top / total, min(1, (this.Top + visible) / total))
+
+    def _OnTextScroll(this, first: str, last: str):
+        """
+        The Text widget scrolled by itself (mouse wheel, keys, selection...).
+        """
+        if this._rendering or not this.Index: return
+
+        inside = int(this.index("@0,0").split(".")[0]) - 1
+        this.Top = this.Window.First + inside
+        visible = this._Visible()
+
+        if this.Window.Needs(this.Top, visible):
+            this._Render()
+        else:
+            if this.LineNumbers:
+                this.LineNumbers.yview(f"{inside + 1}.0")
+            this._UpdateScrollBar(visible, this.Index.LineCount)
+
+    def _OnScrollBar(this, action: str, value: str, unit: str | None = None):
+        if not this.Index: return
+
+        if action == "moveto":
+            this.Top = int(float(value) * this.Index.LineCount)
+        elif action == "scroll":
+            this.Top += int(value) * (this._Visible() if unit == "pages" else 1)
+
+        this._Render()
+
+    def GoToLine(this, line: int):
+        """
+        Scroll to a line (0-based).
+        """
+        this.Top = line
+        this._Render()
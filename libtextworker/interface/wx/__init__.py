@@ -14,7 +14,10 @@ Else libtextworker will refuse to use this package.
 #	This is a part of the libtextworker project.
 #	Licensed under the GNU General Public License version 3.0 or later.
 
+import time
+
 from libtextworker import Importable
+from libtextworker.general import logger
 from . import constants
 from .. import manager
 
@@ -26,6 +29,7 @@ else:
 
 class ColorManager(manager.ColorManager):
     recursive_configure: bool = True
+    CallAfter = staticmethod(constants.CALL_AFTER)
 
     def GetFont(this):
         size, style, weight, family = manager.ColorManager.GetFont(this)
@@ -37,24 +41,64 @@ class ColorManager(manager.ColorManager):
         return wx.Font(size, wx.FONTFAMILY_MODERN, constants.FONTST[style],
                        constants.FONTWT[weight], 0, family)
 
-    def configure(this, widget: wx.Control, color: str | None = None, childs_too: bool = recursive_configure):
-        manager.ColorManager.configure(this, widget, color)
+    def configure(this, widget: wx.Control, color: str | None = None,
+                  childs_too: bool = recursive_configure) -> manager.ThemeReport:
+        """
+        Style a widget, and its children (all levels) if childs_too is True.
+        @see ApplyAll
+        """
+        return this.ApplyAll(widget, color, childs_too)
+
+    def ApplyAll(this, widget: wx.Window, color: str | None = None, childs_too: bool = True) -> manager.ThemeReport:
+        """
+        Style a widget and its children (all levels) in one go.
+
+        Colors and font are resolved once, widgets which already use them are left alone,
+        and the top-level window is frozen while styling - then refreshed once.
+        @return Number of widgets walked and changed, and the time it took
+        """
+        start = time.perf_counter()
+        theme = this.ResolveTheme(color)
 
         # fore&back
-        bg, fg = this.GetColor()
-        bg = wx.Colour(*manager.hextorgb(bg))
-        fg = wx.Colour(*manager.hextorgb(fg))
-
-        # font
-        font = this.GetFont()
-        if childs_too and hasattr(widget, "GetChildren"):
-            widget.SetBackgroundColour(bg)
-            widget.SetForegroundColour(fg)
-            for children in widget.GetChildren():
-                this.configure(children, color, True)
-        else:
-            widget.SetOwnBackgroundColour(bg)
-            widget.SetOwnForegroundColour(fg)
-
-        widget.SetFont(font)
-        widget.Refresh()
\ No newline at end of file
+        bg = wx.Colour(*manager.hextorgb(theme.Background))
+        fg = wx.Colour(*manager.hextorgb(theme.Foreground))
+
+        top = wx.GetTopLevelParent(widget) or widget
+        freeze = not top.IsFrozen()
+        if freeze: top.Freeze()
+
+        walked = changed = 0
+        try:
+            stack = [widget]
+            while stack:
+                current = stack.pop()
+                if not current: continue # Died
+                walked += 1
+
+                this.ApplyFunctions(current, theme)
+
+                container = childs_too and hasattr(current, "GetChildren")
+                if container:
+                    stack.extend(reversed(list(current.GetChildren())))
+
+                if current.GetBackgroundColour() == bg and current.GetForegroundColour() == fg \
+                        and current.GetFont() == theme.Font:
+                    continue
+
+                if container:
+                    current.SetBackgroundColour(bg)
+                    current.SetForegroundColour(fg)
+                else:
+                    current.SetOwnBackgroundColour(bg)
+                    current.SetOwnForegroundColour(fg)
+                current.SetFont(theme.Font)
+                changed += 1
+        finally:
+            if freeze: top.Thaw()
+
+        if changed: top.Refresh()
+
+        report = manager.ThemeReport(walked, changed, time.perf_counter() - start)
+        logger.debug("Themed %d widgets (%d changed) in %.1fms", report.Widgets, report.Changed, report.Seconds * 1000)
+        return report
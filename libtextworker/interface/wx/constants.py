@@ -31,3 +31,8 @@ LOG_ERROR = wx.LogError
 LOG_EXCEPTION = wx.LogError
 LOG_NORMAL = wx.LogMessage
 LOG_WARNING = wx.LogWarning
+
+# Runs a function on the GUI thread when wx is idle (used for queued log messages,
+# system theme changes...). Without a wx.App, it runs now.
+CALL_AFTER = lambda func: wx.CallAfter(func) if wx.GetApp() else func()
+LOG_SCHEDULE = CALL_AFTER
@@ -8,7 +8,6 @@
 # 	Licensed under the GNU General Public License version 3.0 or later.
 
 import os
-import time
 import wx
 import wx.lib.newevent
 
@@ -21,7 +20,7 @@ from typing import Callable
 
 if Importable["watchdog"]:
     from watchdog.events import FileSystemEvent, FileSystemEventHandler
-    from watchdog.observers import Observer
+    from libtextworker.watch import DirPatch, EventCoalescer, Subscription, Watch, Unwatch
 
 
     class FSEventHandler(FileSystemEventHandler):
@@ -39,12 +38,11 @@ if Importable["watchdog"]:
 
         Example usage:
         ```python
-            from watchdog.observers import Observer
+            from libtextworker.watch import Watch
             (...)
 
             def on_close(evt): # On window close
-                observer.stop()
-                observer.join()
+                subscription.Cancel()
                 evt.Skip()
 
             def func(evt):
@@ -55,9 +53,7 @@ if Importable["watchdog"]:
             path = os.path.expanduser('~/')
             evt_handler = FSEventHandler()
             evt_handler.Target = wind
-            observer = Observer()
-            observer.schedule(evt_handler, path, recursive=True)
-            observer.start()
+            subscription = Watch(path, evt_handler.dispatch, recursive=True)
         ```
         """
 
@@ -73,7 +69,7 @@ if Importable["watchdog"]:
         def on_moved(this, event: FileSystemEvent): 
             if this.evtIsDir(event) == "Dir": cls_to_use = DirMovedEvent
             else: cls_to_use = FileMovedEvent
-            wx.PostEvent(this.getTarget(), cls_to_use(path=event.src_path))
+            wx.PostEvent(this.getTarget(), cls_to_use(path=event.src_path, dest=event.dest_path))
 
         def on_created(this, event: FileSystemEvent): 
             if this.evtIsDir(event) == "Dir": cls_to_use = DirCreatedEvent
@@ -102,6 +98,7 @@ else:
 # File system events
 # I leave them here and you just do what you want to
 # Each *Event class here (yeah they are classes) accepts path as the main keyword.
+# Moved events also have dest (the new path).
 # Use: wx.PostEvent(target, *Event(path=event.src_path)) with event is a watchdog's FileSystemEvent object
 
 FileEditedEvent, EVT_FILE_EDITED = wx.lib.newevent.NewEvent()
@@ -116,6 +113,10 @@ DirCreatedEvent, EVT_DIR_CREATED = wx.lib.newevent.NewEvent()
 DirMovedEvent, EVT_DIR_MOVED = wx.lib.newevent.NewEvent()
 DirDeletedEvent, EVT_DIR_DELETED = wx.lib.newevent.NewEvent()
 
+# DirCtrl and DirList do not get the events above - they take file system changes in batches
+# (see libtextworker.watch.EventCoalescer), then post this with patches={directory: DirPatch}
+DirChangesEvent, EVT_DIR_CHANGES = wx.lib.newevent.NewEvent()
+
 # Index for images (for nodes)
 
 imgs = wx.ImageList(16, 16)
@@ -139,9 +140,6 @@ class DirCtrl(wx.TreeCtrl, FSEventHandler, DirCtrlBase):
     Parent_ArgName = "parent"
     TargetIsSelf = True
 
-    if Importable["watchdog"]:
-        Observers: dict[str] = {}
-
     def __init__(this, *args, **kw):
         """
         A directory list made from wxTreeCtrl.
@@ -198,31 +196,29 @@ class DirCtrl(wx.TreeCtrl, FSEventHandler, DirCtrlBase):
         wx.TreeCtrl.__init__(this, *args, **kw)
         this.AssignImageList(imgs)
 
+        this.Watches: dict[str, "Subscription"] = {}  # Watch hub subscriptions, by root path
+        this.Loaders: dict[wx.TreeItemId, DirLoader] = {}  # Nodes being listed
+
+        # Items by their paths (PathKey). Paths of items are stored as their item data
+        this.Paths: dict[str, wx.TreeItemId] = {}
+
         this.Bind(wx.EVT_TREE_ITEM_EXPANDED, this.LazyExpand)
         this.Bind(wx.EVT_TREE_SEL_CHANGED, this.LazyExpand)
+        this.Bind(wx.EVT_TREE_ITEM_COLLAPSED, this.OnCollapsed)
+        this.Bind(wx.EVT_TREE_DELETE_ITEM, this.OnDeleted) # Sent for each deleted item, children included
 
         if Importable["watchdog"]:
-            def AddItem(evt: FileCreatedEvent | DirCreatedEvent): # type: ignore
-                this.AppendItem(this.MatchItem(os.path.dirname(evt.path)),
-                                os.path.basename(evt.path),
-                                fileidx if isinstance(evt, FileCreatedEvent) else folderidx)
-                evt.Skip()
-            
-            def DeleteItem(evt: FileDeletedEvent | DirDeletedEvent): # type: ignore
-                wx.TreeCtrl.Delete(this, this.MatchItem(evt.path))
-                evt.Skip()
-
-            this.Bind(EVT_FILE_CREATED, AddItem)
-            this.Bind(EVT_DIR_CREATED, AddItem)
-            this.Bind(EVT_FILE_DELETED, DeleteItem)
-            this.Bind(EVT_DIR_DELETED, DeleteItem)
+            this.Coalescer = EventCoalescer(this.ApplyPatches, wx.CallAfter)
     
     def Destroy(this):
+        for sub in this.Watches.values():
+            sub.Cancel()
+        this.Watches.clear()
         if Importable["watchdog"]:
-            if this.Observers:
-                for item in this.Observers:
-                    this.Observers[item].stop()
-                    this.Observers[item].join()
+            this.Coalescer.Cancel()
+        for loader in this.Loaders.values():
+            loader.Cancel()
+        this.Loaders.clear()
         return wx.TreeCtrl.Destroy(this)
 
     def LazyExpand(this, what: wx.PyEvent | wx.TreeItemId):
@@ -232,31 +228,59 @@ class DirCtrl(wx.TreeCtrl, FSEventHandler, DirCtrlBase):
         Explain: if the target item has childs inside, that means
         the item has been opened before. This can be done by checking
         whether the item full path is a directory and has items inside.
+
+        Items are listed in the background and inserted in batches (sorted),
+        while a "Loading..." item shows up.
         """
 
         path = what if isinstance(what, wx.TreeItemId) else this.GetSelection()
 
         fullpath = os.path.normpath(this.GetFullPath(path))
 
-        if os.path.isdir(fullpath) and this.ItemHasChildren(path):
+        if path not in this.Loaders and os.path.isdir(fullpath) and this.ItemHasChildren(path):
             wx.TreeCtrl.DeleteChildren(this, path)
             this.SetItemImage(path, openfolderidx, wx.TreeItemIcon_Expanded)
-            ls = os.listdir(fullpath)
-
-            for item in ls:
-                craftedpath = CraftItems(fullpath, item)
-                if os.path.isfile(craftedpath) and DC_DIRONLY in this.Styles:
-                    continue
-                icon = folderidx if os.path.isdir(craftedpath) else fileidx
-
-                newitem = this.AppendItem(path, item, icon)
+            placeholder = this.AppendItem(path, _("Loading..."))
+
+            def found(batch: list[tuple[DirItem, bool]]):
+                for item, expandable in batch:
+                    newitem = this.InsertItem(path, loader.Place(item), item.Name,
+                                              folderidx if item.IsDir else fileidx)
+                    this.Track(newitem, item.Path)
+                    if expandable:
+                        this.SetItemHasChildren(newitem)
+
+            def finished(loader: DirLoader):
+                del this.Loaders[path]
+                wx.TreeCtrl.Delete(this, placeholder)
+                if loader.Error:
+                    wx.LogWarning(_("Unable to list %s: %s") % (loader.Path, loader.Error))
+
+            # One wakeup per queued batch, so one Poll() delivers one batch
+            loader = DirLoader(fullpath, found, finished, DC_DIRONLY in this.Styles, probe=True,
+                               wakeup=lambda: wx.CallAfter(this._PollLoader, path))
+            this.Loaders[path] = loader.Start()
 
-                if os.path.isdir(craftedpath) and len(os.listdir(craftedpath)) >= 1:
-                    this.SetItemHasChildren(newitem)
-        
         if isinstance(what, wx.PyEvent):
             what.Skip()
 
+    def _PollLoader(this, item: wx.TreeItemId):
+        if this and item in this.Loaders: # Not destroyed, still listing
+            this.Loaders[item].Poll()
+
+    def OnCollapsed(this, evt: wx.TreeEvent):
+        """
+        Stop listing a node which is collapsed while still being listed.
+        It will be listed again on the next expansion.
+        """
+
+        item = evt.GetItem()
+        if item in this.Loaders:
+            this.Loaders.pop(item).Cancel()
+            wx.TreeCtrl.DeleteChildren(this, item)
+            this.SetItemHasChildren(item)
+        evt.Skip()
+
     def SetFolder(this, path: str):
         """
         Make DirCtrl to open (a) directory.
@@ -268,16 +292,14 @@ class DirCtrl(wx.TreeCtrl, FSEventHandler, DirCtrlBase):
 
         if not DC_ONEROOT in this.Styles and DC_HIDEROOT in this.Styles:
             root = this.GetRootItem()
-            kickstart = None
             if not root: root = this.AddRoot("Hidden root")
-            else:
-                for x in this.GetNodeChildren(root):
-                    if this.GetItemText(x) == path:
-                        kickstart = x
-            if not kickstart: kickstart = this.AppendItem(root, path)
+            kickstart = this.MatchItem(path)
+            if not kickstart or this.GetItemParent(kickstart) != root:
+                kickstart = this.AppendItem(root, path)
 
         elif DC_ONEROOT in this.Styles:
             this.DeleteAllItems()
+            this.Paths.clear()
             kickstart = this.AddRoot(path)
 
         else:
@@ -285,33 +307,96 @@ class DirCtrl(wx.TreeCtrl, FSEventHandler, DirCtrlBase):
                                   " and start from scratch or just add a new one while keeping"
                                   " the old root node. Ask the app developer for this.")
 
+        this.Track(kickstart, path)
         this.SetItemHasChildren(kickstart)
         this.SetItemImage(kickstart, folderidx)
 
-        if Importable["watchdog"]:
-            this.Observers[path] = Observer()
-            this.Observers[path].schedule(this, path, recursive=True)
-            this.Observers[path].start()
+        if Importable["watchdog"] and path not in this.Watches:
+            this.Watches[path] = Watch(path, this.Coalescer.Feed, recursive=True)
+
+    def ApplyPatches(this, patches: dict[str, "DirPatch"]):
+        """
+        Bring listed nodes up to date with file system changes, then post DirChangesEvent.
+        Nodes being listed are left alone - they get the changes from the listing.
+        """
+        this.Freeze()
+        try:
+            for path, patch in patches.items():
+                node = this.MatchItem(path)
+                if not node or node in this.Loaders: continue
+
+                for name in patch.Deleted:
+                    if item := this.MatchItem(os.path.join(path, name)):
+                        wx.TreeCtrl.Delete(this, item)
+
+                for old, new in patch.Renamed.items():
+                    if item := this.MatchItem(os.path.join(path, old)):
+                        # No way to move an item: add it again at its place, collapsed
+                        isdir = this.GetItemImage(item) == folderidx
+                        expandable = this.ItemHasChildren(item)
+                        if item in this.Loaders: this.Loaders.pop(item).Cancel()
+                        wx.TreeCtrl.Delete(this, item)
+
+                        item = this.InsertItem(node, SortedInsert(this._SortKeys(node), new, isdir), new,
+                                               folderidx if isdir else fileidx)
+                        this.Track(item, os.path.join(path, new))
+                        if expandable: this.SetItemHasChildren(item)
+
+                created = [(name, isdir) for name, isdir in patch.Created.items()
+                           if (isdir or DC_DIRONLY not in this.Styles) and not this.MatchItem(os.path.join(path, name))]
+                if not created: continue
+
+                if not this.IsExpanded(node): # Listed again on expansion
+                    this.SetItemHasChildren(node)
+                    continue
+
+                keys = this._SortKeys(node)
+                for name, isdir in created:
+                    this.Track(this.InsertItem(node, SortedInsert(keys, name, isdir), name, folderidx if isdir else fileidx),
+                               os.path.join(path, name))
+        finally:
+            this.Thaw()
+
+        wx.PostEvent(this, DirChangesEvent(patches=patches))
+
+    def _SortKeys(this, node: wx.TreeItemId) -> list[tuple]:
+        """
+        Sort keys of the (listed) children of a node.
+        """
+        return [SortKey(this.GetItemText(child), this.GetItemImage(child) == folderidx)
+                for child in this.GetNodeChildren(node)]
 
-    # From SO (that iterate_root function above) and the
-    # useless help of Google Bard (and I found the problem myself,
-    # Bard just use one more while loop and that's all, 
-    # cannot go deeper of the tree)
-    def MatchItem(this, path: str, start: wx.TreeItemId | None = None) -> wx.TreeItemId:
+    def Track(this, item: wx.TreeItemId, path: str):
+        """
+        Remember the (new) path of an item - its children's too if it has been renamed.
+        Items added to the tree by hand must be tracked to be found by MatchItem and GetFullPath.
+        """
+        stack = [(item, os.path.normpath(path))]
+        while stack:
+            item, path = stack.pop()
+            old = this.GetItemData(item)
+            if old and this.Paths.get(PathKey(old)) == item:
+                del this.Paths[PathKey(old)]
+            this.SetItemData(item, path)
+            this.Paths[PathKey(path)] = item
+
+            if old and old != path:
+                stack += [(child, os.path.join(path, this.GetItemText(child)))
+                          for child in this.GetNodeChildren(item) if this.GetItemData(child)]
+
+    def OnDeleted(this, evt: wx.TreeEvent):
+        path = this.GetItemData(evt.GetItem())
+        if path and this.Paths.get(PathKey(path)) == evt.GetItem():
+            del this.Paths[PathKey(path)]
+        evt.Skip()
+
+    def MatchItem(this, path: str, start: wx.TreeItemId | None = None) -> wx.TreeItemId | None:
         """
         Find for an item in the tree by the specified path.
         "Item" here is a wx.TreeItemId object.
+        Only items which have been listed can be found. start is unused, kept for compatibility.
         """
-        parent = this.GetRootItem() if not start else start
-        item, cookie = this.GetFirstChild(parent)
-
-        while item.IsOk():
-            if this.GetFullPath(item) == path:
-                return item
-            if this.ItemHasChildren(item):
-                check = this.MatchItem(path, item)
-                if check: return check
-            item, cookie = this.GetNextChild(parent, cookie)
+        return this.Paths.get(PathKey(path))
 
     def GetNodeChildren(this, item: wx.TreeItemId | str) -> list[wx.TreeItemId]:
         """
@@ -324,7 +409,7 @@ class DirCtrl(wx.TreeCtrl, FSEventHandler, DirCtrlBase):
 
         while it.IsOk():
             result += [it]
-            it, cookie = this.GetNextChild(it, cookie)
+            it, cookie = this.GetNextChild(node, cookie)
         return result
 
     def Delete(this, item: wx.TreeItemId):
@@ -336,11 +421,8 @@ class DirCtrl(wx.TreeCtrl, FSEventHandler, DirCtrlBase):
         
         fullpath = this.GetFullPath(item)
 
-        if Importable["watchdog"]:
-            if os.path.isdir(fullpath) and fullpath in this.Observers:
-                this.Observers[fullpath].stop()
-                this.Observers[fullpath].join()
-                this.Observers.pop(fullpath)
+        if fullpath in this.Watches:
+            this.Watches.pop(fullpath).Cancel()
 
         import shutil
         if os.path.isdir(fullpath): shutil.rmtree(fullpath)
@@ -366,6 +448,9 @@ class DirCtrl(wx.TreeCtrl, FSEventHandler, DirCtrlBase):
         parent = item if item else this.GetSelection()
         result = []
 
+        if isinstance(path := this.GetItemData(parent), str):
+            return path
+
         if parent == this.GetRootItem():
             return this.GetItemText(parent)
 
@@ -401,6 +486,10 @@ class DirList(wx.ListCtrl, FSEventHandler, DirCtrlBase):
     Of couse this is wxLC_REPORT will be used.
     This comes with check buttons, which is optional.
 
+    The list is virtual (wxLC_VIRTUAL): items are kept in a DirModel (Model),
+    and wx asks for the text of rows on screen only (OnGetItemText).
+    Click on a column header to sort by it (again to reverse), use SetFilter to filter.
+
     libtextworker flags to be ignored:
     * DC_HIDEROOT (where's the root node in this list control?)
     * DC_ONEROOT (one root by default so this is useless)
@@ -411,8 +500,7 @@ class DirList(wx.ListCtrl, FSEventHandler, DirCtrlBase):
     History: list = []
     TargetIsSelf = True
 
-    if Importable["watchdog"]:
-        Watcher: Observer # type: ignore
+    Watcher: "Subscription | None" = None  # Watch hub subscription for the current folder
 
     def __init__(this, parent: wx.Window, id=wx.ID_ANY, pos=wx.DefaultPosition, size=wx.DefaultSize,
                  style=wx.LC_REPORT, validator=wx.DefaultValidator, name=wx.ListCtrlNameStr, w_styles: auto = DC_USEICON):
@@ -422,10 +510,12 @@ class DirList(wx.ListCtrl, FSEventHandler, DirCtrlBase):
 
         for i in [wx.LC_ICON, wx.LC_SMALL_ICON, wx.LC_LIST]:
             if style & i:
-                style /= i
+                style &= ~i
+        style |= wx.LC_REPORT | wx.LC_VIRTUAL
 
         DirCtrlBase.__init__(this)
         wx.ListCtrl.__init__(this, parent, id, pos, size, style, validator, name)
+        this.Model = DirModel()
 
         this.InsertColumn(0, _("Name"), width=246)
         this.InsertColumn(1, _("Item type"))
@@ -435,44 +525,60 @@ class DirList(wx.ListCtrl, FSEventHandler, DirCtrlBase):
         this.AssignImageList(imgs, wx.IMAGE_LIST_SMALL)
 
         this.Bind(wx.EVT_LIST_ITEM_ACTIVATED, this.SetFolder)
+        this.Bind(wx.EVT_LIST_COL_CLICK, lambda evt: this.SortBy(evt.GetColumn()))
+
+        if Importable["watchdog"]:
+            this.Coalescer = EventCoalescer(this.ApplyPatches, wx.CallAfter)
 
     def Destroy(this):
+        if this.Watcher:
+            this.Watcher.Cancel()
+            this.Watcher = None
         if Importable["watchdog"]:
-            this.Watcher.stop()
-            this.Watcher.join()
-            del this.Watcher
+            this.Coalescer.Cancel()
         wx.ListCtrl.Destroy(this)
 
     def DrawItems(this, path: str = os.path.expanduser("~/")):
         """
         Fill the list control with items;)
+        Only the item count is given to wx, rows are drawn from Model on demand.
         """
 
-        this.DeleteAllItems()
-        for item in os.listdir(path):
-            crafted = os.path.join(path, item)
-            statinfo = os.stat(crafted)
-            it_size = 0
+        this.Model.Load(path, DC_DIRONLY in this.Styles)
+        this._Redraw()
 
-            if os.path.isdir(crafted):
-                it_size = ""
-                this.InsertItem(0, item, folderidx)
-                this.SetItem(0, 1, _("Folder"))
-            elif DC_DIRONLY not in this.Styles:
-                it_size = statinfo.st_size
-                this.InsertItem(0, item, fileidx)
-                this.SetItem(0, 1, _("File"))
+    def _Redraw(this):
+        # Rows are not the same anymore
+        item = this.GetFirstSelected()
+        while item != -1:
+            this.Select(item, False)
+            item = this.GetNextSelected(item)
 
-            m_time = statinfo.st_mtime
-            lastmod = time.strftime("%d %b %Y, %H:%M:%S", time.localtime(m_time))
+        this.SetItemCount(len(this.Model))
+        this.Refresh()
 
-            this.SetItem(0, 2, lastmod)
+    def OnGetItemText(this, item: int, column: int) -> str:
+        return this.Model.Text(item, column)
 
-            if isinstance(it_size, int):
-                it_size = this.sizeof_fmt(it_size)
+    def OnGetItemImage(this, item: int) -> int:
+        return folderidx if this.Model.IsFolder(item) else fileidx
 
-            this.SetItem(0, 3, str(it_size))
+    def SortBy(this, column: int, reverse: bool | None = None):
+        """
+        Sort the list. See DirModel.SortBy.
+        """
+        this.Model.SortBy(column, reverse)
+        if hasattr(this, "ShowSortIndicator"): # wxPython 4.1+
+            this.ShowSortIndicator(column, not this.Model.Reverse)
+        this._Redraw()
 
+    def SetFilter(this, pattern: str | None = None, regex: bool = False, case: bool = False, keepdirs: bool = True):
+        """
+        Show only items matching a pattern. See DirModel.Filter.
+        @raise re.error: Invalid regular expression
+        """
+        this.Model.Filter(pattern, regex, case, keepdirs)
+        this._Redraw()
 
     def SetFolder(this, evt=None, path: str = ""):
         """
@@ -482,22 +588,33 @@ class DirList(wx.ListCtrl, FSEventHandler, DirCtrlBase):
         """
         if evt and not path:
             pos = evt.Index
-            name = this.GetItemText(pos)
-            item_type = this.GetItemText(pos, 1)
-
-            if item_type == _("Folder"):
-                path = os.path.join(this.currpath, name)
+            if not this.Model.IsFolder(pos): return
+            path = this.Model.GetPath(pos)
 
         elif not path:
             raise Exception("Who the hell call DirList.SetFolder with no directory to go???")
         
         DirCtrlBase.SetFolder(this, path, False)
         this.DrawItems(path)
-        this.Watcher = Observer()
-        this.Watcher.schedule(this, path, True)
-        this.Watcher.start()
+        if Importable["watchdog"]:
+            # Only the listed folder matters, and the previous one does not anymore
+            Unwatch(this.Watcher)
+            this.Coalescer.Cancel()
+            this.Watcher = Watch(path, this.Coalescer.Feed)
         this.PostSetDir(path, "go")
 
+    def ApplyPatches(this, patches: dict[str, "DirPatch"]):
+        """
+        Redraw the list (once) if the shown folder has changed, then post DirChangesEvent.
+        """
+        if os.path.normpath(this.currpath) in patches:
+            this.Freeze()
+            try:
+                this.DrawItems(this.currpath)
+            finally:
+                this.Thaw()
+            wx.PostEvent(this, DirChangesEvent(patches=patches))
+
     def GoUp(this, evt=None):
         this.SetFolder(path=os.path.dirname(this.currpath))
 
@@ -11,13 +11,16 @@
 import wx
 import wx.stc
 
-from hashlib import md5
+from typing import Any, Callable
+
 from libtextworker import EDITOR_DIR
 from libtextworker.general import CraftItems
 from libtextworker.get_config import ConfigurationError, GetConfig
 
 from .miscs import CreateMenu
 from .. import stock_editor_configs
+from ..base.editor import AtomicWriter, BufferHash, CHUNK_SIZE, DirtyTracker, FileFingerprint, \
+                          IdleJob, MODIFIED, MOD_BUFFER, MOD_NONE, StreamLoad
 from ... import _
 
 
@@ -33,7 +36,14 @@ class StyledTextControl(wx.stc.StyledTextCtrl):
     """
 
     FileLoaded: str = ""
-    Hash = md5("".encode("utf-8"))
+    Fingerprint: FileFingerprint
+    Hash: DirtyTracker
+
+    def __init__(this, *args, **kwds):
+        wx.stc.StyledTextCtrl.__init__(this, *args, **kwds)
+
+        this.Hash = DirtyTracker(this._FetchLines, this.GetLineCount())
+        this.Bind(wx.stc.EVT_STC_MODIFIED, this.OnEditorModify)
 
     def EditorInit(this, config_path: str = ""):
         """
@@ -62,13 +72,6 @@ class StyledTextControl(wx.stc.StyledTextCtrl):
         # Word wrap
         this.SetWrapMode(this.cfg.Get("editor", "wordwrap") in this.cfg.yes_values)
 
-        # Editor modifications
-        def OnEditorModify(evt):
-            this.Hash = md5(this.GetText().encode("utf-8"))
-            evt.Skip()
-        
-        this.Bind(wx.stc.EVT_STC_MODIFIED, OnEditorModify)
-
     """
     Setup GUI elements.
     """
@@ -83,11 +86,11 @@ class StyledTextControl(wx.stc.StyledTextCtrl):
         return True
 
     def IndentationSet(this):
-        size = int(this.cfg.Get("indentation", "size", True, True))
+        size = this.cfg.GetInt("indentation", "size")
         tp = this.cfg.Get("indentation", "type", True, True)
-        show_guide = this.cfg.Get("indentation", "show_guide", True, True)
-        bk_unindent = this.cfg.Get("indentation", "backspace_unindents", True, True)
-        view_ws = this.cfg.Get("editor", "view_whitespaces", True, True)
+        show_guide = this.cfg.GetBool("indentation", "show_guide")
+        bk_unindent = this.cfg.GetBool("indentation", "backspace_unindents")
+        view_ws = this.cfg.GetBool("editor", "view_whitespaces")
 
         if not 8 >= size > 0:
             raise ConfigurationError("indentation", "size", "Must be in range from 1 to 8")
@@ -96,10 +99,10 @@ class StyledTextControl(wx.stc.StyledTextCtrl):
             raise ConfigurationError("indentation", "type", "Must be either 'tabs' or 'spaces'")
 
         this.SetUseTabs(tp == "tabs")
-        this.SetBackSpaceUnIndents(bk_unindent in this.cfg.yes_values)
-        this.SetViewWhiteSpace(view_ws in this.cfg.yes_values)
+        this.SetBackSpaceUnIndents(bk_unindent)
+        this.SetViewWhiteSpace(view_ws)
         this.SetIndent(size)
-        this.SetIndentationGuides(show_guide in this.cfg.yes_values)
+        this.SetIndentationGuides(show_guide)
 
     def LineNumbers(this) -> bool:
         """
@@ -123,24 +126,107 @@ class StyledTextControl(wx.stc.StyledTextCtrl):
     File-related things
     """
 
-    def LoadFile(this, path: str):
+    def LoadFile(this, path: str, progress: Callable[[int, int], bool | None] | None = None,
+                 chunksize: int = CHUNK_SIZE, use_mmap: bool = False) -> bool:
         """
-        Loads the content of a file into the editor.
-        No check for contents already inside the editor!
+        Loads the content of a file into the editor, replacing the current content.
+        The file is read (and hashed) chunk by chunk, in one pass. Line endings are kept.
+        @param progress: Called with (read bytes, file size) after each chunk. Return False to stop.
+        @param chunksize: Chunk size in bytes
+        @param use_mmap: Memory-map the file instead of read() calls
+        @return False if stopped by `progress`, else True
+        """
+        steps = this._LoadSteps(path, this.AppendText, chunksize, use_mmap)
+        for done, total in steps:
+            if progress and progress(done, total) is False:
+                steps.close()
+                return False
+        return True
+
+    def LoadFileAsync(this, path: str, progress: Callable[[int, int], Any] | None = None,
+                      finished: Callable[[IdleJob], Any] | None = None,
+                      chunksize: int = CHUNK_SIZE, use_mmap: bool = False) -> IdleJob:
         """
-        wx.stc.StyledTextCtrl.LoadFile(this, path)
+        Like LoadFile, but appends the file progressively (one chunk per wx.CallAfter),
+        so the UI keeps responding. The editor is read-only until the job ends.
+        Call Cancel() on the returned job to stop - what has been inserted stays, FileLoaded is not changed.
+        @param finished: Called with the job when it ends (done, failed or cancelled)
+        """
+        readonly = this.GetReadOnly()
+
+        def write(text: str):
+            this.SetReadOnly(False)
+            this.AppendText(text)
+            this.SetReadOnly(True)
+
+        def done(job: IdleJob):
+            this.SetReadOnly(readonly)
+            if finished: finished(job)
+
+        this.SetReadOnly(True)
+        return IdleJob(this._LoadSteps(path, write, chunksize, use_mmap),
+                       wx.CallAfter, progress, done).Start()
+
+    def _LoadSteps(this, path: str, write: Callable[[str], Any], chunksize: int, use_mmap: bool):
+        # Loading a file is not something to undo (and the undo buffer would keep a copy of it)
+        this.SetUndoCollection(False)
+
+        try:
+            # A read-only STC ignores ClearAll (LoadFileAsync makes it read-only before this runs)
+            readonly = this.GetReadOnly()
+            this.SetReadOnly(False)
+            this.ClearAll()
+            this.SetReadOnly(readonly)
+            digest = yield from StreamLoad(path, write, chunksize, newline="", use_mmap=use_mmap)
+        finally:
+            this.SetUndoCollection(True)
+            this.EmptyUndoBuffer()
+
         this.FileLoaded = path
-        this.Hash = md5(open(path, "r").read().encode("utf-8"))
+        this.Hash.Reset(this.GetLineCount(), digest)
+        this.Fingerprint = FileFingerprint(path, this.Hash.digest(), newline="")
+
+    def SaveFile(this, path: str = "", fileType: int = wx.TEXT_TYPE_ANY,
+                 progress: Callable[[int, int], bool | None] | None = None) -> bool:
+        """
+        Saves the editor content into a file. If no path is specified, use the loaded file.
+        The content is written chunk by chunk into a temporary file, which then replaces the target.
+        @param fileType: Unused, kept for wx.stc.StyledTextCtrl compatibility
+        @param progress: Called with (written lines, line count) after each chunk.
+            Return False to stop - the target file is left untouched.
+        @return True on success
+        """
+        if not path: path = this.FileLoaded
+        if not path: return False
+
+        result = BufferHash()
+        lines = this.GetLineCount()
+        step = this.Hash.ChunkLines
+
+        with AtomicWriter(path, newline="") as writer:
+            for first in range(0, lines, step):
+                text = this._FetchLines(first, first + step if first + step < lines else None)
+                writer.write(text)
+                result.update(text.encode("utf-8"))
+
+                if progress and progress(min(first + step, lines), lines) is False:
+                    writer.Discard()
+                    return False
+
+        this.SetSavePoint()
+        this.FileLoaded = path
+        this.Fingerprint = FileFingerprint(path, result.digest(), newline="")
+        return True
 
     @property
-    def IsModified(this):
+    def IsModified(this) -> MODIFIED:
         """
         Show if the editor has been modified or not.
         Works exactly the same way + implementation as Tkinter's one.
         """
-        def checkhash(target): return not this.Hash.digest() == md5(target.encode("utf-8")).digest()
-        if not this.FileLoaded: return checkhash("")
-        return checkhash(open(this.FileLoaded, "r").read())
+        if not this.FileLoaded:
+            return MOD_BUFFER if this.Hash.digest() != BufferHash().digest() else MOD_NONE
+        return this.Fingerprint.Compare(this.Hash.digest())
 
     def SetModified(this, state: bool):
         """
@@ -149,10 +235,28 @@ class StyledTextControl(wx.stc.StyledTextCtrl):
         """
         raise NotImplementedError
 
+    def _FetchLines(this, first: int, last: int | None) -> str:
+        end = this.GetLength() if last is None else this.PositionFromLine(last)
+        return this.GetTextRange(this.PositionFromLine(first), end)
+
     """
     Events.
     """
 
+    def OnEditorModify(this, event):
+        """
+        Report text insertions/deletions to the Hash (DirtyTracker).
+        Only the touched lines will be hashed again, on the next Hash request.
+        """
+        modtype = event.GetModificationType()
+
+        if modtype & wx.stc.STC_MOD_INSERTTEXT:
+            this.Hash.Changed(this.LineFromPosition(event.GetPosition()), 0, event.GetLinesAdded())
+        elif modtype & wx.stc.STC_MOD_DELETETEXT:
+            this.Hash.Changed(this.LineFromPosition(event.GetPosition()), -event.GetLinesAdded(), 0)
+
+        event.Skip()
+
     def OnUIUpdate(this, event):  # MS Bing found this - thanks to the people who made it!
         line_count = this.GetLineCount()
 
@@ -0,0 +1,288 @@
+"""
+@package libtextworker.interface.wx.findreplace
+@brief Find & Replace panel for wxStyledTextCtrl
+"""
+
+#	A cross-platform library for Python apps.
+#	Copyright (C) 2023-2024 Le Bao Nguyen and contributors.
+#	This is a part of the libtextworker project.
+#	Licensed under the GNU General Public License version 3.0 or later.
+
+import time
+import wx
+import wx.stc
+
+from .actionrow import ActionRow
+from ..base.editor import IdleJob
+from ... import _
+
+
+class FindReplace(wx.Panel):
+    """
+    A find-replace panel for wxStyledTextCtrl editors.
+
+    Searching is done by Scintilla itself (SearchInTarget), without copying the document.
+    Matches are highlighted with an indicator (the text styles are left alone), and found
+    in small slices, one per event loop round, so the UI stays responsive on large documents.
+
+    Regular expressions use Scintilla's C++11 (ECMAScript) engine, which is close to, but
+    not exactly, Python's re - e.g replacements use \\1 for groups.
+    """
+
+    Target: wx.stc.StyledTextCtrl
+    Indicator: int = wx.stc.STC_INDIC_CONTAINER
+    SliceTime: float = 0.01  # Seconds of searching per event loop round
+
+    def __init__(this, parent: wx.Window, editor: wx.stc.StyledTextCtrl, addReplace: bool = False,
+                 foundBackground: str = "yellow", id=wx.ID_ANY, **kwds):
+        """
+        Constructor.
+
+        @param parent: The panel's parent
+        @param editor: Target editor
+        @param addReplace: Enable text replace function
+        @param foundBackground: Match text's background color
+        @param kwds: wx.Panel keywords
+        """
+        wx.Panel.__init__(this, parent, id, **kwds)
+        this.Target = editor
+        this.Matches: list[tuple[int, int]] = []  # (start, end) positions of found matches
+        this._job: IdleJob | None = None
+        this._refresh = False
+
+        sizer = wx.BoxSizer(wx.VERTICAL)
+
+        def makerow() -> ActionRow:
+            row = ActionRow()
+            row.SetParent(this)
+            sizer.Add(row, 0, wx.EXPAND)
+            return row
+
+        ## Find entry
+        row1 = makerow()
+        row1.PlaceObj(wx.StaticText, 0, label=_("Find for:"))
+        this.FindEntry = row1.PlaceObj(wx.TextCtrl, style=wx.TE_PROCESS_ENTER)
+        this.FindEntry.Bind(wx.EVT_TEXT, lambda evt: this.Search())
+        this.FindEntry.Bind(wx.EVT_TEXT_ENTER, lambda evt: this.Next())
+
+        ## Matches & navigation
+        nav_row = makerow()
+        this.CountLabel = nav_row.PlaceObj(wx.StaticText, label="")
+        nav_row.PlaceObj(wx.Button, 0, label=_("Previous")).Bind(wx.EVT_BUTTON, lambda evt: this.Previous())
+        nav_row.PlaceObj(wx.Button, 0, label=_("Next")).Bind(wx.EVT_BUTTON, lambda evt: this.Next())
+
+        ## Replace buttons
+        if addReplace:
+            row2 = makerow()
+            row2.PlaceObj(wx.StaticText, 0, label=_("Replace with:"))
+            this.ReplaceEntry = row2.PlaceObj(wx.TextCtrl)
+
+            do2_row = makerow()
+            do2_row.PlaceObj(wx.Button, 0, label=_("Replace")).Bind(wx.EVT_BUTTON, lambda evt: this.Replace(1))
+            do2_row.PlaceObj(wx.Button, 0, label=_("Replace all")).Bind(wx.EVT_BUTTON, lambda evt: this.Replace(2))
+
+        ## Use regex & Case sensitive
+        this.RegexCheck = makerow().PlaceObj(wx.CheckBox, label=_("Use regular expression"))
+        this.CaseCheck = makerow().PlaceObj(wx.CheckBox, label=_("Case sensitive"))
+        this.RegexCheck.Bind(wx.EVT_CHECKBOX, lambda evt: this.Search())
+        this.CaseCheck.Bind(wx.EVT_CHECKBOX, lambda evt: this.Search())
+
+        this.SetSizer(sizer)
+
+        # Set find matches indicator
+        this.Target.IndicatorSetStyle(this.Indicator, wx.stc.STC_INDIC_ROUNDBOX)
+        this.Target.IndicatorSetForeground(this.Indicator, wx.Colour(foundBackground))
+        this.Target.IndicatorSetAlpha(this.Indicator, 120)
+        this.Target.IndicatorSetUnder(this.Indicator, True)
+
+        this.Target.Bind(wx.stc.EVT_STC_MODIFIED, this.OnEditorModify)
+
+    def Destroy(this):
+        if this._job: this._job.Cancel()
+        this.Target.Unbind(wx.stc.EVT_STC_MODIFIED, handler=this.OnEditorModify)
+        return wx.Panel.Destroy(this)
+
+    @property
+    def MatchCount(this) -> int:
+        return len(this.Matches)
+
+    @property
+    def SearchFlags(this) -> int:
+        flags = 0
+        if this.CaseCheck.GetValue():
+            flags |= wx.stc.STC_FIND_MATCHCASE
+        if this.RegexCheck.GetValue():
+            flags |= wx.stc.STC_FIND_REGEXP | wx.stc.STC_FIND_CXX11REGEX
+        return flags
+
+    def _Find(this, query: str, start: int, end: int) -> tuple[int, int] | None:
+        """
+        Find the first match of query between start and end (end < start searches backwards).
+        @return (start, end) of the match, or None
+        @raise ValueError: Invalid regular expression
+        """
+        this.Target.SetSearchFlags(this.SearchFlags)
+        this.Target.SetTargetRange(start, end)
+
+        pos = this.Target.SearchInTarget(query)
+        if pos == -2:
+            raise ValueError(_("Invalid regular expression"))
+        if pos < 0:
+            return None
+        return this.Target.GetTargetStart(), this.Target.GetTargetEnd()
+
+    def _ClearIndicators(this):
+        this.Target.SetIndicatorCurrent(this.Indicator)
+        this.Target.IndicatorClearRange(0, this.Target.GetLength())
+
+    """
+    Search for strings specified in the panel.
+    Matches are found and highlighted in slices, on the event loop. The previous search is cancelled.
+    """
+    def Search(this):
+        if this._job: this._job.Cancel()
+        this._job = None
+        this.Matches = []
+        this._ClearIndicators()
+
+        query = this.FindEntry.GetValue()
+        if not query:
+            this.CountLabel.SetLabel("")
+            return
+
+        this.CountLabel.SetLabel(_("Searching..."))
+
+        def finished(job: IdleJob):
+            if job is not this._job: return
+            this._job = None
+            if job.Done:
+                # Result is an error message, if any
+                this.CountLabel.SetLabel(job.Result or _("%d matches") % this.MatchCount)
+
+        this._job = IdleJob(this._FindAllSteps(query), wx.CallAfter,
+                            lambda done, total: this.CountLabel.SetLabel(_("%d matches") % this.MatchCount),
+                            finished)
+        this._job.Start()
+
+    def _FindAllSteps(this, query: str):
+        pos = 0
+        deadline = time.perf_counter() + this.SliceTime
+
+        while True:
+            # The document may have been edited between two slices
+            length = this.Target.GetLength()
+            try:
+                found = this._Find(query, pos, length)
+            except ValueError as e:
+                return str(e)
+            if not found: break
+
+            start, end = found
+            if start == end:  # Empty regex match
+                pos = this.Target.PositionAfter(end)
+                if pos == end: break
+                continue
+
+            this.Matches.append(found)
+            this.Target.SetIndicatorCurrent(this.Indicator)
+            this.Target.IndicatorFillRange(start, end - start)
+            pos = end
+
+            if time.perf_counter() > deadline:
+                yield pos, length
+                deadline = time.perf_counter() + this.SliceTime
+
+    def _Select(this, found: tuple[int, int] | None):
+        if not found:
+            wx.Bell()
+            return
+        this.Target.SetSelection(*found)
+        this.Target.EnsureCaretVisible()
+
+    def Next(this):
+        """
+        Select the next match after the current selection, wrapping around at the end.
+        """
+        query = this.FindEntry.GetValue()
+        if not query: return
+        try:
+            this._Select(this._Find(query, this.Target.GetSelectionEnd(), this.Target.GetLength())
+                         or this._Find(query, 0, this.Target.GetSelectionEnd()))
+        except ValueError as e:
+            this.CountLabel.SetLabel(str(e))
+
+    def Previous(this):
+        """
+        Select the previous match before the current selection, wrapping around at the start.
+        """
+        query = this.FindEntry.GetValue()
+        if not query: return
+        try:
+            this._Select(this._Find(query, this.Target.GetSelectionStart(), 0)
+                         or this._Find(query, this.Target.GetLength(), this.Target.GetSelectionStart()))
+        except ValueError as e:
+            this.CountLabel.SetLabel(str(e))
+
+    """
+    Replace using strings specified in the panel.
+    @param evt: 1 to replace the selected match (then select the next one), 2 to replace all
+    @return Number of replacements
+    """
+    def Replace(this, evt) -> int:
+        query = this.FindEntry.GetValue()
+        if not query: return 0
+
+        new = this.ReplaceEntry.GetValue()
+        replace = this.Target.ReplaceTargetRE if this.RegexCheck.GetValue() else this.Target.ReplaceTarget
+        count = 0
+
+        try:
+            if evt == 1:
+                start, end = this.Target.GetSelection()
+                # Only replace the selection if it is a match
+                if start != end and this._Find(query, start, end) == (start, end):
+                    replace(new)
+                    this.Target.SetSelection(this.Target.GetTargetEnd(), this.Target.GetTargetEnd())
+                    count = 1
+                this.Next()
+                return count
+
+            this.Target.BeginUndoAction()
+            pos = 0
+            try:
+                while found := this._Find(query, pos, this.Target.GetLength()):
+                    start, end = found
+                    if start == end:
+                        pos = this.Target.PositionAfter(end)
+                        if pos == end: break
+                        continue
+                    replace(new)
+                    pos = this.Target.GetTargetEnd()
+                    count += 1
+            finally:
+                this.Target.EndUndoAction()
+        except ValueError as e:
+            this.CountLabel.SetLabel(str(e))
+            return count
+
+        this.CountLabel.SetLabel(_("%d replacements") % count)
+        return count
+
+    """
+    Events.
+    """
+
+    def OnEditorModify(this, event):
+        """
+        Highlights are out of date after an edit - find them again when the event loop gets there.
+        """
+        if event.GetModificationType() & (wx.stc.STC_MOD_INSERTTEXT | wx.stc.STC_MOD_DELETETEXT) \
+                and this.FindEntry.GetValue() and not this._refresh:
+            this._refresh = True
+            wx.CallAfter(this._Refresh)
+        event.Skip()
+
+    def _Refresh(this):
+        if not this: return
+        this._refresh = False
+        this.Search()
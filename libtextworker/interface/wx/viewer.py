@@ -0,0 +1,146 @@
+"""
+@package libtextworker.interface.wx.viewer
+@brief Read-only viewer for huge (log) files.
+"""
+
+# 	A cross-platform library for Python apps.
+# 	Copyright (C) 2023-2024 Le Bao Nguyen and contributors.
+# 	This is a part of the libtextworker project.
+# 	Licensed under the GNU General Public License version 3.0 or later.
+
+import wx
+import wx.stc
+
+from ..base.viewer import LineIndex, ViewWindow
+
+
+class LargeFileViewer(wx.Panel):
+    """
+    A read-only wxStyledTextCtrl (the Text attribute) for files which are too large to be loaded as a whole.
+
+    The file is memory-mapped and its lines are indexed in a background thread.
+    Only the visible lines plus a margin are put into the control, and they are swapped
+    as the user scrolls. The scroll bar and line numbers (a text margin) come from the index,
+    not from the control.
+    """
+
+    Index: LineIndex | None = None
+    Window: ViewWindow | None = None
+    Top: int = 0  # First visible line (0-based)
+
+    def __init__(this, parent: wx.Window, id=wx.ID_ANY, margin: int = 200,
+                 linenumbers: bool = True, **kwds):
+        """
+        Constructor.
+        @param parent: Parent window
+        @param margin: Number of lines to keep above & below the visible ones
+        @param linenumbers: Show line numbers
+        @param kwds: wx.Panel keywords
+        """
+        wx.Panel.__init__(this, parent, id, **kwds)
+
+        this.Margin = margin
+        this.ShowLineNumbers = linenumbers
+        this._rendering = False
+
+        this.Text = wx.stc.StyledTextCtrl(this)
+        this.Text.SetUseVerticalScrollBar(False)
+        this.Text.SetReadOnly(True)
+        this.Text.SetUndoCollection(False)
+        this.Text.SetMarginWidth(0, 0)
+        if linenumbers:
+            this.Text.SetMarginType(0, wx.stc.STC_MARGIN_TEXT)
+
+        this.ScrollBar = wx.ScrollBar(this, style=wx.SB_VERTICAL)
+
+        sizer = wx.BoxSizer(wx.HORIZONTAL)
+        sizer.Add(this.Text, 1, wx.EXPAND)
+        sizer.Add(this.ScrollBar, 0, wx.EXPAND)
+        this.SetSizer(sizer)
+
+        this.Text.Bind(wx.stc.EVT_STC_UPDATEUI, this.OnUpdateUI)
+        this.Text.Bind(wx.EVT_SIZE, this.OnSize)
+        this.ScrollBar.Bind(wx.EVT_SCROLL, this.OnScroll)
+
+    def Destroy(this):
+        this.CloseFile()
+        return wx.Panel.Destroy(this)
+
+    def OpenFile(this, path: str, encoding: str = "utf-8"):
+        """
+        Show a file. Indexing starts in the background, lines show up as they get indexed.
+        """
+        this.CloseFile()
+
+        def refresh(*args):
+            wx.CallAfter(lambda: this and this.Index and this._Render())
+
+        this.Index = LineIndex(path, encoding, refresh, refresh).Start()
+        this.Window = ViewWindow(this.Index, this.Margin)
+        this.Top = 0
+
+    def CloseFile(this):
+        if this.Index:
+            this.Index.Close()
+        this.Index = this.Window = None
+        this._Fill([], 0)
+
+    def _Fill(this, lines: list[str], first: int):
+        this.Text.SetReadOnly(False)
+        this.Text.SetText("\n".join(lines))
+        this.Text.SetReadOnly(True)
+
+        if this.ShowLineNumbers:
+            total = this.Index.LineCount if this.Index else 0
+            this.Text.SetMarginWidth(
+                0, this.Text.TextWidth(wx.stc.STC_STYLE_LINENUMBER, "9" * len(str(total))) + 8)
+            for i in range(len(lines)):
+                this.Text.MarginSetText(i, str(first + i + 1))
+                this.Text.MarginSetStyle(i, wx.stc.STC_STYLE_LINENUMBER)
+
+    def _Render(this, force: bool = False):
+        """
+        Bring the control to this.Top, swapping lines if needed.
+        """
+        if not this.Index: return
+
+        visible = max(1, this.Text.LinesOnScreen())
+        total = this.Index.LineCount
+        this.Top = max(0, min(this.Top, total - visible))
+
+        this._rendering = True
+        if force or this.Window.Needs(this.Top, visible):
+            this._Fill(this.Window.Move(this.Top, visible), this.Window.First)
+        this.Text.SetFirstVisibleLine(this.Top - this.Window.First)
+        this._rendering = False
+
+        this.ScrollBar.SetScrollbar(this.Top, visible, max(total, 1), visible)
+
+    def GoToLine(this, line: int):
+        """
+        Scroll to a line (0-based).
+        """
+        this.Top = line
+        this._Render()
+
+    """
+    Events.
+    """
+
+    def OnUpdateUI(this, event):
+        """
+        The control scrolled by itself (mouse wheel, keys, selection...).
+        """
+        if not this._rendering and this.Index and event.GetUpdated() & wx.stc.STC_UPDATE_V_SCROLL:
+            this.Top = this.Window.First + this.Text.GetFirstVisibleLine()
+            this._Render()
+        event.Skip()
+
+    def OnScroll(this, event):
+        this.Top = event.GetPosition()
+        this._Render()
+        event.Skip()
+
+    def OnSize(this, event):
+        wx.CallAfter(this._Render)
+        event.Skip()
@@ -0,0 +1,523 @@
+"""
+@package libtextworker.watch
+@brief One watchdog Observer for the whole process
+
+GetConfig, DirCtrl and DirList all want to know when something changes on disk.
+Starting an Observer (a thread, plus native watches) for each of them adds up quickly,
+so they all subscribe to the hub here instead: one observer thread, one native watch per
+watched path - shared and reference-counted, and events are handed to subscribers by path.
+"""
+
+#	A cross-platform library for Python apps.
+#	Copyright (C) 2023-2024 Le Bao Nguyen and contributors.
+#	This is a part of the libtextworker project.
+#	Licensed under the GNU General Public License version 3.0 or later.
+
+import os
+import threading
+import time
+
+from typing import Any, Callable, NamedTuple
+
+from .general import Importable, logger
+
+if Importable["watchdog"]:
+    from watchdog.events import FileSystemEvent, FileSystemEventHandler
+    from watchdog.observers import Observer
+else:
+    FileSystemEventHandler = object
+
+__all__ = ("Subscription", "WatchHub", "Hub", "Watch", "Unwatch", "DirPatch", "CoalescerStats", "EventCoalescer")
+
+
+class Subscription:
+    """
+    A subscriber of the hub. Keep it to unsubscribe later (Cancel()).
+    """
+
+    def __init__(this, hub: "WatchHub", path: str, callback: Callable[["FileSystemEvent"], Any],
+                 recursive: bool, key: tuple[str, bool]):
+        this.Hub = hub
+        this.Path = path
+        this.Callback = callback
+        this.Recursive = recursive
+        this.Key = key  # The native watch this subscription uses
+        this.Active = True
+
+    def Cancel(this):
+        this.Hub.Unsubscribe(this)
+
+
+class _Watch(FileSystemEventHandler):
+    """
+    A native watch shared by all subscriptions on the same (directory, recursive) key,
+    and the event handler of it. Subscriptions are stored by their paths, so an event is
+    matched by looking its path and its parents up - not by scanning every subscriber.
+
+    dispatch() runs on the observer thread with watchdog's lock held, so it does not take
+    the hub lock. Subscribers is never changed in place: the hub replaces it on every change,
+    and dispatch() reads whichever version is there.
+    """
+
+    def __init__(this, hub: "WatchHub", key: tuple[str, bool], observer: "Observer"):
+        this.Hub = hub
+        this.Key = key
+        this.Root = key[0]
+        this.Observer = observer  # The observer this watch is (to be) scheduled on
+        this.Subscribers: dict[str, tuple[Subscription, ...]] = {}
+        this.Count = 0
+        this.Handle = None  # watchdog's ObservedWatch
+
+    def Add(this, sub: Subscription):
+        subscribers = dict(this.Subscribers)
+        subscribers[sub.Path] = subscribers.get(sub.Path, ()) + (sub,)
+        this.Subscribers = subscribers
+        this.Count += 1
+
+    def Remove(this, sub: Subscription):
+        subscribers = dict(this.Subscribers)
+        subs = tuple(other for other in subscribers[sub.Path] if other is not sub)
+        if subs: subscribers[sub.Path] = subs
+        else: del subscribers[sub.Path]
+        this.Subscribers = subscribers
+        this.Count -= 1
+
+    def Match(this, subscribers: dict[str, tuple[Subscription, ...]], path: str, found: dict[int, Subscription]):
+        """
+        Collect subscriptions interested in path: subscriptions to the path itself,
+        to its parent directory, and recursive subscriptions to any other ancestor (up to the watch root).
+        """
+        depth = 0
+        while True:
+            for sub in subscribers.get(path, ()):
+                if depth <= 1 or sub.Recursive:
+                    found[id(sub)] = sub
+
+            if len(path) <= len(this.Root): break
+            parent = os.path.dirname(path)
+            if parent == path: break
+            path = parent
+            depth += 1
+
+    def dispatch(this, event: "FileSystemEvent"):
+        found: dict[int, Subscription] = {}
+        subscribers = this.Subscribers  # A snapshot - no lock needed
+
+        this.Match(subscribers, os.fsdecode(event.src_path), found)
+        if getattr(event, "dest_path", ""):
+            this.Match(subscribers, os.fsdecode(event.dest_path), found)
+
+        for sub in found.values():
+            if not sub.Active: continue
+            try:
+                sub.Callback(event)
+            except Exception:
+                # One broken subscriber must not stop the others (or the observer thread)
+                logger.exception("Watch subscriber %r failed on %s", sub.Callback, event)
+
+
+class WatchHub:
+    """
+    Multiplexes file system watch subscriptions onto one watchdog Observer.
+
+    Watching a file actually watches its directory (non-recursive), so that editors which save
+    by replacing the file are caught too. Subscriptions with the same directory and recursive flag
+    share one native watch, which is removed when the last of them leaves. The observer thread is
+    started on the first subscription and stopped after the last one.
+
+    Callbacks run on the observer thread!
+
+    The hub lock only guards the hub's own bookkeeping. watchdog is called (schedule, unschedule)
+    after releasing it, because watchdog holds its own lock while dispatching events.
+    Native watches are brought in line with the bookkeeping by _Sync(), one thread per key at a time:
+    watchdog tells watches apart by (path, recursive) only, so a late unschedule must never
+    run after the schedule of the next watch on the same key.
+    """
+
+    def __init__(this):
+        this._lock = threading.RLock()
+        this._watches: dict[tuple[str, bool], _Watch] = {}
+        this._native: dict[tuple[str, bool], _Watch] = {}  # Watches scheduled in watchdog
+        this._syncing: set[tuple[str, bool]] = set()
+        this._resync: set[tuple[str, bool]] = set()
+        this._observer = None
+
+    @property
+    def Running(this) -> bool:
+        return this._observer is not None
+
+    @property
+    def WatchCount(this) -> int:
+        """
+        Number of native watches in use.
+        """
+        return len(this._watches)
+
+    def Subscribe(this, path: str, callback: Callable[["FileSystemEvent"], Any],
+                  recursive: bool = False) -> Subscription:
+        """
+        Get file system events on a file or directory.
+        @param path: Target path. Files must exist, as well as directories
+        @param callback: Function to call with watchdog's event (on the observer thread)
+        @param recursive: Also get events from all subdirectories (for directories only)
+        @return The subscription
+        @raise NotImplementedError: watchdog is not usable
+        @raise OSError: watchdog could not watch the path (e.g out of inotify watches)
+        """
+        if not Importable["watchdog"]:
+            raise NotImplementedError("Watchdog module is not usable")
+
+        path = os.path.abspath(path)
+        isdir = os.path.isdir(path)
+        root = path if isdir else os.path.dirname(path)
+        key = (root, recursive and isdir)
+
+        with this._lock:
+            sub = Subscription(this, path, callback, recursive and isdir, key)
+
+            watch = this._watches.get(key)
+            new = watch is None
+            if new:
+                if not this._observer:
+                    this._observer = Observer()
+                    this._observer.daemon = True
+                    this._observer.start()
+                watch = this._watches[key] = _Watch(this, key, this._observer)
+
+            watch.Add(sub)
+
+        if new: this._Sync(key)
+        return sub
+
+    def _Sync(this, key: tuple[str, bool]):
+        """
+        Unschedule the native watch of key if it has been left, and schedule the current one.
+        If another thread is syncing the key, leave it a note and return instead of waiting:
+        that thread may be waiting for watchdog's lock, held by the callback we are called from.
+        @raise OSError: Scheduling failed. The watch is dropped, with its subscriptions
+        """
+        with this._lock:
+            if key in this._syncing:
+                this._resync.add(key)
+                return
+            this._syncing.add(key)
+
+        error = None
+        while True:
+            with this._lock:
+                this._resync.discard(key)
+                old = this._native.get(key)
+                new = this._watches.get(key)
+                if old is new:
+                    this._syncing.discard(key)
+                    break
+
+            if old:
+                this._Unschedule(old.Observer, old.Handle)
+                with this._lock:
+                    del this._native[key]
+                continue
+
+            try:
+                handle = new.Observer.schedule(new, new.Root, recursive=key[1])
+            except BaseException as e:
+                error = e
+                this._Drop(new)
+                continue
+
+            with this._lock:
+                new.Handle = handle
+                this._native[key] = new
+
+        if error: raise error
+
+    def _Drop(this, watch: "_Watch"):
+        """
+        Forget a watch that watchdog refused, and stop its subscriptions.
+        """
+        observer = None
+
+        with this._lock:
+            for group in watch.Subscribers.values():
+                for sub in group: sub.Active = False
+            watch.Subscribers = {}
+            watch.Count = 0
+
+            if this._watches.get(watch.Key) is watch:
+                del this._watches[watch.Key]
+                if not this._watches:
+                    observer, this._observer = this._observer, None
+
+        this._StopObserver(observer)
+
+    @staticmethod
+    def _Unschedule(observer, handle):
+        try:
+            observer.unschedule(handle)
+        except (KeyError, OSError):  # Already gone, e.g the directory was deleted
+            pass
+
+    @staticmethod
+    def _StopObserver(observer):
+        if not observer: return
+        observer.stop()
+        # Can't join ourselves (someone unsubscribed from a callback)
+        if threading.current_thread() is not observer:
+            observer.join()
+
+    def Unsubscribe(this, sub: Subscription):
+        """
+        Stop a subscription. Does nothing if it has been stopped already.
+        """
+        observer = None
+
+        with this._lock:
+            if not sub.Active: return
+            sub.Active = False
+
+            watch = this._watches[sub.Key]
+            watch.Remove(sub)
+            if watch.Count: return
+
+            del this._watches[sub.Key]
+            if not this._watches:
+                observer, this._observer = this._observer, None
+
+        try:
+            this._Sync(sub.Key)
+        except Exception:
+            # A watch subscribed meanwhile could not be scheduled - that is not our caller's business
+            logger.exception("Could not watch %s", sub.Key[0])
+        this._StopObserver(observer)
+
+    def Stop(this):
+        """
+        Cancel every subscription and stop the observer.
+        """
+        with this._lock:
+            subs = [sub for watch in this._watches.values()
+                        for group in watch.Subscribers.values() for sub in group]
+        for sub in subs:
+            this.Unsubscribe(sub)
+
+
+# The process-wide hub
+Hub = WatchHub()
+
+
+def Watch(path: str, callback: Callable[["FileSystemEvent"], Any], recursive: bool = False) -> Subscription:
+    """
+    Subscribe to events on path using the process-wide hub.
+    See WatchHub.Subscribe.
+    """
+    return Hub.Subscribe(path, callback, recursive)
+
+
+def Unwatch(sub: Subscription | None):
+    """
+    Cancel a subscription made by Watch(). None is accepted (and ignored).
+    """
+    if sub: sub.Cancel()
+
+
+"""
+Event coalescing.
+A build, an npm install or a git checkout makes thousands of events in a second, often several
+for the same file (created, modified, modified...). Widgets should not handle them one by one:
+EventCoalescer collects them for a short while, keeps only the net change of each path, and hands
+the result over as one patch per directory.
+"""
+
+class DirPatch:
+    """
+    Net changes in a directory, by item names.
+    """
+
+    def __init__(this, path: str):
+        this.Path = path
+        this.Created: dict[str, bool] = {} # Name: is a directory
+        this.Deleted: set[str] = set()
+        this.Modified: set[str] = set()
+        this.Renamed: dict[str, str] = {} # Old name: new name
+
+    def __bool__(this):
+        return bool(this.Created or this.Deleted or this.Modified or this.Renamed)
+
+    def __repr__(this):
+        return (f"DirPatch({this.Path!r}, created={this.Created}, deleted={this.Deleted}, "
+                f"modified={this.Modified}, renamed={this.Renamed})")
+
+
+class CoalescerStats(NamedTuple):
+    """
+    What a window of EventCoalescer did.
+    """
+
+    Events: int # Raw events received
+    Paths: int # Paths changed in the end
+    Directories: int # Patches (directories) applied
+    Seconds: float # Time spent applying the patches
+
+    @property
+    def Ratio(this) -> float:
+        """
+        Raw events per applied patch.
+        """
+        return this.Events / this.Directories if this.Directories else float(this.Events)
+
+
+class EventCoalescer:
+    """
+    Collects watchdog events over a short window, dedupes them per path and applies the net changes
+    as one DirPatch per directory - on the GUI thread.
+
+    Feed() is the watch callback (see Watch()), and runs on the observer thread. When the first event
+    of a window comes, a timer starts; when it fires, Flush() is scheduled with schedule (e.g wx.CallAfter)
+    and calls apply with {directory: DirPatch}.
+
+    For each path, only the state before the first event and after the last one matter:
+    * created, (modified...), deleted: nothing happened
+    * deleted, created: modified
+    * created, modified: created
+    A move inside a directory is a rename, other moves are deleted + created.
+    """
+
+    def __init__(this, apply: Callable[[dict[str, DirPatch]], Any],
+                 schedule: Callable[[Callable], Any] = lambda func: func(),
+                 window: float = 0.1):
+        """
+        Constructor.
+        @param apply: Called with the patches of a window
+        @param schedule: Run a function on the GUI thread (soon). By default: right away, on the timer thread
+        @param window: Seconds to collect events for, from the first event of a window
+        """
+        this.Apply = apply
+        this.Schedule = schedule
+        this.Window = window
+
+        this.Last: CoalescerStats | None = None # Stats of the last window
+        this.TotalEvents = 0
+        this.TotalWindows = 0
+
+        this._lock = threading.Lock()
+        this._timer: threading.Timer | None = None
+        this._events = 0
+        this._states: dict[str, list] = {} # Path: [existed before, exists now, is a directory, modified]
+        this._renames: dict[str, tuple[str, bool]] = {} # Source: (destination, is a directory)
+        this._renamedto: dict[str, str] = {} # Destination: source
+
+    def _Unrename(this, path: str):
+        # Another event on a renamed path - make the rename deleted + created
+        src = this._renamedto.pop(path, None) or (path if path in this._renames else None)
+        if src is None: return
+        dest, isdir = this._renames.pop(src)
+        this._renamedto.pop(dest, None)
+        this._states[src] = [True, False, isdir, False]
+        this._states[dest] = [False, True, isdir, False]
+
+    def _Change(this, path: str, kind: str, isdir: bool):
+        this._Unrename(path)
+        state = this._states.get(path)
+        if state is None:
+            state = this._states[path] = [kind != "created", True, isdir, False]
+
+        state[2] = isdir
+        if kind == "created":
+            state[1] = True
+            state[3] = state[0] # Replaced
+        elif kind == "deleted":
+            state[1] = False
+            state[3] = False
+        else: # modified
+            state[3] = True
+
+    def Feed(this, event: "FileSystemEvent"):
+        """
+        Take a watchdog event. Can be used as a Watch() callback directly.
+        """
+        kind = event.event_type
+        if kind not in ("created", "deleted", "modified", "moved"): return # Opened, closed...
+
+        src = os.path.normpath(os.fsdecode(event.src_path))
+        isdir = event.is_directory
+        if kind == "modified" and isdir: return # Its content changed, events come for them
+
+        with this._lock:
+            this._events += 1
+
+            if kind != "moved":
+                this._Change(src, kind, isdir)
+            else:
+                dest = os.path.normpath(os.fsdecode(event.dest_path))
+                this._Unrename(src)
+                this._Unrename(dest)
+                if os.path.dirname(src) == os.path.dirname(dest) \
+                        and src not in this._states and dest not in this._states:
+                    this._renames[src] = (dest, isdir)
+                    this._renamedto[dest] = src
+                else:
+                    this._Change(src, "deleted", isdir)
+                    this._Change(dest, "created", isdir)
+
+            if not this._timer:
+                this._timer = threading.Timer(this.Window, this.Schedule, [this.Flush])
+                this._timer.daemon = True
+                this._timer.start()
+
+    def Flush(this) -> CoalescerStats | None:
+        """
+        Apply what has been collected now. Call this on the GUI thread.
+        @return Stats of the window, None if there was nothing to do
+        """
+        with this._lock:
+            if this._timer:
+                this._timer.cancel()
+                this._timer = None
+            events, this._events = this._events, 0
+            states, this._states = this._states, {}
+            renames, this._renames = this._renames, {}
+            this._renamedto = {}
+
+        if not events: return None
+
+        patches: dict[str, DirPatch] = {}
+        def patch(path: str) -> DirPatch:
+            parent = os.path.dirname(path)
+            if parent not in patches: patches[parent] = DirPatch(parent)
+            return patches[parent]
+
+        changed = len(renames)
+        for path, (before, now, isdir, modified) in states.items():
+            name = os.path.basename(path)
+            if before and now and modified: patch(path).Modified.add(name)
+            elif before and not now: patch(path).Deleted.add(name)
+            elif now and not before: patch(path).Created[name] = isdir
+            else: continue
+            changed += 1
+
+        for src, (dest, isdir) in renames.items():
+            patch(src).Renamed[os.path.basename(src)] = os.path.basename(dest)
+
+        start = time.perf_counter()
+        if patches:
+            this.Apply(patches)
+
+        this.Last = CoalescerStats(events, changed, len(patches), time.perf_counter() - start)
+        this.TotalEvents += events
+        this.TotalWindows += 1
+        logger.debug("Coalesced %d file system events into %d changes in %d directories, applied in %.1fms",
+                     this.Last.Events, this.Last.Paths, this.Last.Directories, this.Last.Seconds * 1000)
+        return this.Last
+
+    def Cancel(this):
+        """
+        Drop what has been collected, and stop the timer.
+        """
+        with this._lock:
+            if this._timer:
+                this._timer.cancel()
+                this._timer = None
+            this._events = 0
+            this._states = {}
+            this._renames = {}
+            this._renamedto = {}
@@ -1,55 +1,117 @@
-#	A cross-platform library for Python apps.
-#	Copyright (C) 2024 Le Bao Nguyen and contributors.
-#	This is a part of the libtextworker project.
-#	Licensed under the GNU General Public License version 3.0 or later.
-import os.path
-
-# Testers: Don't import test_import, it will break pytest
-from libtextworker.general import CreateDirectory, WalkCreation, CraftItems
-from libtextworker.get_config import GetConfig
-
-
-def test_makedirs():
-    CreateDirectory("helloworld", ["one", "two", "three"])
-    WalkCreation("helloworld/one/configs")
-    WalkCreation(CraftItems("helloworld/two", "test"))
-
-    open("helloworld/.gitignore", "w").write("*")
-
-    assert os.path.isdir("helloworld/one") == True
-    assert os.path.isdir("helloworld/one/configs") == True
-    assert os.path.isdir("helloworld/two") == True
-    assert os.path.isdir("helloworld/two/test") == True
-    assert os.path.isdir("helloworld/three") == True
-
-
-def test_mkconfig():
-    cfg = {
-        "section1": {"option1": "value", "option2": "2"},
-        "section2": {"option1": "yes"},
-    }
-
-    cfgs = GetConfig(cfg, "helloworld/one/configs/configs.ini")
-    assert cfgs.Get("section1", "option1", True, True, True) == "value"
-    cfgs.set("section1", "option1", "value_changed")
-    assert cfgs.Get("section1", "option1") == "value_changed"
-    
-    cfgs.update_and_write()
-    cfgs.move(
-        {
-            "section1->option1": {
-                "newpath": "section_one->option1",
-                "file": "unchanged",
-            },
-            "section2->option1": {
-                "newpath": "test_move->section2_opt1",
-                "file": "helloworld/one/configs/new.ini",
-            },
-        }
-    )
-
-    assert cfgs.Get("section_one", "option1") == "value_changed"
-    assert cfgs.BackUp(["section_one->option1"], {}, True) == {"section_one": {"option1": "value_changed"}}
-
-    cfgs.readf("helloworld/one/configs/new.ini")
-    assert cfgs.Get("test_move", "section2_opt1") in cfgs.yes_values
+#	A cross-platform library for Python apps.
+#	Copyright (C) 2024 Le Bao Nguyen and contributors.
+#	This is a part of the libtextworker project.
+#	Licensed under the GNU General Public License version 3.0 or later.
+import os.path
+import time
+
+import pytest
+
+# Testers: Don't import test_import, it will break pytest
+from libtextworker.general import CreateDirectory, WalkCreation, CraftItems
+from libtextworker.get_config import ConfigurationError, GetConfig
+
+
+def test_makedirs():
+    CreateDirectory("helloworld", ["one", "two", "three"])
+    WalkCreation("helloworld/one/configs")
+    WalkCreation(CraftItems("helloworld/two", "test"))
+
+    open("helloworld/.gitignore", "w").write("*")
+
+    assert os.path.isdir("helloworld/one") == True
+    assert os.path.isdir("helloworld/one/configs") == True
+    assert os.path.isdir("helloworld/two") == True
+    assert os.path.isdir("helloworld/two/test") == True
+    assert os.path.isdir("helloworld/three") == True
+
+
+def test_mkconfig():
+    cfg = {
+        "section1": {"option1": "value", "option2": "2"},
+        "section2": {"option1": "yes"},
+    }
+
+    cfgs = GetConfig(cfg, "helloworld/one/configs/configs.ini")
+    assert cfgs.Get("section1", "option1", True, True, True) == "value"
+    cfgs.set("section1", "option1", "value_changed")
+    assert cfgs.Get("section1", "option1") == "value_changed"
+    
+    cfgs.update_and_write()
+    cfgs.move(
+        {
+            "section1->option1": {
+                "newpath": "section_one->option1",
+                "file": "unchanged",
+            },
+            "section2->option1": {
+                "newpath": "test_move->section2_opt1",
+                "file": "helloworld/one/configs/new.ini",
+            },
+        }
+    )
+
+    assert cfgs.Get("section_one", "option1") == "value_changed"
+    assert cfgs.BackUp(["section_one->option1"], {}, True) == {"section_one": {"option1": "value_changed"}}
+
+    cfgs.readf("helloworld/one/configs/new.ini")
+    assert cfgs.Get("test_move", "section2_opt1") in cfgs.yes_values
+
+
+def test_memo_and_typed():
+    cfgs = GetConfig(None, {"editor": {"size": "4", "wrap": "'yes'", "fg": "#AbC", "bg": "30, 30, 30", "bad": "x"}})
+
+    assert cfgs.Get("editor", "wrap", True) == "yes"
+    assert cfgs.Get("editor", "wrap") is True
+    assert cfgs.GetInt("editor", "size") == 4
+    assert cfgs.GetBool("editor", "wrap") is True
+    assert cfgs.GetHexColor("editor", "fg") == "#aabbcc"
+    assert cfgs.GetHexColor("editor", "bg") == "#1e1e1e"
+
+    # Changes must be seen
+    cfgs.set("editor", "size", "8")
+    assert cfgs.GetInt("editor", "size") == 8
+    cfgs["editor"]["wrap"] = "off"
+    assert cfgs.GetBool("editor", "wrap") is False
+    cfgs.read_string("[editor]\nsize = 2")
+    assert cfgs.GetInt("editor", "size") == 2
+    cfgs.remove_option("editor", "size")
+    assert cfgs.GetInt("editor", "size", noraise=True) is None
+    cfgs.read_dict({"editor": {"size": "6"}})
+    assert cfgs.Get("editor", "Size") == "6"
+
+    for getter in (cfgs.GetInt, cfgs.GetBool, cfgs.GetHexColor):
+        with pytest.raises(ConfigurationError):
+            getter("editor", "bad")
+
+
+def test_reload(tmp_path):
+    path = tmp_path / "reload.ini"
+    path.write_text("[editor]\nsize = 4\nwrap = yes\n")
+
+    cfgs = GetConfig(None, str(path))
+    cfgs.ReloadDelay = 0.05
+    changes = []
+    cfgs.Subscribe(lambda cfg, diff: changes.append(diff))
+    assert cfgs.GetInt("editor", "size") == 4
+    assert cfgs.Reload() is None
+
+    # Same content: nothing to do
+    path.write_text("[editor]\nsize = 4\nwrap = yes\n")
+    assert cfgs.Reload() is None
+
+    path.write_text("[editor]\nsize = 8\n[new]\nkey = 1\n")
+    assert cfgs.Reload() == {("editor", "size"): ("4", "8"), ("editor", "wrap"): ("yes", None),
+                             ("new", "key"): (None, "1")}
+    assert cfgs.GetInt("editor", "size") == 8 and cfgs["new"]["key"] == "1"
+
+    # Broken files are ignored
+    path.write_text("size = 2")
+    assert cfgs.Reload() is None and cfgs.GetInt("editor", "size") == 8
+
+    # Bursts make one reload
+    path.write_text("[editor]\nsize = 2\n")
+    for i in range(5):
+        cfgs.ScheduleReload()
+    time.sleep(0.3)
+    assert len(changes) == 2 and cfgs.GetInt("editor", "size") == 2
@@ -0,0 +1,156 @@
+#	A cross-platform library for Python apps.
+#	Copyright (C) 2024 Le Bao Nguyen and contributors.
+#	This is a part of the libtextworker project.
+#	Licensed under the GNU General Public License version 3.0 or later.
+import os
+
+from libtextworker.interface.base.dirctrl import HasChildren, ScanDir
+
+
+def test_scandir(tmp_path):
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "empty").mkdir()
+    (tmp_path / "sub" / "deep").mkdir()
+    (tmp_path / "a.txt").write_text("hello")
+    os.symlink(tmp_path / "nowhere", tmp_path / "broken")
+
+    items = {item.Name: item for item in ScanDir(str(tmp_path), stats=True)}
+    assert set(items) == {"sub", "empty", "a.txt", "broken"}
+    assert items["sub"].IsDir and not items["a.txt"].IsDir and not items["broken"].IsDir
+    assert items["a.txt"].Size == 5 and items["sub"].Size == 0
+    assert items["a.txt"].Path == str(tmp_path / "a.txt") and items["a.txt"].MTime > 0
+
+    assert {item.Name for item in ScanDir(str(tmp_path), dironly=True)} == {"sub", "empty"}
+    assert next(ScanDir(str(tmp_path))).MTime == 0  # No stats unless asked for
+
+
+def test_haschildren(tmp_path):
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "sub" / "a.txt").write_text("")
+    (tmp_path / "empty").mkdir()
+
+    assert HasChildren(str(tmp_path / "sub"))
+    assert not HasChildren(str(tmp_path / "sub"), dironly=True)
+    assert not HasChildren(str(tmp_path / "empty"))
+    assert not HasChildren(str(tmp_path / "missing"))
+
+
+def test_dirloader(tmp_path):
+    from libtextworker.interface.base.dirctrl import DirLoader
+
+    for i in range(50):
+        (tmp_path / f"f{i:02}").write_text("")
+    (tmp_path / "Zdir").mkdir()
+    (tmp_path / "adir").mkdir()
+    (tmp_path / "adir" / "x").write_text("")
+
+    node = []  # Stands for a tree node
+    batches = []
+    done = []
+
+    def found(batch):
+        batches.append(batch)
+        for item, expandable in batch:
+            node.insert(loader.Place(item), (item.Name, expandable))
+
+    loader = DirLoader(str(tmp_path), found, done.append, probe=True, batchsize=7).Start()
+    loader._thread.join()
+    while loader.Poll(): pass
+
+    assert done == [loader] and not loader.Error
+    assert all(len(batch) <= 7 for batch in batches) and len(batches) >= 8
+    # Sorted as it goes: directories first
+    assert node == [("adir", True), ("Zdir", False)] + [(f"f{i:02}", False) for i in range(50)]
+
+    # Cancelled: nothing more is delivered
+    cancelled = DirLoader(str(tmp_path), found, done.append, batchsize=7).Start()
+    cancelled.Cancel()
+    cancelled._thread.join()
+    assert not cancelled.Poll() and len(done) == 1
+
+    failed = DirLoader(str(tmp_path / "missing"), found, done.append).Start()
+    failed._thread.join()
+    failed.Poll()
+    assert done[-1] is failed and isinstance(failed.Error, FileNotFoundError)
+
+
+def test_sortedinsert():
+    from libtextworker.interface.base.dirctrl import SortKey, SortedInsert
+
+    # What a watched node gets later: created items and renames must land where a listing puts them
+    node = ["adir", "Zdir", "b.txt", "C.txt"]
+    keys = [SortKey(name, name.endswith("dir")) for name in node]
+    assert keys == sorted(keys)
+
+    for name, isdir in [("a.txt", False), ("bdir", True), ("B.txt", False), ("0", False)]:
+        node.insert(SortedInsert(keys, name, isdir), name)
+    assert node == ["adir", "bdir", "Zdir", "0", "a.txt", "B.txt", "b.txt", "C.txt"]
+    assert keys == sorted(keys)
+
+
+def test_pathkey(tmp_path, monkeypatch):
+    from libtextworker.interface.base.dirctrl import PathKey
+
+    monkeypatch.chdir(tmp_path)
+    assert PathKey("a/../b/") == PathKey(str(tmp_path / "b")) == os.path.normcase(str(tmp_path / "b"))
+
+
+def test_dircolumns(tmp_path):
+    from libtextworker.interface.base.dirctrl import DirColumns
+
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "a.txt").write_bytes(b"x" * 2048)
+
+    store = DirColumns().Load(str(tmp_path))
+    assert len(store) == 2 and store.Sizes.itemsize == 8
+    rows = {store.Names[i]: store.Row(i) for i in range(len(store))}
+    assert rows["a.txt"][1:2] + rows["a.txt"][3:] == ("File", "2.0KiB")
+    assert rows["sub"][1:2] + rows["sub"][3:] == ("Folder", "")
+    assert store.GetPath(store.Names.index("sub")) == str(tmp_path / "sub")
+    assert len(DirColumns().Load(str(tmp_path), dironly=True)) == 1
+
+
+def test_dirmodel(tmp_path):
+    import re
+
+    import pytest
+
+    from libtextworker.interface.base.dirctrl import DirModel
+
+    (tmp_path / "src").mkdir()
+    for name, size in (("b.py", 30), ("A.txt", 10), ("c.PY", 20)):
+        (tmp_path / name).write_bytes(b"x" * size)
+
+    model = DirModel().Load(str(tmp_path))
+    names = lambda: [model.Text(i, 0) for i in range(len(model))]
+    assert names() == ["src", "A.txt", "b.py", "c.PY"]
+
+    model.SortBy(3)
+    assert names() == ["src", "A.txt", "c.PY", "b.py"]
+    order = model._view
+    model.SortBy(3)  # Again: descending, same order read backwards
+    assert model.Reverse and model._view is order
+    assert names() == ["b.py", "c.PY", "A.txt", "src"]
+
+    model.SortBy(0, reverse=False)
+    model.Filter("*.py")
+    assert names() == ["src", "b.py", "c.PY"]
+    model.Filter("*.py", case=True, keepdirs=False)
+    assert names() == ["b.py"]
+    model.Filter("c*")  # Globs match whole names, not in the middle ("src")
+    assert names() == ["src", "c.PY"]
+    model.Filter("c*", keepdirs=False)
+    assert names() == ["c.PY"]
+    model.Filter("c", regex=True, keepdirs=False)  # Regular expressions search
+    assert names() == ["src", "c.PY"]
+    model.Filter(r"^[ab]\.", regex=True)
+    assert names() == ["src", "A.txt", "b.py"] and model.GetPath(1) == str(tmp_path / "A.txt")
+
+    view = model._view
+    model.Filter()
+    model.Filter(r"^[ab]\.", regex=True)  # Back to a previous filter: cached
+    assert model._view is view
+
+    with pytest.raises(re.error):
+        model.Filter("(", regex=True)
+    assert len(model) == 3  # The previous filter stays
@@ -0,0 +1,123 @@
+#	A cross-platform library for Python apps.
+#	Copyright (C) 2024 Le Bao Nguyen and contributors.
+#	This is a part of the libtextworker project.
+#	Licensed under the GNU General Public License version 3.0 or later.
+import random
+
+from libtextworker.interface.base.editor import AtomicWriter, BufferHash, DirtyTracker, FileFingerprint, \
+                                               IdleJob, MOD_BUFFER, MOD_DISK, MOD_NONE, ReadChunks, StreamLoad
+
+
+class FakeBuffer:
+    """
+    A list of lines, which reports its edits like StyledTextControl does.
+    """
+
+    def __init__(self, text: str):
+        self.lines = text.split("\n")
+        self.tracker = DirtyTracker(self.fetch, len(self.lines))
+        self.tracker.ChunkLines = 8
+        self.tracker.Reset(len(self.lines))
+
+    def fetch(self, first, last):
+        if last is None:
+            return "\n".join(self.lines[first:])
+        return "\n".join(self.lines[first:last]) + "\n"
+
+    def text(self):
+        return "\n".join(self.lines)
+
+    def insert(self, line, col, text):
+        old = self.lines[line]
+        new = (old[:col] + text + old[col:]).split("\n")
+        self.lines[line:line + 1] = new
+        self.tracker.Changed(line, 0, len(new) - 1)
+
+    def delete(self, line1, col1, line2, col2):
+        merged = self.lines[line1][:col1] + self.lines[line2][col2:]
+        self.lines[line1:line2 + 1] = [merged]
+        self.tracker.Changed(line1, line2 - line1, 0)
+
+
+def test_dirtytracker():
+    rand = random.Random(3105)
+    buf = FakeBuffer("\n".join(f"line {i}" for i in range(200)))
+    assert buf.tracker.digest() == BufferHash(buf.text().encode()).digest()
+
+    for _ in range(300):
+        line = rand.randrange(len(buf.lines))
+        if rand.random() < 0.6:
+            text = rand.choice(["a", "\n", "xy\nz", "\n\n\n", "hello world"])
+            buf.insert(line, rand.randint(0, len(buf.lines[line])), text)
+        else:
+            line2 = min(len(buf.lines) - 1, line + rand.randint(0, 20))
+            buf.delete(line, 0, line2, rand.randint(0, len(buf.lines[line2])))
+
+        assert buf.tracker.LineCount == len(buf.lines)
+        assert buf.tracker.digest() == BufferHash(buf.text().encode()).digest()
+
+
+def test_bufferhash():
+    assert BufferHash(b"\0abc").digest() != BufferHash(b"abc").digest()
+
+    joined = BufferHash(b"hello ")
+    joined.update(b"world")
+    assert joined.hexdigest() == BufferHash(b"hello world").hexdigest()
+
+
+def test_fingerprint(tmp_path):
+    path = tmp_path / "file.txt"
+    path.write_text("hello\nworld")
+    saved = BufferHash(b"hello\nworld").digest()
+
+    fingerprint = FileFingerprint(str(path))
+    assert fingerprint.Digest == saved
+    assert fingerprint.Compare(saved) == MOD_NONE
+    assert not fingerprint.Compare(saved)
+    assert fingerprint.Compare(BufferHash(b"hello").digest()) == MOD_BUFFER
+
+    path.write_text("hello\nworld, changed")
+    assert fingerprint.Compare(saved) == MOD_DISK
+
+    path.unlink()
+    assert fingerprint.Compare(BufferHash(b"").digest()) == MOD_BUFFER | MOD_DISK
+
+
+def test_streaming(tmp_path):
+    path = tmp_path / "stream.txt"
+    content = "xin chào\r\nthế giới\n" * 100
+    path.write_bytes(content.encode("utf-8"))
+
+    # Tiny chunks split multi-byte characters and \r\n pairs
+    for use_mmap in [False, True]:
+        text = "".join(chunk for chunk, _, _ in ReadChunks(str(path), 7, use_mmap=use_mmap))
+        assert text == content.replace("\r\n", "\n")
+    assert "".join(chunk for chunk, _, _ in ReadChunks(str(path), 7, newline="")) == content
+
+    # Run a load job with a fake idle loop
+    loaded = []
+    queue = []
+    job = IdleJob(StreamLoad(str(path), loaded.append, 64), queue.append).Start()
+    while queue:
+        queue.pop(0)()
+    assert job.Done and "".join(loaded) == content.replace("\r\n", "\n")
+    assert job.Result.digest() == BufferHash("".join(loaded).encode()).digest()
+
+    job = IdleJob(StreamLoad(str(path), loaded.append, 64), queue.append).Start()
+    job.Cancel()
+    queue.pop(0)()
+    assert job.Cancelled and not job.Done and not queue
+
+    # Atomic writes
+    target = tmp_path / "saved.txt"
+    target.write_text("old")
+    with AtomicWriter(str(target)) as writer:
+        writer.write("new ")
+        writer.write("content")
+        writer.Discard()
+    assert target.read_text() == "old"
+
+    with AtomicWriter(str(target)) as writer:
+        writer.write("new content")
+    assert target.read_text() == "new content"
+    assert sorted(item.name for item in tmp_path.iterdir()) == ["saved.txt", "stream.txt"]
@@ -0,0 +1,126 @@
+#	A cross-platform library for Python apps.
+#	Copyright (C) 2024 Le Bao Nguyen and contributors.
+#	This is a part of the libtextworker project.
+#	Licensed under the GNU General Public License version 3.0 or later.
+import random
+import re
+import time
+
+import pytest
+
+from libtextworker.interface.base.findreplace import CompilePattern, Expander, FindMatches, Replacements, \
+                                                     SearchCache, SearchEngine
+
+
+def wait(engine: SearchEngine):
+    while engine.Poll():
+        time.sleep(0.001)
+
+
+def test_search():
+    text = "\n".join(f"Line {i}: foo bar FOO" for i in range(100000))
+    batches = []
+    engine = SearchEngine(batches.append, batchsize=1000)
+
+    engine.Search(text, "foo")
+    wait(engine)
+    assert engine.MatchCount == 100000 and len(batches) == 100
+    assert engine.Matches[1] == (text.index("foo", 20), text.index("foo", 20) + 3, 2, 8, 2, 11)
+
+    engine.Search(text, "foo", case=False)
+    wait(engine)
+    assert engine.MatchCount == 200000
+
+    engine.Search(text, r"Line 9+:", regex=True)
+    wait(engine)
+    assert [m[2] for m in engine.Matches] == [10, 100, 1000, 10000, 100000]
+
+    assert engine.Next(1, 0)[2] == 10
+    assert engine.Next(10, 1)[2] == 100
+    assert engine.Next(100001, 0)[2] == 10
+    assert engine.Previous(10, 0)[2] == 100000
+    assert engine.Previous(100, 0)[2] == 10
+
+    with pytest.raises(re.error):
+        engine.Search(text, "(", regex=True)
+
+
+def test_search_multiline_and_cancel():
+    engine = SearchEngine()
+    engine.Search("ab\ncd\nab\ncd", "b\nc")
+    wait(engine)
+    assert [m[2:] for m in engine.Matches] == [(1, 1, 2, 1), (3, 1, 4, 1)]
+
+    engine.Search("x" * 10 ** 6, "x")
+    engine.Search("xyz", "y")
+    wait(engine)
+    assert engine.Matches == [(1, 2, 1, 1, 1, 2)]
+
+
+def test_replacements():
+    text = "Foo bar\nfoo(foo)\nbaz"
+    edits = Replacements(text, CompilePattern("foo", case=False), "x")
+    assert [(m[2:], new) for m, new in edits] == [((1, 0, 1, 3), "x"), ((2, 0, 2, 3), "x"), ((2, 4, 2, 7), "x")]
+
+    edits = Replacements(text, CompilePattern(r"(\w)o+", regex=True), r"<\1\g<0>>", regex=True)
+    assert [new for m, new in edits] == ["<FFoo>", "<ffoo>", "<ffoo>"]
+
+    # Bottom-up application gives the same result as re.sub
+    for m, new in reversed(edits):
+        text = text[:m[0]] + new + text[m[1]:]
+    assert text == "<FFoo> bar\n<ffoo>(<ffoo>)\nbaz"
+
+
+@pytest.mark.parametrize("template", [r"\2\1", r"\g<a>-\g<0>{}\\n\n\t", r"\3|\1", r"\101", r"\g<2>0", "{x}"])
+def test_expander(template):
+    pattern = re.compile(r"(?P<a>f)(o+)?(x)?")
+    for text in ["foo", "f", "fx"]:
+        m = pattern.search(text)
+        assert Expander(pattern, template)(m) == m.expand(template)
+
+
+def test_searchcache():
+    rand = random.Random(7)
+    lines = [rand.choice(["error here", "no err", "Errors: 2", "", "erroneous error"]) for _ in range(2000)]
+
+    fetched = []
+
+    def fetch(first, last):
+        fetched.append((first, last))
+        if last is None:
+            return "\n".join(lines[first:])
+        return "\n".join(lines[first:last]) + "\n"
+
+    def scan(query, case=True):
+        return [m[2:] for m, _ in FindMatches("\n".join(lines), CompilePattern(query, case=case))]
+
+    cache = SearchCache(fetch)
+    assert cache.Lookup("err") is None
+    cache.Store("err", False, True, [m for m, _ in FindMatches(fetch(0, None), CompilePattern("err"))], cache.Generation)
+
+    # Narrowing - fetching only lines with matches, one at a time
+    fetched.clear()
+    assert [m[2:] for m in cache.Lookup("erro")] == scan("erro")
+    assert fetched and all(last == first + 1 for first, last in fetched)
+    assert len(fetched) == len(set(fetched))
+    assert [m[2:] for m in cache.Lookup("error")] == scan("error")
+    assert cache.Lookup("err", case=False) is None
+    assert cache.Lookup("(err)", regex=True) is None
+
+    # Edits
+    for i in range(50):
+        line = rand.randrange(len(lines))
+        op = rand.randrange(3)
+        if op == 0:  # Typing
+            lines[line] = lines[line][:3] + rand.choice("eo r") + lines[line][3:]
+            cache.Changed(line)
+        elif op == 1 and line + 2 < len(lines):  # Join 2 lines
+            lines[line:line + 3] = [lines[line] + lines[line + 1] + lines[line + 2]]
+            cache.Changed(line, 2, 0)
+        else:  # Paste 3 lines
+            lines[line:line + 1] = [lines[line][:2], "error", "rr", lines[line][2:]]
+            cache.Changed(line, 0, 3)
+
+        if i % 10 == 9:
+            for query in ["err", "erro", "error"]:
+                assert [m[2:] for m in cache.Lookup(query)] == scan(query)
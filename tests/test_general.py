@@ -0,0 +1,14 @@
+#	A cross-platform library for Python apps.
+#	Copyright (C) 2024 Le Bao Nguyen and contributors.
+#	This is a part of the libtextworker project.
+#	Licensed under the GNU General Public License version 3.0 or later.
+# Testers: Don't import test_import, it will break pytest
+from libtextworker.general import Importable
+
+
+def test_importable():
+    # Probed on first access, without importing
+    assert "json" not in Importable and Importable["json"]
+    assert "json" in Importable
+    assert not Importable["libtextworker_no_such_package"]
+    assert not Importable["libtextworker_no_such_package.child"]
@@ -0,0 +1,53 @@
+#	A cross-platform library for Python apps.
+#	Copyright (C) 2024 Le Bao Nguyen and contributors.
+#	This is a part of the libtextworker project.
+#	Licensed under the GNU General Public License version 3.0 or later.
+import os
+
+import pytest
+
+from libtextworker.general import Logger, logger, setup_logging
+
+
+def test_setup_logging(tmp_path):
+    path = tmp_path / "logs" / "test.log"
+    try:
+        listener = setup_logging(str(path), stream=False, rotate="size", maxbytes=100, backups=1)
+        assert not path.parent.exists() # Nothing on disk until the first record
+
+        for i in range(10):
+            logger.warning("record %d", i)
+        listener.stop() # Flushes the queue
+
+        assert "record 9" in path.read_text()
+        assert sorted(os.listdir(path.parent)) == ["test.log", "test.log.1"]
+
+        with pytest.raises(ValueError):
+            setup_logging(rotate="weekly")
+    finally:
+        setup_logging(usequeue=False)
+
+
+def test_gui_log_batching():
+    shown = []
+    queued = []
+    sink = type("Sink", (), {})
+    for name in Logger.GUILevels:
+        setattr(sink, "LOG_" + name, staticmethod(lambda msg, name=name: shown.append((name, msg))))
+    sink.LOG_SCHEDULE = staticmethod(queued.append)
+
+    log = Logger("gui-test", 10)
+    log.UseGUIToolKit("fake")
+    log._guisink = ("fake", sink) # No real toolkit here
+    log.GUILevel = 20
+    log.GUIBatchSize = 3
+
+    log.debug("hidden")
+    log.log(20, "first %d", 1)
+    for i in range(3):
+        log.error("again")
+    log.warning("w1"); log.warning("w2")
+
+    assert not shown and len(queued) == 1 # One flush scheduled for the burst
+    queued[0]()
+    assert shown == [("ERROR", "first 1\nagain (x3)\nw1\n...and 1 more")]
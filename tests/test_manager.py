@@ -0,0 +1,92 @@
+#	A cross-platform library for Python apps.
+#	Copyright (C) 2024 Le Bao Nguyen and contributors.
+#	This is a part of the libtextworker project.
+#	Licensed under the GNU General Public License version 3.0 or later.
+from libtextworker.interface import colors, stock_ui_configs
+from libtextworker.interface.manager import ColorManager
+
+
+class Base:
+    def __init__(this): this.calls = []
+    def Record(this, *args, **kwds): this.calls.append((args, kwds))
+
+class Child(Base): ...
+
+
+def test_getcolor():
+    clrmgr = ColorManager(None, stock_ui_configs)
+    assert clrmgr.GetColor("dark") == (colors["dark"], colors["light"])
+
+    clrmgr.set("color", "background-dark", "rose")
+    clrmgr.set("color", "foreground-dark", "#123456")
+    assert clrmgr.GetColor("dark") == (colors["rose"], "#123456")
+
+
+def test_dispatch(monkeypatch):
+    for name in ("setcolorfn", "setfontfn", "setfcfn", "_typeindex"):
+        monkeypatch.setattr(ColorManager, name, {})
+
+    clrmgr = ColorManager(None, stock_ui_configs)
+    one, two, other = Child(), Child(), Base()
+
+    clrmgr.setfontcfunc(Child, "Record", {"fore": "%(font)", "rgb": "%(font-rgb)"})
+    clrmgr.setcolorfunc(Base, "Record", ("bg: %(color);",))
+    clrmgr.setfontandcolorfunc(one, one.Record, ())
+
+    for color in ("dark", "light"):  # Templates are not filled in place
+        back, fore = clrmgr.GetColor(color)
+        clrmgr.configure(one, color)
+        clrmgr.configure(other, color)
+        rgb = tuple(int(fore[i:i + 2], 16) for i in (1, 3, 5))
+        assert one.calls[-3:] == [((f"bg: {back};",), {}), ((), {"fore": fore, "rgb": rgb}), ((), {})]
+        assert other.calls[-1] == ((f"bg: {back};",), {})
+
+    clrmgr.configure(two)
+    assert len(two.calls) == 2 and len(other.calls) == 2
+    assert set(ColorManager._typeindex) == {Child, Base}
+
+    # Registering clears the index
+    clrmgr.setcolorfunc(Child, "Record", ())
+    assert not ColorManager._typeindex
+
+
+def test_resolve_theme():
+    clrmgr = ColorManager(None, stock_ui_configs)
+    theme = clrmgr.ResolveTheme("dark")
+    assert (theme.Mode, theme.Background, theme.Foreground) == ("dark", colors["dark"], colors["light"])
+    assert clrmgr.ResolveTheme("dark") is theme
+
+    # Settings changed: resolved again
+    clrmgr.set("color", "foreground-dark", "green")
+    assert clrmgr.ResolveTheme("dark").Foreground == colors["green"]
+
+
+def test_theme_listener():
+    from libtextworker.interface.manager import ThemeListener
+
+    listener = ThemeListener()
+    listener.thread = True # Don't start darkdetect here
+    queued = []
+    got = []
+
+    widgets = [Base(), Base()]
+    for widget in widgets:
+        listener.Register(widget, lambda widget, theme: got.append(theme), queued.append)
+
+    # A burst of events: one delivery, with the last theme
+    for theme in ("Dark", "Light", "Dark"):
+        listener.OnThemeChange(theme)
+    assert len(queued) == 1
+    queued.pop()()
+    assert got == ["dark", "dark"]
+
+    # Same theme again: nothing to do
+    listener.OnThemeChange("Dark")
+    queued.pop()()
+    assert len(got) == 2
+
+    # Gone widgets are forgotten
+    del widgets[0]
+    listener.OnThemeChange("Light")
+    queued.pop()()
+    assert got == ["dark", "dark", "light"]
@@ -0,0 +1,33 @@
+#	A cross-platform library for Python apps.
+#	Copyright (C) 2024 Le Bao Nguyen and contributors.
+#	This is a part of the libtextworker project.
+#	Licensed under the GNU General Public License version 3.0 or later.
+from libtextworker.interface.base.viewer import LineIndex, ViewWindow
+
+
+def test_lineindex(tmp_path):
+    lines = [f"line {i}" * (i % 7) for i in range(5000)]
+    path = tmp_path / "big.log"
+    path.write_text("\r\n".join(lines), newline="")
+
+    index = LineIndex(str(path), blocksize=1000).Start()
+    index.Wait()
+    assert index.Done and index.LineCount == len(lines)
+    assert index.GetLines(0, 10) == lines[:10]
+    assert index.GetLines(4990, 6000) == lines[4990:]
+
+    window = ViewWindow(index, margin=50)
+    assert window.Needs(0, 30)
+    assert window.Move(2000, 30) == lines[1950:2080]
+    assert not window.Needs(2010, 30)
+    assert window.Needs(1960, 30) and window.Needs(4000, 30)
+    index.Close()
+
+
+def test_lineindex_empty(tmp_path):
+    path = tmp_path / "empty.log"
+    path.write_bytes(b"")
+    index = LineIndex(str(path)).Start()
+    index.Wait()
+    assert index.LineCount == 1 and index.GetLines(0, 1) == [""]
+    index.Close()
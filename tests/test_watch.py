@@ -0,0 +1,195 @@
+#	A cross-platform library for Python apps.
+#	Copyright (C) 2024 Le Bao Nguyen and contributors.
+#	This is a part of the libtextworker project.
+#	Licensed under the GNU General Public License version 3.0 or later.
+import os
+import time
+
+from types import SimpleNamespace
+
+import pytest
+
+from libtextworker.general import Importable
+from libtextworker.watch import EventCoalescer, WatchHub
+
+needs_watchdog = pytest.mark.skipif(not Importable["watchdog"], reason="watchdog is not installed")
+
+
+def wait(cond, timeout: float = 3):
+    end = time.time() + timeout
+    while not cond() and time.time() < end:
+        time.sleep(0.02)
+    return cond()
+
+
+@needs_watchdog
+def test_refcount(tmp_path):
+    hub = WatchHub()
+    (tmp_path / "a.ini").write_text("")
+    (tmp_path / "b.ini").write_text("")
+
+    # Two files of a directory share one watch
+    one = hub.Subscribe(str(tmp_path / "a.ini"), print)
+    two = hub.Subscribe(str(tmp_path / "b.ini"), print)
+    assert hub.Running and hub.WatchCount == 1
+
+    tree = hub.Subscribe(str(tmp_path), print, recursive=True)
+    assert hub.WatchCount == 2
+
+    one.Cancel()
+    one.Cancel()  # No-op
+    assert hub.WatchCount == 2
+    two.Cancel()
+    assert hub.WatchCount == 1
+    tree.Cancel()
+    assert hub.WatchCount == 0 and not hub.Running
+
+
+@needs_watchdog
+def test_dispatch(tmp_path):
+    hub = WatchHub()
+    sub = tmp_path / "sub"
+    deep = sub / "deep"
+    deep.mkdir(parents=True)
+    (tmp_path / "a.ini").write_text("")
+
+    got = {"file": [], "tree": [], "flat": []}
+    hub.Subscribe(str(tmp_path / "a.ini"), lambda e: got["file"].append(e.src_path))
+    hub.Subscribe(str(tmp_path), lambda e: got["tree"].append(e.src_path), recursive=True)
+    hub.Subscribe(str(sub), lambda e: got["flat"].append(e.src_path))
+
+    try:
+        (tmp_path / "a.ini").write_text("x")
+        (deep / "c.txt").write_text("x")
+        (sub / "b.txt").write_text("x")
+        assert wait(lambda: str(sub / "b.txt") in got["flat"])
+        assert wait(lambda: str(deep / "c.txt") in got["tree"])
+
+        assert set(got["file"]) == {str(tmp_path / "a.ini")}
+        # Non-recursive: direct children (and the directory itself) only
+        assert str(deep / "c.txt") not in got["flat"]
+        assert all(os.path.dirname(path) in (str(sub), str(tmp_path)) for path in got["flat"])
+    finally:
+        hub.Stop()
+
+    assert not hub.Running
+
+
+@needs_watchdog
+def test_no_deadlock(tmp_path):
+    # Subscribing and unsubscribing while events are being dispatched must not block
+    import threading
+
+    hub = WatchHub()
+    keep = hub.Subscribe(str(tmp_path), lambda e: time.sleep(0.001), recursive=True)
+    stop = threading.Event()
+
+    def churn():
+        i = 0
+        while not stop.is_set():
+            (tmp_path / f"f{i % 20}").write_text(str(i))
+            i += 1
+
+    writer = threading.Thread(target=churn, daemon=True)
+    writer.start()
+
+    def subscribe():
+        for i in range(100):
+            (tmp_path / f"sub{i % 5}").mkdir(exist_ok=True)
+            hub.Subscribe(str(tmp_path / f"sub{i % 5}"), print).Cancel()
+        keep.Cancel()
+
+    worker = threading.Thread(target=subscribe, daemon=True)
+    worker.start()
+    worker.join(10)
+    stop.set()
+    assert not worker.is_alive(), "deadlocked"
+    assert not hub.Running
+
+
+@needs_watchdog
+def test_schedule_failure(tmp_path, monkeypatch):
+    from libtextworker.watch import Observer
+
+    def fail(*args, **kwds):
+        raise OSError(28, "inotify watch limit reached")
+
+    hub = WatchHub()
+    monkeypatch.setattr(Observer, "schedule", fail)
+    with pytest.raises(OSError):
+        hub.Subscribe(str(tmp_path), print)
+    assert hub.WatchCount == 0 and not hub.Running
+
+    monkeypatch.undo()
+    hub.Subscribe(str(tmp_path), print).Cancel()
+    assert hub.WatchCount == 0 and not hub.Running
+
+
+@needs_watchdog
+def test_late_unschedule(tmp_path, monkeypatch):
+    # Someone subscribes again while the old native watch is being unscheduled.
+    # watchdog can't tell the two watches apart, so the new one must be scheduled after that
+    from libtextworker.watch import Observer
+
+    hub = WatchHub()
+    got = []
+    again = []
+    unschedule = Observer.unschedule
+
+    def late(observer, handle):
+        if not again:
+            again.append(hub.Subscribe(str(tmp_path), lambda e: got.append(e.src_path)))
+        unschedule(observer, handle)
+
+    (tmp_path / "other").mkdir()
+    hub.Subscribe(str(tmp_path / "other"), print)  # Keeps the observer running
+    monkeypatch.setattr(Observer, "unschedule", late)
+    hub.Subscribe(str(tmp_path), print).Cancel()
+    assert hub.WatchCount == 2
+
+    try:
+        (tmp_path / "a.txt").write_text("x")
+        assert wait(lambda: str(tmp_path / "a.txt") in got)
+    finally:
+        hub.Stop()
+    assert not hub.Running
+
+
+def test_coalescer():
+    def event(kind, path, isdir=False, dest=""):
+        return SimpleNamespace(event_type=kind, src_path=path, dest_path=dest, is_directory=isdir)
+
+    got = []
+    scheduled = []
+    coalescer = EventCoalescer(got.append, scheduled.append, window=0.01)
+
+    for i in range(100):  # Temporary files
+        coalescer.Feed(event("created", f"/a/tmp{i}"))
+        coalescer.Feed(event("modified", f"/a/tmp{i}"))
+        coalescer.Feed(event("deleted", f"/a/tmp{i}"))
+    for kind in ("created", "modified", "modified"):
+        coalescer.Feed(event(kind, "/a/new"))
+    coalescer.Feed(event("deleted", "/a/b/replaced"))
+    coalescer.Feed(event("created", "/a/b/replaced"))
+    coalescer.Feed(event("modified", "/a/b", isdir=True))
+    coalescer.Feed(event("moved", "/a/b/old", dest="/a/b/renamed"))
+    coalescer.Feed(event("moved", "/a/b/out", True, dest="/c/in"))
+    coalescer.Feed(event("closed", "/a/new"))
+
+    assert wait(lambda: scheduled)
+    stats = scheduled.pop()()
+    patches = got.pop()
+    assert stats.Events == 307 and stats.Paths == 5 and stats.Directories == 3
+
+    assert patches["/a"].Created == {"new": False} and not patches["/a"].Deleted
+    assert patches["/a/b"].Modified == {"replaced"} and patches["/a/b"].Deleted == {"out"}
+    assert patches["/a/b"].Renamed == {"old": "renamed"}
+    assert patches["/c"].Created == {"in": True}
+
+    # A renamed item changed again: deleted + created
+    coalescer.Feed(event("moved", "/a/x", dest="/a/y"))
+    coalescer.Feed(event("moved", "/a/y", dest="/a/z"))
+    coalescer.Flush()
+    patch = got.pop()["/a"]
+    assert patch.Deleted == {"x"} and patch.Created == {"z": False} and not patch.Renamed
+    assert coalescer.TotalEvents == 309 and coalescer.TotalWindows == 2
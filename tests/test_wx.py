@@ -17,6 +17,7 @@ from libtextworker.interface.wx import ColorManager
 from libtextworker.interface.wx.about import AboutDialog
 from libtextworker.interface.wx.actionrow import ActionRow
 from libtextworker.interface.wx.editor import StyledTextControl
+from libtextworker.interface.wx.findreplace import FindReplace
 from libtextworker.interface.wx.miscs import CreateMenu
 
 clrmgr = ColorManager(customfilepath=THEMEPATH)
@@ -78,10 +79,15 @@ def test_wx():
     # Notebook
     nb = wx.Notebook(fm)
 
-    # Add a text editor
-    te = StyledTextControl(nb)
+    # Add a text editor, with a Find & Replace panel
+    tepn = wx.Panel(nb)
+    te = StyledTextControl(tepn)
     te.EditorInit()
-    nb.AddPage(te, "StyledTextControl")
+    tesz = wx.BoxSizer(wx.VERTICAL)
+    tesz.Add(te, 1, wx.EXPAND)
+    tesz.Add(FindReplace(tepn, te, True), 0, wx.EXPAND)
+    tepn.SetSizer(tesz)
+    nb.AddPage(tepn, "StyledTextControl")
 
     # ActionRows
     pn = wx.Panel(nb)